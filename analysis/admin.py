@@ -1,17 +1,79 @@
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.urls import path
 
-from .models import AnalysisResult, KnowledgeEntry
+from . import ledger
+from .models import AnalysisResult, KnowledgeEntry, LLMCall, ProfilingSwitch, SourceAnalysis
 
 
 @admin.register(AnalysisResult)
 class AnalysisResultAdmin(admin.ModelAdmin):
-    list_display = ("message", "category", "importance_score", "created_at")
-    list_filter = ("category",)
+    list_display = ("message", "category", "importance_score", "degraded_reason", "created_at")
+    list_filter = ("category", "degraded")
     search_fields = ("summary", "message__text", "message__sender_name")
 
 
+@admin.register(SourceAnalysis)
+class SourceAnalysisAdmin(admin.ModelAdmin):
+    list_display = ("source_id", "source_type", "category", "importance_score", "degraded", "updated_at")
+    list_filter = ("source_type", "category", "degraded")
+    search_fields = ("summary", "source_id")
+
+
 @admin.register(KnowledgeEntry)
 class KnowledgeEntryAdmin(admin.ModelAdmin):
     list_display = ("entry_type", "content", "source_message", "created_at")
     list_filter = ("entry_type",)
     search_fields = ("content", "source_message__text", "source_message__sender_name")
+
+
+@admin.register(ProfilingSwitch)
+class ProfilingSwitchAdmin(admin.ModelAdmin):
+    list_display = ("target", "sample_rate", "output_format", "enabled", "expires_at", "created_at")
+    list_filter = ("enabled", "target")
+    actions = ["disable"]
+
+    @admin.action(description="Stop profiling")
+    def disable(self, request, queryset):
+        # save() rather than update() so the switch is republished to the workers
+        for switch in queryset:
+            switch.enabled = False
+            switch.save()
+        self.message_user(request, f"{queryset.count()} profiling switches disabled.")
+
+
+@admin.register(LLMCall)
+class LLMCallAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "kind", "tier", "model", "prompt_version", "outcome", "input_tokens",
+                    "output_tokens", "latency_ms", "chat", "analysis_result")
+    list_filter = ("kind", "tier", "outcome", "model", "prompt_version", "source_type")
+    date_hierarchy = "created_at"
+    list_select_related = ("chat", "analysis_result")
+    change_list_template = "admin/analysis/llmcall/change_list.html"
+
+    # The ledger is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path("report/", self.admin_site.admin_view(self.report_view), name="analysis_llmcall_report"),
+        ] + super().get_urls()
+
+    def report_view(self, request):
+        try:
+            days = max(1, min(int(request.GET.get("days", 14)), 365))
+        except ValueError:
+            days = 14
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"LLM calls per chat and day, last {days} days",
+            "days": days,
+            "daily": ledger.daily_report(days),
+            "prompt_versions": ledger.prompt_version_report(days),
+        }
+        return TemplateResponse(request, "admin/analysis/llmcall/report.html", context)
@@ -1,6 +1,9 @@
+import functools
+import hashlib
 import json
 import logging
 import re
+import time
 from typing import Any, Dict, Optional
 
 from django.conf import settings
@@ -8,6 +11,7 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 
+from . import breakers, ledger, metrics, tracing
 from .schemas import IngestionData
 
 logger = logging.getLogger(__name__)
@@ -87,11 +91,48 @@ URGENT_KEYWORDS = (
     "немедленно",
 )
 
+def prompt_hash(prompt: ChatPromptTemplate) -> str:
+    templates = [
+        f"{type(message).__name__}:{getattr(getattr(message, 'prompt', None), 'template', message)}"
+        for message in prompt.messages
+    ]
+    return hashlib.sha1("\n".join(templates).encode("utf-8")).hexdigest()[:12]
+
+
+# First tier of the two-tier mode (AI_ROUTING): a short yes/no prompt for a small model
+CLASSIFIER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """Ты фильтр сообщений учебного Telegram-чата.
+Определи, есть ли в сообщении задание, дедлайн, объявление, изменение расписания, полезная ссылка или учебное объяснение.
+Благодарности, приветствия, короткие подтверждения и болтовня не относятся к делу.
+Ответь только JSON без пояснений: {{"relevant": true или false, "confidence": число от 0 до 1}}"""),
+    ("human", "{text}"),
+])
+CLASSIFIER_PROMPT_VERSION = prompt_hash(CLASSIFIER_PROMPT)
+
+
+def route_for(source_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Two-tier routing settings of a source type (AI_ROUTING), or None when its
+    messages go straight to the extractor model.
+    """
+    routes = settings.AI_ROUTING or {}
+    return routes.get(source_type, routes.get("*"))
+
+
 class PromptFactory:
     """
     Returns appropriate prompts based on source type.
     """
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def version(source_type: str) -> str:
+        """
+        Short hash of the prompt templates, recorded with every LLM call so a
+        prompt change shows up in the ledger without a manual version bump.
+        """
+        return prompt_hash(PromptFactory.get_prompt(source_type))
+
     @staticmethod
     def get_prompt(source_type: str) -> ChatPromptTemplate:
         if source_type == 'telegram':
@@ -136,18 +177,38 @@ class PromptFactory:
 Извлеки детали расписания, дедлайны и ссылки. Результат — краткое резюме на русском.
 Формат даты: DD.MM.YYYY (если есть год) или DD.MM. Относительные даты — "relative: следующий понедельник".
 Верни ТОЛЬКО JSON (без markdown, без лишнего текста) в формате:
-{
+{{
     "category": "...",
     "importance_score": 0,
     "summary": "...",
     "extracted_links": ["url1", "url2"],
     "extracted_deadlines": [
-        {"date": "20.05.2024", "description": "Сдать отчёт"}
+        {{"date": "20.05.2024", "description": "Сдать отчёт"}}
     ]
-}
+}}
                 """),
                 ("human", "Content: {text}")
             ])
+        elif source_type == 'document':
+            return ChatPromptTemplate.from_messages([
+                ("system", """
+Ты — интеллектуальный помощник, анализирующий фрагмент учебного документа (программа курса, задание, методичка).
+Извлеки задачи, дедлайны, требования к сдаче и ссылки. Результат — краткое резюме на русском.
+Формат даты: DD.MM.YYYY (если есть год) или DD.MM. Относительные даты — "relative: следующий понедельник".
+Верни ТОЛЬКО JSON (без markdown, без лишнего текста) в формате:
+{{
+    "category": "deadline" | "announcement" | "link" | "other",
+    "importance_score": 0,
+    "task_title": "Название задачи или null",
+    "summary": "...",
+    "extracted_links": ["url1"],
+    "extracted_deadlines": [
+        {{"date": "20.05.2024", "description": "Сдать отчёт"}}
+    ]
+}}
+                """),
+                ("human", "Документ: {file_name}, раздел: {section_title}\nContent: {text}")
+            ])
         else:
             # Fallback generic prompt
             return ChatPromptTemplate.from_messages([
@@ -166,33 +227,83 @@ class AIService:
                 api_key=settings.AI_API_KEY,
                 base_url=settings.AI_BASE_URL,
                 temperature=0.3,
+                # Retries and backoff are done by the "llm" circuit breaker
+                timeout=settings.DEPENDENCY_TIMEOUTS["llm"],
+                max_retries=0,
             )
         except Exception:
             logger.exception("AI client initialization failed")
         self.parser = JsonOutputParser()
+        self._clients = {}
+
+    def _client(self, model: Optional[str]):
+        """
+        Chat client for `model`; the default model reuses self.llm.
+        """
+        if not model or model == settings.AI_MODEL_NAME or self.llm is None:
+            return self.llm
+        if model not in self._clients:
+            self._clients[model] = ChatOpenAI(
+                model=model,
+                api_key=settings.AI_API_KEY,
+                base_url=settings.AI_BASE_URL,
+                temperature=0.0,
+                timeout=settings.DEPENDENCY_TIMEOUTS["llm"],
+                max_retries=0,
+            )
+        return self._clients[model]
 
     def analyze_content(self, data: IngestionData) -> Dict[str, Any]:
         """
-        Analyzes the content using the LLM.
+        Analyzes the content using the LLM. With a route in AI_ROUTING for the
+        source type, a classifier decides first whether the message is worth
+        the extractor model at all.
         """
+        route = route_for(data.source_type)
+        tier = ""
+        model = settings.AI_MODEL_NAME
+        if route:
+            tier = "extractor"
+            model = route.get("model") or model
+            if not self._is_relevant(data, route):
+                return self._skipped_result(data)
+
         prompt = PromptFactory.get_prompt(data.source_type)
         input_data = {
             "text": data.text,
             **data.metadata
         }
 
+        call = {"prompt_version": PromptFactory.version(data.source_type), "source_type": data.source_type, "tier": tier}
         if self.llm is None:
+            # Not an outage: without a configured client re-analysis would give the same result
+            metrics.HEURISTIC_FALLBACKS.labels("no_client").inc()
+            ledger.record("llm", model, "heuristic", **call)
             return self._heuristic_result(data)
 
+        started = time.perf_counter()
         try:
             messages = prompt.format_messages(**input_data)
-            response = self.llm.invoke(messages)
+            with metrics.timed("llm"), tracing.span("llm", model=model):
+                response = breakers.get("llm").call(self._client(model).invoke, messages)
+        except breakers.CircuitOpenError:
+            # Fast path while the LLM is down: no waiting for the timeout
+            metrics.HEURISTIC_FALLBACKS.labels("breaker_open").inc()
+            ledger.record("llm", model, "heuristic", **call)
+            return self._degraded_result(data)
         except Exception:
             logger.exception(
                 "AI request failed",
                 extra={"source_type": data.source_type, "source_id": data.source_id},
             )
-            return self._heuristic_result(data)
+            metrics.HEURISTIC_FALLBACKS.labels("llm_error").inc()
+            ledger.record("llm", model, "error", (time.perf_counter() - started) * 1000, **call)
+            return self._degraded_result(data)
+        call["latency_ms"] = (time.perf_counter() - started) * 1000
+        metrics.TIER_SECONDS.labels(tier or "single", model).observe(call["latency_ms"] / 1000)
+        usage = getattr(response, "usage_metadata", None) or {}
+        call["input_tokens"] = usage.get("input_tokens")
+        call["output_tokens"] = usage.get("output_tokens")
 
         content = getattr(response, "content", str(response))
         parsed = self._parse_json(content)
@@ -201,11 +312,88 @@ class AIService:
                 "AI output was not valid JSON",
                 extra={"source_type": data.source_type, "source_id": data.source_id},
             )
+            metrics.INVALID_JSON.inc()
+            metrics.HEURISTIC_FALLBACKS.labels("invalid_json").inc()
+            ledger.record("llm", model, "invalid_json", **call)
             return self._heuristic_result(data)
 
+        ledger.record("llm", model, "ok", **call)
         normalized = self._normalize_result(parsed)
         return normalized
 
+    def _is_relevant(self, data: IngestionData, route: Dict[str, Any]) -> bool:
+        classifier = route.get("classifier") or "heuristic"
+        threshold = float(route.get("threshold", 0.5))
+        started = time.perf_counter()
+        if classifier == "heuristic":
+            score = self._relevance_score(data.text)
+        else:
+            score = self._classify_with_model(data, classifier)
+        metrics.TIER_SECONDS.labels("classifier", classifier).observe(time.perf_counter() - started)
+        # A failed classifier sends the message on rather than losing it
+        relevant = score is None or score >= threshold
+        metrics.ROUTING_DECISIONS.labels(data.source_type, "extractor" if relevant else "skipped").inc()
+        return relevant
+
+    def _classify_with_model(self, data: IngestionData, model: str) -> Optional[float]:
+        call = {"prompt_version": CLASSIFIER_PROMPT_VERSION, "source_type": data.source_type, "tier": "classifier"}
+        if self.llm is None:
+            return None
+        started = time.perf_counter()
+        try:
+            with tracing.span("llm.classifier", model=model):
+                response = breakers.get("llm").call(
+                    self._client(model).invoke, CLASSIFIER_PROMPT.format_messages(text=data.text)
+                )
+        except breakers.CircuitOpenError:
+            return None
+        except Exception as e:
+            logger.warning(f"Classifier {model} failed: {e}")
+            ledger.record("llm", model, "error", (time.perf_counter() - started) * 1000, **call)
+            return None
+        usage = getattr(response, "usage_metadata", None) or {}
+        call.update(latency_ms=(time.perf_counter() - started) * 1000,
+                    input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+
+        parsed = self._parse_json(getattr(response, "content", str(response)))
+        if not isinstance(parsed, dict) or "relevant" not in parsed:
+            ledger.record("llm", model, "invalid_json", **call)
+            return None
+        ledger.record("llm", model, "ok", **call)
+        try:
+            confidence = min(max(float(parsed.get("confidence", 1.0)), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = 1.0
+        relevant = parsed["relevant"] in (True, "true", "yes", 1)
+        return confidence if relevant else 1.0 - confidence
+
+    def _relevance_score(self, text: str) -> float:
+        """
+        Cheap first-tier score in 0..1. Unlike _heuristic_result it ignores the
+        sender role: nearly every analyzed message comes from a teacher.
+        """
+        text = (text or "").strip()
+        lower_text = text.lower()
+        if self._extract_deadlines(text) or self._contains_keyword(lower_text, DEADLINE_KEYWORDS):
+            return 0.9
+        if self._extract_links(text):
+            return 0.7
+        if self._contains_keyword(lower_text, ANNOUNCEMENT_KEYWORDS + URGENT_KEYWORDS):
+            return 0.6
+        if len(text) >= 200:
+            # Long explanations are worth the extractor
+            return 0.5
+        return 0.3 if len(text) >= 40 else 0.05
+
+    def _skipped_result(self, data: IngestionData) -> Dict[str, Any]:
+        return {
+            "category": "other",
+            "importance_score": 1,
+            "summary": self._summarize_text((data.text or "").strip()),
+            "extracted_links": [],
+            "extracted_deadlines": [],
+        }
+
     def _parse_json(self, content: str) -> Optional[Any]:
         if isinstance(content, dict):
             return content
@@ -301,6 +489,12 @@ class AIService:
             "extracted_deadlines": [],
         }
 
+    def _degraded_result(self, data: IngestionData) -> Dict[str, Any]:
+        """
+        Heuristic result marked for re-analysis once the LLM is back.
+        """
+        return {**self._heuristic_result(data), "degraded": ["llm"]}
+
     def _heuristic_result(self, data: IngestionData) -> Dict[str, Any]:
         text = (data.text or "").strip()
         if not text:
@@ -0,0 +1,344 @@
+"""
+Benchmark suite for the analysis pipeline.
+
+Runs against a synthetic corpus from analysis.corpus with the LLM and Qdrant
+replaced by in-process fakes, so numbers measure this code rather than the
+network. Results are plain JSON; compare_results() diffs two runs so a
+regression between commits shows up as a failing command.
+"""
+import hashlib
+import json
+import logging
+import math
+import platform
+import re
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+
+from . import stats
+from .ai_engine import AIService
+from .corpus import CorpusMessage
+from .models import CourseTask
+from .schemas import IngestionData
+from .vector_db import VectorDBService
+from core.models import Chat, Message
+
+logger = logging.getLogger(__name__)
+
+SUITES = ("heuristic", "parse_json", "normalize_result", "pipeline", "views")
+
+VIEW_PATHS = [
+    "/",
+    "/chats/",
+    "/knowledge-base/",
+    "/knowledge-base/task/{task_id}/",
+    "/search/?q=лабораторная",
+    "/api/v1/tasks/",
+    "/calendar/all.ics",
+    "/charts/categories/",
+]
+
+WORK_PATTERN = re.compile(
+    r"(лабораторная работа №\d+|курсовая работа|домашнее задание \d+|контрольная работа \d+"
+    r"|реферат|отчёт по практике|коллоквиум|проект)",
+    re.IGNORECASE,
+)
+HUMAN_MESSAGE_PATTERN = re.compile(r"Message: (.*)", re.DOTALL)
+
+
+class FakeLLM:
+    """
+    Stands in for ChatOpenAI. Answers are derived from the heuristic analysis
+    plus a task title, and come in the shapes real models produce: bare JSON,
+    a ```json fence, or JSON surrounded by prose.
+    """
+
+    def __init__(self, service: AIService, latency: float = 0.0):
+        self.service = service
+        self.latency = latency
+        self.calls = 0
+
+    def respond(self, text: str, sender_role: str = "student") -> str:
+        heuristic = self.service._heuristic_result(IngestionData(
+            text=text, source_type="telegram", source_id="0", metadata={"sender_role": sender_role},
+        ))
+        work = WORK_PATTERN.search(text)
+        answer = dict(heuristic)
+        answer["task_title"] = work.group(1).capitalize() if work else None
+        answer["task_type"] = "one_time"
+        answer["action"] = "new" if work else "info"
+        body = json.dumps(answer, ensure_ascii=False)
+
+        shape = int(hashlib.sha1(text.encode("utf-8")).hexdigest(), 16) % 3
+        if shape == 1:
+            return f"```json\n{body}\n```"
+        if shape == 2:
+            return f"Вот результат анализа:\n{body}\nЕсли нужно, могу уточнить."
+        return body
+
+    def reply(self, human: str) -> str:
+        """
+        Answer to a formatted human prompt ("Sender Role: ...\nMessage: ...").
+        """
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        role = "teacher" if "Sender Role: teacher" in human else "student"
+        match = HUMAN_MESSAGE_PATTERN.search(human)
+        return self.respond(match.group(1) if match else human, role)
+
+    def invoke(self, messages):
+        return AIMessage(content=self.reply(messages[-1].content))
+
+
+class FakeAIService(AIService):
+    latency = 0.0
+
+    def __init__(self):
+        self.llm = FakeLLM(self, self.latency)
+        self.parser = JsonOutputParser()
+
+
+class HashingEmbeddings:
+    """
+    Deterministic bag-of-trigrams embedding; similar titles get similar vectors.
+    """
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        normalized = f"  {(text or '').lower()}  "
+        for index in range(len(normalized) - 2):
+            digest = hashlib.md5(normalized[index:index + 3].encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.size] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+
+class InMemoryVectorDB(VectorDBService):
+    """
+    Brute-force cosine search over a process-wide dict instead of Qdrant.
+    """
+
+    points: Dict[str, Tuple[List[float], Dict]] = {}
+
+    def __init__(self):
+        self.collection_name = "course_tasks"
+        self.embedding_model = "hashing-trigrams"
+        self.embeddings = HashingEmbeddings()
+        self.vector_size = self.embeddings.size
+        self.degraded = set()
+
+    def search_tasks(self, query_text: str, threshold: float = 0.85, limit: int = 3) -> List[Dict]:
+        query = self.embed_query(query_text)
+        hits = []
+        for point_id, (vector, payload) in self.points.items():
+            score = sum(a * b for a, b in zip(query, vector))
+            if score >= threshold:
+                hits.append({"id": point_id, "score": score, "payload": payload})
+        hits.sort(key=lambda hit: -hit["score"])
+        return hits[:limit]
+
+    def upsert_task(self, task_id: str, text: str, payload: Dict):
+        self.points[task_id] = (self.embeddings.embed_query(text), payload)
+
+
+@contextmanager
+def fake_backends(llm_latency: float = 0.0):
+    """
+    Routes the pipeline's LLM and vector store to the fakes above and keeps
+    counters and live events away from production Redis.
+    """
+    InMemoryVectorDB.points = {}
+    FakeAIService.latency = llm_latency
+    locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark"}}
+    with mock.patch("analysis.tasks.AIService", FakeAIService), \
+            mock.patch("analysis.tasks.VectorDBService", InMemoryVectorDB), \
+            mock.patch("analysis.vector_db.VectorDBService", InMemoryVectorDB), \
+            override_settings(CACHES=locmem, EVENTS_REDIS_URL=""):
+        cache.clear()
+        yield
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    Nearest-rank percentile; values must be sorted.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(share * len(values)) - 1))
+    return values[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Summary of per-call durations given in milliseconds.
+    """
+    values = sorted(samples)
+    total = sum(values)
+    return {
+        "count": len(values),
+        "total_ms": round(total, 3),
+        "mean_ms": round(total / len(values), 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.5), 4),
+        "p95_ms": round(percentile(values, 0.95), 4),
+        "max_ms": round(percentile(values, 1.0), 4),
+        "ops_per_sec": round(len(values) / (total / 1000), 1) if total else 0.0,
+    }
+
+
+def measure(func: Callable, items: Iterable, repeat: int = 1) -> Dict[str, float]:
+    items = list(items)
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            started = time.perf_counter()
+            func(item)
+            samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def seed_database(corpus: List[CorpusMessage]) -> List[Tuple[int, CorpusMessage]]:
+    """
+    Stores the corpus chats and messages; returns (Message.id, corpus message) pairs.
+    """
+    chats = {}
+    for item in corpus:
+        if item.chat.tg_chat_id not in chats:
+            chats[item.chat.tg_chat_id], _ = Chat.objects.get_or_create(
+                tg_chat_id=item.chat.tg_chat_id,
+                defaults={"title": item.chat.title, "chat_type": "supergroup",
+                          "pinned_teacher_id": item.chat.teacher_id},
+            )
+    Message.objects.bulk_create([
+        Message(
+            chat=chats[item.chat.tg_chat_id],
+            tg_message_id=item.tg_message_id,
+            sender_name=item.sender_name,
+            sender_role=item.sender_role,
+            text=item.text,
+            sent_at=item.sent_at,
+            reply_to_id=item.reply_to_id,
+        )
+        for item in corpus
+    ], ignore_conflicts=True)
+    ids = {
+        (chat_id, tg_message_id): message_id
+        for message_id, chat_id, tg_message_id in Message.objects.filter(chat__in=chats.values())
+        .values_list("id", "chat__tg_chat_id", "tg_message_id")
+    }
+    # bulk_create bypasses the signals that maintain the dashboard counters
+    stats.rebuild()
+    return [(ids[(item.chat.tg_chat_id, item.tg_message_id)], item) for item in corpus]
+
+
+def run_benchmarks(corpus: List[CorpusMessage], suites: Iterable[str] = SUITES, repeat: int = 3,
+                   llm_latency: float = 0.0, view_paths: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Runs the selected suites and returns {benchmark name: summary}. The
+    pipeline suite writes to the current database, so run it on a throwaway one.
+    """
+    suites = list(suites)
+    results: Dict[str, Dict] = {}
+    with fake_backends(llm_latency):
+        service = FakeAIService()
+        ingestion = [item.ingestion_data(str(index)) for index, item in enumerate(corpus)]
+
+        if "heuristic" in suites:
+            results["heuristic"] = measure(service._heuristic_result, ingestion, repeat)
+
+        responses = [service.llm.respond(item.text, item.sender_role) for item in corpus]
+        if "parse_json" in suites:
+            results["parse_json"] = measure(service._parse_json, responses, repeat)
+        if "normalize_result" in suites:
+            parsed = [service._parse_json(response) for response in responses]
+            results["normalize_result"] = measure(service._normalize_result, parsed, repeat)
+
+        if "pipeline" in suites or "views" in suites:
+            seeded = seed_database(corpus)
+        if "pipeline" in suites:
+            from .tasks import process_content_task
+
+            # Every message is analyzed once: a second pass would measure updates, not inserts
+            results["pipeline"] = measure(
+                process_content_task,
+                [item.ingestion_data(str(message_id)).model_dump() for message_id, item in seeded],
+            )
+
+        if "views" in suites:
+            client = Client()
+            task = CourseTask.objects.order_by("id").first()
+            for path in view_paths or VIEW_PATHS:
+                if "{task_id}" in path:
+                    if task is None:
+                        continue
+                    path = path.format(task_id=task.id)
+                # The first request fills the caches the views rely on; it is not counted
+                client.get(path)
+                results[f"view {path}"] = measure(lambda url: _get(client, url), [path] * 10, repeat)
+    return results
+
+
+def _get(client: Client, path: str) -> None:
+    response = client.get(path)
+    if response.status_code >= 400:
+        raise RuntimeError(f"GET {path} returned {response.status_code}")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_report(results: Dict[str, Dict], **meta) -> Dict:
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "created_at": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            **meta,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 20.0,
+                    metric: str = "p50_ms") -> List[Dict]:
+    """
+    Per-benchmark change of `metric` between two reports, in percent.
+    Entries slower than the baseline by more than `threshold` are marked.
+    """
+    rows = []
+    for name, summary in current.get("results", {}).items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get(metric):
+            continue
+        change = (summary[metric] - before[metric]) / before[metric] * 100
+        rows.append({
+            "name": name,
+            "baseline": before[metric],
+            "current": summary[metric],
+            "change_pct": round(change, 1),
+            "regression": change > threshold,
+        })
+    return rows
@@ -0,0 +1,152 @@
+"""
+Circuit breakers for the LLM, embedding and Qdrant calls.
+
+Each call runs with the dependency's timeout and up to DEPENDENCY_RETRIES
+retries with full-jitter exponential backoff. After BREAKER_FAILURE_THRESHOLD
+failed calls within BREAKER_RESET_SECONDS the breaker opens: callers fail fast
+(heuristic analysis, no task matching) instead of waiting for timeouts. Once
+the reset time passes a single probe call is let through; its success closes
+the breaker. State lives in the shared cache, so every worker process sees
+the same breaker.
+"""
+import logging
+import random
+import time
+from typing import Callable, Dict, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEPENDENCIES = ("llm", "embedding", "qdrant")
+KEY_PREFIX = "breaker:"
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"Circuit breaker {name} is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+
+    def _key(self, suffix: str) -> str:
+        return f"{KEY_PREFIX}{self.name}:{suffix}"
+
+    @property
+    def timeout(self) -> float:
+        return settings.DEPENDENCY_TIMEOUTS[self.name]
+
+    @property
+    def retries(self) -> int:
+        return settings.DEPENDENCY_RETRIES[self.name]
+
+    def state(self) -> str:
+        try:
+            open_until = cache.get(self._key("open_until"))
+        except Exception:
+            return "closed"
+        if open_until is None:
+            return "closed"
+        return "open" if time.time() < open_until else "half_open"
+
+    def allow(self) -> bool:
+        """
+        False while open; after the reset time only one caller gets the probe.
+        """
+        state = self.state()
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        try:
+            return cache.add(self._key("probe"), 1, timeout=int(self.timeout * (self.retries + 1)) + 1)
+        except Exception:
+            return True
+
+    def record_success(self) -> None:
+        try:
+            # One read on the hot path; writes only when there is state to clear
+            stored = cache.get_many([self._key("failures"), self._key("open_until")])
+            if not stored:
+                return
+            if self._key("open_until") in stored:
+                logger.info(f"Circuit breaker {self.name} closed")
+                metrics.BREAKER_TRANSITIONS.labels(self.name, "closed").inc()
+            cache.delete_many([self._key("failures"), self._key("open_until"), self._key("probe")])
+        except Exception as e:
+            logger.warning(f"Failed to reset circuit breaker {self.name}: {e}")
+
+    def record_failure(self) -> None:
+        try:
+            failures_key = self._key("failures")
+            if not cache.add(failures_key, 1, timeout=settings.BREAKER_RESET_SECONDS):
+                try:
+                    cache.incr(failures_key)
+                except ValueError:
+                    cache.add(failures_key, 1, timeout=settings.BREAKER_RESET_SECONDS)
+            failures = cache.get(failures_key) or 1
+            # A failed probe reopens at once
+            if self.state() == "half_open" or failures >= settings.BREAKER_FAILURE_THRESHOLD:
+                cache.set(self._key("open_until"), time.time() + settings.BREAKER_RESET_SECONDS, timeout=None)
+                cache.delete(self._key("probe"))
+                logger.warning(f"Circuit breaker {self.name} opened after {failures} failures")
+                metrics.BREAKER_TRANSITIONS.labels(self.name, "open").inc()
+        except Exception as e:
+            logger.warning(f"Failed to update circuit breaker {self.name}: {e}")
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Calls `func` with retries; raises CircuitOpenError without calling it
+        while the breaker is open.
+        """
+        if not self.allow():
+            metrics.BREAKER_REJECTIONS.labels(self.name).inc()
+            raise CircuitOpenError(self.name)
+        for attempt in range(self.retries + 1):
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.retries:
+                    self.record_failure()
+                    raise
+                delay = backoff(attempt)
+                logger.info(f"{self.name} call failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+
+def backoff(attempt: int) -> float:
+    """
+    Full-jitter exponential backoff: uniform in [0, base * 2^attempt], capped.
+    """
+    return random.uniform(0, min(settings.BREAKER_BACKOFF_MAX, settings.BREAKER_BACKOFF_BASE * 2 ** attempt))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def combined_state(names) -> str:
+    """
+    "open" if any of the named breakers is open, else "half_open" if any is
+    half-open, else "closed".
+    """
+    states = {get(name).state() for name in names}
+    for state in ("open", "half_open"):
+        if state in states:
+            return state
+    return "closed"
@@ -0,0 +1,234 @@
+"""
+iCalendar (RFC 5545) deadline feeds built from the deadlines of active tasks.
+
+Each chat's VEVENT blocks are stored in its DeadlineFeed row; the global feed
+is the concatenation of the stored chat blocks, so a change in one chat only
+re-queries that chat's tasks.
+"""
+import hashlib
+import logging
+import re
+from datetime import date, timedelta, timezone as dt_timezone
+from typing import Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CourseTask, DeadlineFeed, KnowledgeEntry
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+PRODID = "-//SmartArg//Deadlines//RU"
+
+NUMERIC_DATE_PATTERN = re.compile(r"^\s*(\d{1,2})[./-](\d{1,2})(?:[./-](\d{2,4}))?\b")
+ISO_DATE_PATTERN = re.compile(r"^\s*(\d{4})-(\d{2})-(\d{2})")
+
+
+def chat_scope(chat_id: Optional[int]) -> str:
+    return f"chat:{chat_id}" if chat_id else "chat:none"
+
+
+def parse_deadline_date(text: str, reference: date) -> Optional[date]:
+    """
+    Parses "20.05.2024", "20.05.24", "20.05" and ISO dates. Dates without a
+    year take the reference year, or the next one if that would put them more
+    than half a year in the past. Relative dates ("relative: завтра") are skipped.
+    """
+    text = text or ""
+    try:
+        match = ISO_DATE_PATTERN.match(text)
+        if match:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+        match = NUMERIC_DATE_PATTERN.match(text)
+        if not match:
+            return None
+        day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+        if year:
+            year = int(year)
+            if year < 100:
+                year += 2000
+            return date(year, month, day)
+        candidate = date(reference.year, month, day)
+        if candidate < reference - timedelta(days=183):
+            candidate = date(reference.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+
+def _escape(text: str) -> str:
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """
+    Folds a content line to 75 octets as required by RFC 5545.
+    """
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    current = ""
+    for char in line:
+        limit = 75 if not parts else 74
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = char
+        else:
+            current += char
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def _task_deadlines(entries: Iterable[KnowledgeEntry]) -> List[Tuple[date, str]]:
+    deadlines = []
+    seen = set()
+    for entry in entries:
+        reference = entry.created_at.date() if entry.created_at else timezone.now().date()
+        candidates = []
+        if entry.entry_type == "deadline":
+            date_text, _, description = entry.content.partition(" - ")
+            candidates.append((date_text, description))
+        for item in (entry.metadata or {}).get("deadlines") or []:
+            if isinstance(item, dict):
+                candidates.append((str(item.get("date") or ""), str(item.get("description") or "")))
+
+        for date_text, description in candidates:
+            parsed = parse_deadline_date(date_text, reference)
+            if parsed is None or (parsed, description.strip()) in seen:
+                continue
+            seen.add((parsed, description.strip()))
+            deadlines.append((parsed, description.strip()))
+    return sorted(deadlines)
+
+
+def task_events(task: CourseTask, entries: Iterable[KnowledgeEntry]) -> str:
+    stamp = (task.updated_at or timezone.now()).astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    blocks = []
+    for deadline, description in _task_deadlines(entries):
+        uid_source = f"{task.id}:{deadline.isoformat()}:{description}"
+        uid = hashlib.sha1(uid_source.encode("utf-8")).hexdigest()[:16]
+        summary = f"{task.title}: {description}" if description else task.title
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:task-{task.id}-{uid}@smartarg",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{deadline.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(deadline + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{_escape(summary)}",
+            f"DESCRIPTION:{_escape(task.description or '')}",
+            "END:VEVENT",
+        ]
+        blocks.append("\r\n".join(_fold(line) for line in lines))
+    return "\r\n".join(blocks)
+
+
+def _wrap_calendar(events: str, name: str) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        _fold(f"X-WR-CALNAME:{_escape(name)}"),
+    ]
+    body = "\r\n".join(lines)
+    if events:
+        body += "\r\n" + events
+    return body + "\r\nEND:VCALENDAR\r\n"
+
+
+def _version(scope: str, chat_id: Optional[int]) -> int:
+    """
+    Version of the feed row before a rebuild reads the tasks. The row is
+    created if missing, so a concurrent mark_dirty() always has one to bump.
+    """
+    feed, _ = DeadlineFeed.objects.get_or_create(scope=scope, defaults={"chat_id": chat_id})
+    return feed.version
+
+
+def _store(scope: str, chat_id: Optional[int], events: str, content: str, version: int) -> DeadlineFeed:
+    """
+    Saves the rebuilt feed. It is marked clean only if no mark_dirty() bumped
+    the version since the rebuild started; otherwise the next read rebuilds again.
+    """
+    etag = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    fields = {"chat_id": chat_id, "events": events, "content": content, "etag": etag, "updated_at": timezone.now()}
+    feeds = DeadlineFeed.objects.filter(scope=scope)
+    if not feeds.filter(version=version).update(dirty=False, **fields):
+        logger.info(f"Deadline feed {scope} changed during the rebuild, keeping it dirty")
+        feeds.update(**fields)
+    return feeds.get()
+
+
+def rebuild_chat_feed(chat_id: Optional[int], version: Optional[int] = None) -> DeadlineFeed:
+    scope = chat_scope(chat_id)
+    if version is None:
+        version = _version(scope, chat_id)
+    tasks = list(
+        CourseTask.objects.filter(chat_id=chat_id, status="active").select_related("chat").order_by("id")
+    )
+    entries_by_task = {task.id: [] for task in tasks}
+    for entry in KnowledgeEntry.objects.filter(course_task__in=tasks).order_by("created_at"):
+        entries_by_task[entry.course_task_id].append(entry)
+
+    events = "\r\n".join(
+        block for block in (task_events(task, entries_by_task[task.id]) for task in tasks) if block
+    )
+    if not chat_id:
+        name = "SmartArg — задачи без чата"
+    elif tasks and tasks[0].chat.title:
+        name = f"SmartArg — {tasks[0].chat.title}"
+    else:
+        name = f"SmartArg — чат {chat_id}"
+    logger.info(f"Rebuilt deadline feed for {scope} ({len(tasks)} tasks)")
+    return _store(scope, chat_id, events, _wrap_calendar(events, name), version)
+
+
+def rebuild_global_feed(version: Optional[int] = None) -> DeadlineFeed:
+    if version is None:
+        version = _version(GLOBAL_SCOPE, None)
+    chat_ids = set(
+        CourseTask.objects.filter(status="active").values_list("chat_id", flat=True).distinct()
+    )
+    feeds = {feed.chat_id: feed for feed in DeadlineFeed.objects.exclude(scope=GLOBAL_SCOPE)}
+    blocks = []
+    for chat_id in sorted(chat_ids, key=lambda value: value or 0):
+        feed = feeds.get(chat_id)
+        if feed is None or feed.dirty:
+            feed = rebuild_chat_feed(chat_id, feed.version if feed else None)
+        if feed.events:
+            blocks.append(feed.events)
+    events = "\r\n".join(blocks)
+    return _store(GLOBAL_SCOPE, None, events, _wrap_calendar(events, "SmartArg — все дедлайны"), version)
+
+
+def get_feed(chat_id: Optional[int] = None, include_global: bool = False) -> DeadlineFeed:
+    """
+    Returns the stored feed, rebuilding it first only if it is missing or dirty.
+    """
+    scope = GLOBAL_SCOPE if include_global else chat_scope(chat_id)
+    feed = DeadlineFeed.objects.filter(scope=scope).first()
+    if feed is not None and not feed.dirty:
+        return feed
+    # Read outside the rebuild's transaction so concurrent marks see the row
+    version = feed.version if feed else _version(scope, None if include_global else chat_id)
+    with transaction.atomic():
+        if include_global:
+            return rebuild_global_feed(version)
+        return rebuild_chat_feed(chat_id, version)
+
+
+def mark_dirty(chat_id: Optional[int]) -> None:
+    DeadlineFeed.objects.filter(scope__in=[chat_scope(chat_id), GLOBAL_SCOPE]).update(
+        dirty=True, version=F("version") + 1
+    )
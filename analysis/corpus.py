@@ -0,0 +1,225 @@
+"""
+Seeded generator of synthetic Russian course-chat traffic for benchmarks.
+
+Messages mix teacher announcements, deadlines written in every format the
+heuristic extractor understands (DATE_PATTERN, RUS_MONTH_PATTERN and relative
+dates), links, student chatter and reply threads. The same seed always yields
+the same corpus, so timings from different commits are comparable.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from .schemas import IngestionData
+
+MONTH_FORMS = [
+    "января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа",
+    "сентября", "октября", "ноября", "декабря",
+]
+MONTH_ABBREVIATIONS = ["янв", "фев", "мар", "апр", "май", "июн", "июл", "авг", "сен", "сент", "окт", "ноя", "дек"]
+RELATIVE_DATES = [
+    "сегодня", "завтра", "послезавтра", "на следующей неделе", "на следующую неделю",
+    "следующий понедельник", "следующую среду", "следующую пятницу",
+]
+
+SUBJECTS = [
+    "Математический анализ", "Линейная алгебра", "Базы данных", "Операционные системы",
+    "Компьютерные сети", "Теория вероятностей", "Программирование на Python", "Физика",
+]
+WORKS = [
+    "лабораторная работа №{n}", "курсовая работа", "домашнее задание {n}", "контрольная работа {n}",
+    "реферат", "отчёт по практике", "коллоквиум", "проект",
+]
+LINK_HOSTS = ["https://disk.yandex.ru/d/", "https://github.com/course-", "https://moodle.example.edu/mod/",
+              "https://docs.google.com/document/d/"]
+
+DEADLINE_TEMPLATES = [
+    "Напоминаю: {work_lower} по курсу «{subject}» сдать до {date}.",
+    "Срок сдачи — {date}. {work} загружаем в Moodle.",
+    "Дедлайн ({work_lower}) переносится на {date}, успейте!",
+    "Внимание! {work} — сдать {date} до 23:59.",
+    "{work}: сдача {date}, защита на следующей паре.",
+]
+ANNOUNCEMENT_TEMPLATES = [
+    "Объявление: лекция по курсу «{subject}» переносится в ауд. {room}.",
+    "Важно! Завтрашнее занятие пройдёт онлайн, ссылка будет позже.",
+    "Расписание консультаций перед экзаменом по курсу «{subject}» обновлено.",
+    "Встреча с куратором сегодня в {hour}:00, явка обязательна.",
+    "Срочно: контрольная по курсу «{subject}» начнётся на 15 минут раньше.",
+]
+LINK_TEMPLATES = [
+    "Материалы к лекции: {link}",
+    "Методичка по {work_lower} здесь {link} (пароль у старосты).",
+    "Запись вчерашней пары: {link}, а также задачи: {link2}.",
+]
+QUESTION_TEMPLATES = [
+    "А {work_lower} можно сдать позже?",
+    "Подскажите, в каком формате оформлять {work_lower}?",
+    "Есть у кого-нибудь конспект по курсу «{subject}»?",
+    "Во сколько завтра пара?",
+    "Кто понял третье задание?",
+]
+REPLY_TEMPLATES = [
+    "Можно, но с понижением на балл.",
+    "Оформление по ГОСТу, шаблон в Moodle.",
+    "Да, отправил в личку.",
+    "Спасибо!",
+    "Пара в {hour}:00 как обычно.",
+]
+CHATTER = [
+    "Всем привет!", "ок", "Спасибо)", "кто идёт в столовую?", "У меня тоже не открывается",
+    "+", "Я опоздаю минут на 10", "Понял, спасибо",
+]
+
+
+@dataclass
+class CorpusChat:
+    tg_chat_id: int
+    title: str
+    teacher_id: int
+
+
+@dataclass
+class CorpusMessage:
+    chat: CorpusChat
+    tg_message_id: int
+    sender_id: int
+    sender_name: str
+    sender_role: str
+    text: str
+    sent_at: datetime
+    kind: str
+    reply_to_id: Optional[int] = None
+
+    def ingestion_data(self, source_id: str) -> IngestionData:
+        return IngestionData(
+            text=self.text,
+            source_type="telegram",
+            source_id=source_id,
+            metadata={
+                "sender_role": self.sender_role,
+                "chat_title": self.chat.title,
+                "is_reply": self.reply_to_id is not None,
+                "reply_to_msg_id": self.reply_to_id,
+                "tg_chat_id": self.chat.tg_chat_id,
+            },
+        )
+
+
+class CorpusGenerator:
+    """
+    Produces `messages` messages spread over `chats` chats. Roughly a third of
+    the traffic comes from the teacher; students ask questions that get threaded
+    replies, so reply-based task inheritance is exercised too.
+    """
+
+    KIND_WEIGHTS = {"deadline": 20, "announcement": 12, "link": 10, "question": 18, "reply": 15, "chatter": 25}
+
+    def __init__(self, seed: int = 42, chats: int = 5,
+                 start: datetime = datetime(2024, 9, 2, 9, 0, tzinfo=dt_timezone.utc)):
+        self.random = random.Random(seed)
+        self.start = start
+        self.chats = [
+            CorpusChat(
+                tg_chat_id=-1001000000000 - index,
+                title=f"{SUBJECTS[index % len(SUBJECTS)]} — группа {101 + index}",
+                teacher_id=5000 + index,
+            )
+            for index in range(chats)
+        ]
+
+    def date_text(self, moment: datetime) -> str:
+        """
+        One deadline date in a randomly chosen format.
+        """
+        target = moment + timedelta(days=self.random.randint(1, 40))
+        style = self.random.randrange(9)
+        if style == 0:
+            return target.strftime("%d.%m.%Y")
+        if style == 1:
+            return target.strftime("%d.%m.%y")
+        if style == 2:
+            return f"{target.day}.{target.month:02d}"
+        if style == 3:
+            return f"{target.day}/{target.month}"
+        if style == 4:
+            return f"{target.day}-{target.month:02d}-{target.year}"
+        if style == 5:
+            return f"{target.day} {MONTH_FORMS[target.month - 1]}"
+        if style == 6:
+            return f"{target.day} {MONTH_FORMS[target.month - 1]} {target.year}"
+        if style == 7:
+            return f"{target.day} {self.random.choice(MONTH_ABBREVIATIONS)}"
+        return self.random.choice(RELATIVE_DATES)
+
+    def _fill(self, template: str, moment: datetime) -> str:
+        work = self.random.choice(WORKS).format(n=self.random.randint(1, 8))
+        return template.format(
+            work=work[0].upper() + work[1:],
+            work_lower=work,
+            subject=self.random.choice(SUBJECTS),
+            date=self.date_text(moment),
+            room=self.random.randint(100, 520),
+            hour=self.random.randint(8, 18),
+            link=self.random.choice(LINK_HOSTS) + f"{self.random.getrandbits(40):x}",
+            link2=self.random.choice(LINK_HOSTS) + f"{self.random.getrandbits(40):x}",
+        )
+
+    def generate(self, messages: int = 500) -> List[CorpusMessage]:
+        kinds = list(self.KIND_WEIGHTS)
+        weights = list(self.KIND_WEIGHTS.values())
+        next_id = {chat.tg_chat_id: 1 for chat in self.chats}
+        questions: Dict[int, List[int]] = {chat.tg_chat_id: [] for chat in self.chats}
+        corpus = []
+        moment = self.start
+
+        for _ in range(messages):
+            moment += timedelta(seconds=self.random.randint(5, 1800))
+            chat = self.random.choice(self.chats)
+            kind = self.random.choices(kinds, weights)[0]
+            if kind == "reply" and not questions[chat.tg_chat_id]:
+                kind = "question"
+
+            reply_to = None
+            if kind in ("deadline", "announcement", "link", "reply"):
+                sender_id, sender_name, role = chat.teacher_id, "Преподаватель", "teacher"
+            else:
+                student = self.random.randint(1, 30)
+                sender_id, sender_name, role = 100000 + student, f"Студент {student}", "student"
+
+            if kind == "deadline":
+                text = self._fill(self.random.choice(DEADLINE_TEMPLATES), moment)
+            elif kind == "announcement":
+                text = self._fill(self.random.choice(ANNOUNCEMENT_TEMPLATES), moment)
+            elif kind == "link":
+                text = self._fill(self.random.choice(LINK_TEMPLATES), moment)
+            elif kind == "question":
+                text = self._fill(self.random.choice(QUESTION_TEMPLATES), moment)
+            elif kind == "reply":
+                reply_to = self.random.choice(questions[chat.tg_chat_id][-5:])
+                text = self._fill(self.random.choice(REPLY_TEMPLATES), moment)
+            else:
+                text = self.random.choice(CHATTER)
+
+            tg_message_id = next_id[chat.tg_chat_id]
+            next_id[chat.tg_chat_id] += 1
+            if kind == "question":
+                questions[chat.tg_chat_id].append(tg_message_id)
+
+            corpus.append(CorpusMessage(
+                chat=chat,
+                tg_message_id=tg_message_id,
+                sender_id=sender_id,
+                sender_name=sender_name,
+                sender_role=role,
+                text=text,
+                sent_at=moment,
+                kind=kind,
+                reply_to_id=reply_to,
+            ))
+        return corpus
+
+
+def generate_corpus(seed: int = 42, messages: int = 500, chats: int = 5) -> List[CorpusMessage]:
+    return CorpusGenerator(seed=seed, chats=chats).generate(messages)
@@ -0,0 +1,36 @@
+"""Process-independent counters kept in the Django cache (Redis in production)."""
+import logging
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "counters:"
+
+
+def increment(name: str, amount: int = 1) -> None:
+    key = f"{KEY_PREFIX}{name}"
+    try:
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Key does not exist yet; add() is atomic so concurrent workers do not reset it
+            if not cache.add(key, amount, timeout=None):
+                cache.incr(key, amount)
+    except Exception as e:
+        logger.warning(f"Failed to increment counter {name}: {e}")
+
+
+def get_counts(names: Iterable[str]) -> Dict[str, int]:
+    names = list(names)
+    try:
+        values = cache.get_many([f"{KEY_PREFIX}{name}" for name in names])
+    except Exception as e:
+        logger.warning(f"Failed to read counters: {e}")
+        values = {}
+    return {name: int(values.get(f"{KEY_PREFIX}{name}") or 0) for name in names}
+
+
+def reset(names: Iterable[str]) -> None:
+    cache.delete_many([f"{KEY_PREFIX}{name}" for name in names])
@@ -0,0 +1,92 @@
+"""
+Live dashboard events.
+
+Workers publish a JSON message to Redis pub/sub once the transaction that
+produced it commits; web.sse streams the channel to browsers as server-sent
+events. Publishing is best effort: a missing Redis never fails a task.
+"""
+import json
+import logging
+from typing import Callable, Dict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import stats
+from .models import AnalysisResult, CourseTask
+
+logger = logging.getLogger(__name__)
+
+# Shared with the dashboard's "recent alerts" query
+ALERT_IMPORTANCE = 6
+ALERT_CATEGORIES = ("deadline", "announcement")
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(settings.EVENTS_REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def is_alert(category: str, importance: int) -> bool:
+    return importance >= ALERT_IMPORTANCE or category in ALERT_CATEGORIES
+
+
+def _send(event_type: str, build: Callable[[], Dict]) -> None:
+    try:
+        message = json.dumps({"type": event_type, "data": build()}, cls=DjangoJSONEncoder, ensure_ascii=False)
+        _redis().publish(settings.EVENTS_CHANNEL, message)
+    except Exception as e:
+        logger.warning(f"Failed to publish {event_type} event: {e}")
+
+
+def publish(event_type: str, build: Callable[[], Dict]) -> None:
+    """
+    Publishes the payload returned by build() after the current transaction
+    commits, so listeners never see rolled back rows.
+    """
+    if not settings.EVENTS_REDIS_URL:
+        return
+    transaction.on_commit(lambda: _send(event_type, build))
+
+
+def analysis_saved(result: AnalysisResult) -> None:
+    def build():
+        message = result.message
+        totals = stats.dashboard_totals()
+        return {
+            "id": result.id,
+            "summary": (result.summary or message.text or "")[:120],
+            "chat": message.chat.title or "Без названия",
+            "category": result.category,
+            "category_display": result.get_category_display(),
+            "importance": result.importance_score,
+            "alert": is_alert(result.category, result.importance_score),
+            "totals": {
+                "total_messages": totals["total_messages"],
+                "total_knowledge": totals["total_knowledge"],
+                "avg_importance": round(totals["avg_importance"], 2),
+            },
+        }
+
+    publish("analysis", build)
+
+
+def task_created(task: CourseTask) -> None:
+    publish("task_created", lambda: {"id": task.id, "title": task.title, "chat_id": task.chat_id})
+
+
+def task_status_changed(task: CourseTask, old_status: str) -> None:
+    publish("task_status", lambda: {
+        "id": task.id,
+        "title": task.title,
+        "old_status": old_status,
+        "status": task.status,
+        "status_display": task.get_status_display(),
+    })
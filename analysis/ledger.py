@@ -0,0 +1,178 @@
+"""
+Append-only ledger of LLM and embedding calls (LLMCall rows).
+
+Calls made while a task is collected (the @collected decorator on
+process_content_task) are buffered and written in one bulk insert when the
+task ends, linked to the AnalysisResult and chat the task saved. Calls outside
+a collected task are written one by one. The admin report aggregates the
+ledger per chat and day to size the Ollama hardware and compare prompt
+versions.
+"""
+import functools
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_OUTCOMES = ("invalid_json", "error", "heuristic")
+
+
+@dataclass
+class Batch:
+    source_type: str = ""
+    calls: List[Dict] = field(default_factory=list)
+    analysis_result_id: Optional[int] = None
+    chat_id: Optional[int] = None
+
+
+_batch: ContextVar[Optional[Batch]] = ContextVar("ledger_batch", default=None)
+
+
+def enabled() -> bool:
+    return settings.LLM_LEDGER_ENABLED
+
+
+def record(kind: str, model: str, outcome: str, latency_ms: float = 0.0, prompt_version: str = "",
+           source_type: str = "", input_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+           tier: str = "") -> None:
+    if not enabled():
+        return
+    batch = _batch.get()
+    call = {
+        "kind": kind,
+        "model": model or "",
+        "outcome": outcome,
+        "latency_ms": round(latency_ms, 1),
+        "prompt_version": prompt_version,
+        "tier": tier,
+        "source_type": source_type or (batch.source_type if batch else ""),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "created_at": timezone.now(),
+    }
+    if batch is not None:
+        batch.calls.append(call)
+    else:
+        _write([call])
+
+
+def link(analysis_result) -> None:
+    """
+    Links the calls of the current task to the AnalysisResult it saved.
+    """
+    batch = _batch.get()
+    if batch is not None:
+        batch.analysis_result_id = analysis_result.pk
+        batch.chat_id = analysis_result.message.chat_id
+
+
+def _write(calls: List[Dict], analysis_result_id: Optional[int] = None, chat_id: Optional[int] = None) -> None:
+    from .models import LLMCall
+
+    if not calls:
+        return
+    try:
+        try:
+            LLMCall.objects.bulk_create([
+                LLMCall(**call, analysis_result_id=analysis_result_id, chat_id=chat_id) for call in calls
+            ])
+        except IntegrityError:
+            # The linked result was rolled back; keep the calls without it
+            LLMCall.objects.bulk_create([LLMCall(**call) for call in calls])
+    except Exception as e:
+        logger.warning(f"Failed to write {len(calls)} LLM ledger records: {e}")
+
+
+def collected(func):
+    """
+    Decorator for tasks taking a serialized IngestionData: buffers the calls
+    made during the task and writes them when it returns.
+    """
+    @functools.wraps(func)
+    def wrapper(payload, *args, **kwargs):
+        if not enabled():
+            return func(payload, *args, **kwargs)
+        source_type = payload.get("source_type", "") if isinstance(payload, dict) else ""
+        batch = Batch(source_type=source_type or "")
+        token = _batch.set(batch)
+        try:
+            return func(payload, *args, **kwargs)
+        finally:
+            _batch.reset(token)
+            _write(batch.calls, batch.analysis_result_id, batch.chat_id)
+    return wrapper
+
+
+def prune(days: int) -> int:
+    from .models import LLMCall
+
+    deleted, _ = LLMCall.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+def _with_rates(row: Dict) -> Dict:
+    llm_seconds = (row.pop("llm_ms") or 0) / 1000
+    row["llm_seconds"] = round(llm_seconds, 1)
+    row["input_tokens"] = row["input_tokens"] or 0
+    row["output_tokens"] = row["output_tokens"] or 0
+    # Generation throughput while the model was busy, the number to size hardware by
+    row["output_tokens_per_second"] = round(row["output_tokens"] / llm_seconds, 1) if llm_seconds else None
+    row["avg_latency_ms"] = round(row["avg_latency_ms"], 1) if row["avg_latency_ms"] is not None else None
+    return row
+
+
+def _aggregates() -> Dict:
+    is_llm = Q(kind="llm")
+    answered = is_llm & ~Q(outcome="heuristic")
+    return {
+        "calls": Count("id"),
+        "llm_calls": Count("id", filter=answered),
+        "embedding_calls": Count("id", filter=Q(kind="embedding") & ~Q(outcome="cache_hit")),
+        "cache_hits": Count("id", filter=Q(outcome="cache_hit")),
+        "fallbacks": Count("id", filter=is_llm & Q(outcome__in=FALLBACK_OUTCOMES)),
+        "input_tokens": Sum("input_tokens", filter=is_llm),
+        "output_tokens": Sum("output_tokens", filter=is_llm),
+        "llm_ms": Sum("latency_ms", filter=answered),
+        "avg_latency_ms": Avg("latency_ms", filter=answered),
+    }
+
+
+def daily_report(days: int = 14) -> List[Dict]:
+    """
+    Calls, tokens and LLM time per chat and day, newest first.
+    """
+    from .models import LLMCall
+
+    rows = (
+        LLMCall.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+        .annotate(day=TruncDate("created_at"))
+        .values("day", "chat_id", chat_title=F("chat__title"))
+        .annotate(**_aggregates())
+        .order_by("-day", "-calls")
+    )
+    return [_with_rates(row) for row in rows]
+
+
+def prompt_version_report(days: int = 14) -> List[Dict]:
+    """
+    The same aggregates per routing tier, model and prompt version, to
+    compare prompt changes and the classifier against the extractor.
+    """
+    from .models import LLMCall
+
+    rows = (
+        LLMCall.objects.filter(kind="llm", created_at__gte=timezone.now() - timedelta(days=days))
+        .values("tier", "model", "prompt_version")
+        .annotate(**_aggregates())
+        .order_by("tier", "model", "prompt_version")
+    )
+    return [_with_rates(row) for row in rows]
@@ -0,0 +1,91 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from analysis.benchmark import SUITES, build_report, compare_results, run_benchmarks
+from analysis.corpus import generate_corpus
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the analysis pipeline and web views on a seeded synthetic corpus "
+        "(fake LLM, in-memory vector store, throwaway test database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--messages", type=int, default=500, help="Corpus size.")
+        parser.add_argument("--chats", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus for the pure-Python suites.")
+        parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+        parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated LLM latency in seconds.")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--compare", help="Baseline JSON report to compare against.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=20.0,
+            help="Fail when a benchmark's p50 is this many percent slower than the baseline.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"], encoding="utf-8") as fp:
+                    baseline = json.load(fp)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+
+        corpus = generate_corpus(seed=options["seed"], messages=options["messages"], chats=options["chats"])
+
+        # The pipeline and views suites write rows, so they never touch the real database
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            results = run_benchmarks(
+                corpus,
+                suites=options["suites"],
+                repeat=options["repeat"],
+                llm_latency=options["llm_latency"],
+            )
+            report = build_report(
+                results,
+                seed=options["seed"],
+                messages=options["messages"],
+                chats=options["chats"],
+                repeat=options["repeat"],
+                llm_latency=options["llm_latency"],
+            )
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        body = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fp:
+                fp.write(body + "\n")
+            for name, summary in results.items():
+                self.stdout.write(
+                    f"{name:<40} p50 {summary['p50_ms']:9.3f} ms  p95 {summary['p95_ms']:9.3f} ms  "
+                    f"{summary['ops_per_sec']:10.1f} ops/s"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(body)
+
+        if baseline is None:
+            return
+        # Keep stdout valid JSON when the report itself is printed there
+        out = self.stdout if options["output"] else self.stderr
+        regressions = []
+        for row in compare_results(baseline, report, threshold=options["threshold"]):
+            line = f"{row['name']:<40} {row['baseline']:9.3f} -> {row['current']:9.3f} ms ({row['change_pct']:+.1f}%)"
+            if row["regression"]:
+                regressions.append(row["name"])
+                out.write(self.style.ERROR(line))
+            else:
+                out.write(line)
+        if regressions:
+            raise CommandError(f"Slower than baseline by more than {options['threshold']:.0f}%: {', '.join(regressions)}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from analysis import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute dashboard statistics from messages, analysis results and knowledge entries'
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        totals = stats.dashboard_totals()
+        self.stdout.write(self.style.SUCCESS(
+            f"Statistics rebuilt: {totals['total_messages']} messages, "
+            f"{totals['total_knowledge']} knowledge entries."
+        ))
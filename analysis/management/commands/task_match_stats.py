@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from analysis import counters
+from analysis.tasks import MATCH_COUNTERS
+
+
+class Command(BaseCommand):
+    help = 'Show how task candidates were resolved (lexical / semantic / new task)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after printing them.",
+        )
+
+    def handle(self, *args, **options):
+        counts = counters.get_counts(MATCH_COUNTERS)
+        total = sum(counts.values())
+
+        for name in MATCH_COUNTERS:
+            share = (counts[name] / total * 100) if total else 0
+            self.stdout.write(f"{name}: {counts[name]} ({share:.1f}%)")
+        self.stdout.write(f"total: {total}")
+
+        if options["reset"]:
+            counters.reset(MATCH_COUNTERS)
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,101 @@
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.benchmark import percentile
+from analysis.tracing import load_spans
+
+# A trace is complete once the worker has processed the message
+WORKER_SPAN = "process_content_task"
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.5), 1),
+        "p95_ms": round(percentile(values, 0.95), 1),
+        "p99_ms": round(percentile(values, 0.99), 1),
+        "max_ms": round(percentile(values, 1.0), 1),
+    }
+
+
+def summarize_traces(spans: List[Dict]) -> Dict:
+    """
+    End-to-end latency (first span start to last span end) per chat for
+    complete traces, and span durations per stage.
+    """
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+
+    by_chat = defaultdict(list)
+    by_stage = defaultdict(list)
+    for trace_spans in traces.values():
+        if not any(span["name"] == WORKER_SPAN for span in trace_spans):
+            continue
+        chat_id = next(
+            (span["attributes"].get("chat_id") for span in trace_spans if span.get("attributes", {}).get("chat_id")),
+            None,
+        )
+        start = min(span["start_ns"] for span in trace_spans)
+        end = max(span["end_ns"] for span in trace_spans)
+        by_chat[str(chat_id)].append((end - start) / 1e6)
+        for span in trace_spans:
+            by_stage[span["name"]].append((span["end_ns"] - span["start_ns"]) / 1e6)
+
+    return {
+        "traces": len(traces),
+        "complete": sum(len(values) for values in by_chat.values()),
+        "end_to_end": _stats([value for values in by_chat.values() for value in values]),
+        "chats": {chat_id: _stats(values) for chat_id, values in sorted(by_chat.items())},
+        "stages": {name: _stats(values) for name, values in sorted(by_stage.items())},
+    }
+
+
+class Command(BaseCommand):
+    help = "End-to-end latency percentiles per chat and per stage from exported trace spans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=str(settings.TRACING_FILE),
+            help="JSONL spans (TRACING_EXPORTER=jsonl) or an OTLP collector file export.",
+        )
+        parser.add_argument("--chat", help="Only traces of this Telegram chat id.")
+        parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["file"], encoding="utf-8") as fp:
+                spans = load_spans(fp)
+        except OSError as e:
+            raise CommandError(f"Cannot read spans: {e}")
+
+        if options["chat"]:
+            trace_ids = {
+                span["trace_id"] for span in spans
+                if str(span.get("attributes", {}).get("chat_id")) == options["chat"]
+            }
+            spans = [span for span in spans if span["trace_id"] in trace_ids]
+
+        summary = summarize_traces(spans)
+        if options["json"]:
+            self.stdout.write(json.dumps(summary, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{summary['complete']} complete traces of {summary['traces']}"
+        ))
+        rows = [("all chats", summary["end_to_end"])] + [
+            (f"chat {chat_id}", values) for chat_id, values in summary["chats"].items()
+        ]
+        rows += [(f"  {name}", values) for name, values in summary["stages"].items()]
+        for label, values in rows:
+            self.stdout.write(
+                f"{label:<28} n={values['count']:<6} p50 {values['p50_ms']:9.1f} ms  "
+                f"p95 {values['p95_ms']:9.1f} ms  p99 {values['p99_ms']:9.1f} ms  max {values['max_ms']:9.1f} ms"
+            )
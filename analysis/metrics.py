@@ -0,0 +1,172 @@
+"""
+Prometheus metrics for the analysis pipeline.
+
+The web app serves them at /metrics and each Celery worker starts its own
+exporter on METRICS_WORKER_PORT, so a local Prometheus can scrape both without
+a push gateway. Prefork worker children write to PROMETHEUS_MULTIPROC_DIR when
+it is set; the exporter then aggregates every child's files on each scrape.
+"""
+import logging
+import os
+
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from .queues import queue_depth
+
+logger = logging.getLogger(__name__)
+
+# LLM calls on a local model take seconds to minutes, DB writes milliseconds
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "smartarg_stage_duration_seconds",
+    "Duration of one analysis stage: llm, embedding, vector_search, vector_upsert, persist",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+HEURISTIC_FALLBACKS = Counter(
+    "smartarg_heuristic_fallbacks",
+    "Analyses answered by the heuristic instead of the LLM, by reason",
+    ["reason"],
+)
+INVALID_JSON = Counter("smartarg_llm_invalid_json", "LLM answers that could not be parsed as JSON")
+TASK_MATCHES = Counter(
+    "smartarg_task_matches",
+    "How task candidates were resolved: lexical, semantic (vector match) or created",
+    ["method"],
+)
+TIER_SECONDS = Histogram(
+    "smartarg_llm_tier_duration_seconds",
+    "Duration of one analysis tier by model: classifier (model or heuristic), extractor, or single without routing",
+    ["tier", "model"],
+    buckets=STAGE_BUCKETS,
+)
+ROUTING_DECISIONS = Counter(
+    "smartarg_routing_decisions",
+    "Two-tier routing outcomes by source type: extractor or skipped",
+    ["source_type", "route"],
+)
+MODEL_READY = Gauge(
+    "smartarg_model_ready",
+    "1 when the last warm-up loaded the Ollama model, 0 when it failed",
+    ["model"],
+    multiprocess_mode="livemax",
+)
+MODEL_WARMUP_SECONDS = Histogram(
+    "smartarg_model_warmup_duration_seconds",
+    "Duration of a warm-up or keep-alive request per model",
+    ["model"],
+    buckets=STAGE_BUCKETS,
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "smartarg_model_cold_start_seconds",
+    "Model load time reported by Ollama when the model was not loaded",
+    ["model"],
+    buckets=STAGE_BUCKETS,
+)
+MODEL_COLD_STARTS = Counter("smartarg_model_cold_starts", "Warm-ups that had to load the model", ["model"])
+WARMUP_WAIT_SECONDS = Histogram(
+    "smartarg_warmup_wait_seconds",
+    "Time a task waited for the models to become warm",
+    buckets=STAGE_BUCKETS,
+)
+CACHE_REQUESTS = Counter("smartarg_cache_requests", "Cache lookups by cache and result", ["cache", "result"])
+VECTOR_ERRORS = Counter("smartarg_vector_errors", "Failed embedding or Qdrant calls", ["operation"])
+TIME_TO_ANALYSIS = Histogram(
+    "smartarg_time_to_analysis_seconds",
+    "Time from enqueue to saved analysis by priority class: urgent, live, bulk",
+    ["priority"],
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 4 * 3600),
+)
+SLO_BREACHES = Counter(
+    "smartarg_analysis_slo_breaches", "Analyses slower than ANALYSIS_SLO_SECONDS of their priority class", ["priority"]
+)
+BREAKER_TRANSITIONS = Counter(
+    "smartarg_breaker_transitions",
+    "Circuit breaker state changes by dependency and new state",
+    ["dependency", "state"],
+)
+BREAKER_REJECTIONS = Counter(
+    "smartarg_breaker_rejections", "Calls skipped because the dependency's breaker was open", ["dependency"]
+)
+
+
+def timed(stage: str):
+    """
+    Context manager observing the duration of `stage` in STAGE_SECONDS.
+    """
+    return STAGE_SECONDS.labels(stage).time()
+
+
+def cache_lookup(cache_name: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache_name, "hit" if hit else "miss").inc()
+
+
+class QueueDepthCollector:
+    """
+    Reads broker queue lengths at scrape time instead of storing a gauge.
+    """
+
+    def collect(self):
+        gauge = GaugeMetricFamily("smartarg_queue_depth", "Messages waiting in the broker queue", labels=["queue"])
+        for queue in settings.METRICS_QUEUES:
+            gauge.add_metric([queue], queue_depth(queue))
+        yield gauge
+
+
+class BreakerStateCollector:
+    """
+    Reads the shared circuit breaker states at scrape time: 0 closed, 1 open,
+    0.5 half-open.
+    """
+
+    VALUES = {"closed": 0, "half_open": 0.5, "open": 1}
+
+    def collect(self):
+        from . import breakers
+
+        gauge = GaugeMetricFamily("smartarg_breaker_state", "Circuit breaker state per dependency", labels=["dependency"])
+        for name in breakers.DEPENDENCIES:
+            gauge.add_metric([name], self.VALUES[breakers.get(name).state()])
+        yield gauge
+
+
+class _ProcessCollector:
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def registry() -> CollectorRegistry:
+    registry = CollectorRegistry()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(_ProcessCollector())
+    registry.register(QueueDepthCollector())
+    registry.register(BreakerStateCollector())
+    return registry
+
+
+def render() -> bytes:
+    return generate_latest(registry())
+
+
+def start_worker_exporter() -> None:
+    from prometheus_client import start_http_server
+
+    port = settings.METRICS_WORKER_PORT
+    if not port:
+        return
+    try:
+        start_http_server(port, registry=registry())
+        logger.info(f"Worker metrics exporter listening on :{port}")
+    except OSError as e:
+        # Another worker on this host already owns the port
+        logger.warning(f"Worker metrics exporter not started on :{port}: {e}")
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_tasks(apps, schema_editor):
+    from analysis.task_matching import normalize_task_title
+
+    CourseTask = apps.get_model('analysis', 'CourseTask')
+    KnowledgeEntry = apps.get_model('analysis', 'KnowledgeEntry')
+    for task in CourseTask.objects.all().iterator():
+        task.normalized_title = normalize_task_title(task.title)
+        first_entry = (
+            KnowledgeEntry.objects.filter(course_task_id=task.id)
+            .select_related('source_message')
+            .order_by('created_at')
+            .first()
+        )
+        if first_entry:
+            task.chat_id = first_entry.source_message.chat_id
+        task.save(update_fields=['normalized_title', 'chat'])
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS coursetask_title_trgm_idx "
+        "ON analysis_coursetask USING gin (normalized_title gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS coursetask_title_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_message_reply_to_id'),
+        ('analysis', '0004_coursetask_status_coursetask_task_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursetask',
+            name='chat',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='core.chat'),
+        ),
+        migrations.AddField(
+            model_name='coursetask',
+            name='normalized_title',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='coursetask',
+            index=models.Index(fields=['chat', 'normalized_title'], name='coursetask_chat_title_idx'),
+        ),
+        migrations.RunPython(backfill_tasks, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
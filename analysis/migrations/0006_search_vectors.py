@@ -0,0 +1,48 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = [
+    (
+        'analysis_knowledgeentry',
+        "to_tsvector('russian', coalesce(content, ''))",
+    ),
+    (
+        'analysis_coursetask',
+        "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(description, '')), 'B')",
+    ),
+]
+
+
+def add_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, expression in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({expression}) STORED"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (search_vector)"
+        )
+
+
+def drop_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, _ in SEARCH_COLUMNS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+        schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text search columns for web.search (Postgres only, see core 0004).
+    """
+
+    dependencies = [
+        ('analysis', '0005_coursetask_chat_normalized_title'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vectors, drop_search_vectors),
+    ]
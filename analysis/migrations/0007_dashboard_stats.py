@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def populate_stats(apps, schema_editor):
+    Chat = apps.get_model('core', 'Chat')
+    Message = apps.get_model('core', 'Message')
+    AnalysisResult = apps.get_model('analysis', 'AnalysisResult')
+    KnowledgeEntry = apps.get_model('analysis', 'KnowledgeEntry')
+    ChatStats = apps.get_model('analysis', 'ChatStats')
+    CategoryStats = apps.get_model('analysis', 'CategoryStats')
+
+    messages = dict(Message.objects.values('chat_id').annotate(total=Count('id')).values_list('chat_id', 'total'))
+    knowledge = dict(
+        KnowledgeEntry.objects.values('source_message__chat_id')
+        .annotate(total=Count('id'))
+        .values_list('source_message__chat_id', 'total')
+    )
+    analyses = {
+        row['message__chat_id']: row
+        for row in AnalysisResult.objects.values('message__chat_id').annotate(
+            total=Count('id'), importance=Sum('importance_score')
+        )
+    }
+    ChatStats.objects.bulk_create([
+        ChatStats(
+            chat_id=chat_id,
+            message_count=messages.get(chat_id, 0),
+            knowledge_count=knowledge.get(chat_id, 0),
+            analysis_count=analyses.get(chat_id, {}).get('total', 0),
+            importance_sum=analyses.get(chat_id, {}).get('importance') or 0,
+        )
+        for chat_id in Chat.objects.values_list('id', flat=True)
+    ])
+    CategoryStats.objects.bulk_create([
+        CategoryStats(category=row['category'], count=row['total'], importance_sum=row['importance'] or 0)
+        for row in AnalysisResult.objects.values('category').annotate(
+            total=Count('id'), importance=Sum('importance_score')
+        )
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_message_search_vector'),
+        ('analysis', '0006_search_vectors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('announcement', 'Announcement'), ('deadline', 'Deadline'), ('link', 'Link'), ('other', 'Other')], max_length=50, unique=True)),
+                ('count', models.IntegerField(default=0)),
+                ('importance_sum', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChatStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_count', models.IntegerField(db_index=True, default=0)),
+                ('knowledge_count', models.IntegerField(default=0)),
+                ('analysis_count', models.IntegerField(default=0)),
+                ('importance_sum', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chat', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='core.chat')),
+            ],
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0007_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatstats',
+            name='message_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chatstats',
+            index=models.Index(fields=['-message_count', 'chat'], name='chatstats_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursetask',
+            index=models.Index(fields=['-updated_at', '-id'], name='coursetask_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursetask',
+            index=models.Index(fields=['status', '-updated_at', '-id'], name='coursetask_status_updated_idx'),
+        ),
+    ]
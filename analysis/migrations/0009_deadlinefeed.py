@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_message_search_vector'),
+        ('analysis', '0008_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadlineFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64, unique=True)),
+                ('events', models.TextField(blank=True, default='')),
+                ('content', models.TextField(blank=True, default='')),
+                ('etag', models.CharField(blank=True, default='', max_length=64)),
+                ('dirty', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chat', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deadline_feeds', to='core.chat')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0009_deadlinefeed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilingSwitch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enabled', models.BooleanField(default=True)),
+                ('sample_rate', models.FloatField(default=0.05, help_text='Fraction of calls to profile, 0..1')),
+                ('target', models.CharField(choices=[('all', 'Tasks and web requests'), ('tasks', 'process_content_task'), ('views', 'Web requests')], default='all', max_length=10)),
+                ('output_format', models.CharField(choices=[('pstats', 'cProfile (pstats)'), ('collapsed', 'Collapsed stacks (flamegraph)')], default='pstats', max_length=10)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Profiling stops by itself after this time', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_message_search_vector'),
+        ('analysis', '0010_profilingswitch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('llm', 'LLM'), ('embedding', 'Embedding')], max_length=10)),
+                ('model', models.CharField(max_length=100)),
+                ('prompt_version', models.CharField(blank=True, default='', max_length=16)),
+                ('source_type', models.CharField(blank=True, default='', max_length=20)),
+                ('outcome', models.CharField(choices=[('ok', 'OK'), ('invalid_json', 'Invalid JSON'), ('error', 'Exception'), ('heuristic', 'Heuristic (no client)'), ('cache_hit', 'Cache hit')], max_length=20)),
+                ('input_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('output_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('latency_ms', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('analysis_result', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_calls', to='analysis.analysisresult')),
+                ('chat', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_calls', to='core.chat')),
+            ],
+        ),
+    ]
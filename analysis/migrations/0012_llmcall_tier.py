@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0011_llmcall'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmcall',
+            name='tier',
+            field=models.CharField(blank=True, choices=[('', 'Single model'), ('classifier', 'Classifier'), ('extractor', 'Extractor')], default='', max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0012_llmcall_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='degraded',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='degraded_reason',
+            field=models.CharField(blank=True, default='', help_text='Failed dependencies: llm, embedding, qdrant', max_length=50),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def backfill_updated_at(apps, schema_editor):
+    AnalysisResult = apps.get_model('analysis', 'AnalysisResult')
+    AnalysisResult.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0013_analysisresult_degraded'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='analysisresult',
+            index=models.Index(fields=['updated_at', 'id'], name='analysisresult_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0003_ingestion_sources'),
+        ('analysis', '0014_analysisresult_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(max_length=20)),
+                ('source_id', models.CharField(max_length=600)),
+                ('category', models.CharField(choices=[('announcement', 'Announcement'), ('deadline', 'Deadline'), ('link', 'Link'), ('other', 'Other')], default='other', max_length=50)),
+                ('importance_score', models.IntegerField(default=0, help_text='Score from 0 to 10')),
+                ('summary', models.TextField(blank=True, default='')),
+                ('extracted_links', models.JSONField(blank=True, default=list)),
+                ('extracted_deadlines', models.JSONField(blank=True, default=list)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('degraded', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='analyses', to='ingestion.ingesteddocument')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sourceanalysis',
+            constraint=models.UniqueConstraint(fields=('source_type', 'source_id'), name='sourceanalysis_source_uniq'),
+        ),
+    ]
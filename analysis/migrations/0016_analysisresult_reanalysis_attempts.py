@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0015_sourceanalysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='reanalysis_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0016_analysisresult_reanalysis_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deadlinefeed',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0017_deadlinefeed_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resource', 'deleted_at', 'id'], name='deletedrecord_sync_idx'), models.Index(fields=['deleted_at'], name='deletedrecord_prune_idx')],
+            },
+        ),
+    ]
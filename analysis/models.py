@@ -1,5 +1,5 @@
 from django.db import models
-from core.models import Message
+from core.models import Chat, Message
 
 class AnalysisResult(models.Model):
     CATEGORIES = [
@@ -15,12 +15,55 @@ class AnalysisResult(models.Model):
     summary = models.TextField(blank=True, null=True)
     extracted_links = models.JSONField(default=list, blank=True)
     extracted_deadlines = models.JSONField(default=list, blank=True)
+    # Analyzed while a dependency was down (heuristic result, no task matching);
+    # re-analyzed by the reanalyze_degraded task once it is back
+    degraded = models.BooleanField(default=False, db_index=True)
+    degraded_reason = models.CharField(max_length=50, blank=True, default='', help_text="Failed dependencies: llm, embedding, qdrant")
+    # Re-analyses queued for this result; capped at REANALYSIS_MAX_ATTEMPTS
+    reanalysis_attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Results are rewritten by re-analysis and reprocess runs; the API syncs on this
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='analysisresult_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Analysis of Msg {self.message_id} ({self.category})"
 
 
+class SourceAnalysis(models.Model):
+    """
+    Analysis of an item from a non-Telegram source (a document section or a
+    web schedule section), keyed by the item's source id so re-ingesting the
+    same item overwrites it.
+    """
+    source_type = models.CharField(max_length=20)
+    source_id = models.CharField(max_length=600)
+    document = models.ForeignKey(
+        'ingestion.IngestedDocument', on_delete=models.CASCADE, null=True, blank=True, related_name='analyses'
+    )
+    category = models.CharField(max_length=50, choices=AnalysisResult.CATEGORIES, default='other')
+    importance_score = models.IntegerField(default=0, help_text="Score from 0 to 10")
+    summary = models.TextField(blank=True, default='')
+    extracted_links = models.JSONField(default=list, blank=True)
+    extracted_deadlines = models.JSONField(default=list, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    degraded = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_type', 'source_id'], name='sourceanalysis_source_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Analysis of {self.source_id} ({self.category})"
+
+
 class CourseTask(models.Model):
     """
     Represents a distinct task or topic identified from the chat.
@@ -47,6 +90,28 @@ class CourseTask(models.Model):
     # Stores the vector ID from Qdrant to easily sync or specific metadata
     vector_id = models.CharField(max_length=255, blank=True, null=True)
 
+    # Chat the task was first detected in and its lexical key, used to match
+    # repeated titles without an embedding call (see analysis.task_matching)
+    chat = models.ForeignKey(Chat, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
+    normalized_title = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat', 'normalized_title'], name='coursetask_chat_title_idx'),
+            # Keyset pagination of the knowledge base, with and without a status filter
+            models.Index(fields=['-updated_at', '-id'], name='coursetask_updated_idx'),
+            models.Index(fields=['status', '-updated_at', '-id'], name='coursetask_status_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .task_matching import normalize_task_title
+
+        self.normalized_title = normalize_task_title(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_title'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.title} ({self.get_status_display()})"
 
@@ -73,3 +138,145 @@ class KnowledgeEntry(models.Model):
 
     def __str__(self):
         return f"[{self.entry_type}] {self.content[:50]}"
+
+
+class ChatStats(models.Model):
+    """
+    Running per-chat counters for the dashboard, maintained by analysis.stats.
+    """
+    chat = models.OneToOneField(Chat, on_delete=models.CASCADE, related_name='stats')
+    message_count = models.IntegerField(default=0)
+    knowledge_count = models.IntegerField(default=0)
+    analysis_count = models.IntegerField(default=0)
+    importance_sum = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Chat list keyset pagination: (-message_count, chat_id)
+            models.Index(fields=['-message_count', 'chat'], name='chatstats_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats for chat {self.chat_id}: {self.message_count} messages"
+
+
+class CategoryStats(models.Model):
+    """
+    Running per-category counters of AnalysisResult, maintained by analysis.stats.
+    """
+    category = models.CharField(max_length=50, unique=True, choices=AnalysisResult.CATEGORIES)
+    count = models.IntegerField(default=0)
+    importance_sum = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.category}: {self.count}"
+
+
+class DeadlineFeed(models.Model):
+    """
+    Stored iCalendar feed of active task deadlines, one per chat plus a global
+    one. Marked dirty when a task of the chat changes and rebuilt on next read
+    (see analysis.calendar). Every mark bumps `version`, so a rebuild that
+    raced with a change does not clear the dirty flag.
+    """
+    scope = models.CharField(max_length=64, unique=True)
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, null=True, blank=True, related_name='deadline_feeds')
+    events = models.TextField(blank=True, default='')
+    content = models.TextField(blank=True, default='')
+    etag = models.CharField(max_length=64, blank=True, default='')
+    dirty = models.BooleanField(default=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Deadline feed {self.scope}"
+
+
+class ProfilingSwitch(models.Model):
+    """
+    Admin toggle for analysis.profiling. The newest enabled, unexpired row
+    overrides the PROFILING_* settings in every process.
+    """
+    TARGETS = [
+        ('all', 'Tasks and web requests'),
+        ('tasks', 'process_content_task'),
+        ('views', 'Web requests'),
+    ]
+    FORMATS = [
+        ('pstats', 'cProfile (pstats)'),
+        ('collapsed', 'Collapsed stacks (flamegraph)'),
+    ]
+
+    enabled = models.BooleanField(default=True)
+    sample_rate = models.FloatField(default=0.05, help_text="Fraction of calls to profile, 0..1")
+    target = models.CharField(max_length=10, choices=TARGETS, default='all')
+    output_format = models.CharField(max_length=10, choices=FORMATS, default='pstats')
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Profiling stops by itself after this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        state = "on" if self.enabled else "off"
+        return f"Profiling {self.target} at {self.sample_rate:.0%} ({state})"
+
+
+class LLMCall(models.Model):
+    """
+    One LLM or embedding call, appended by analysis.ledger.
+    """
+    KINDS = [
+        ('llm', 'LLM'),
+        ('embedding', 'Embedding'),
+    ]
+    OUTCOMES = [
+        ('ok', 'OK'),
+        ('invalid_json', 'Invalid JSON'),
+        ('error', 'Exception'),
+        ('heuristic', 'Heuristic (no client)'),
+        ('cache_hit', 'Cache hit'),
+    ]
+    TIERS = [
+        ('', 'Single model'),
+        ('classifier', 'Classifier'),
+        ('extractor', 'Extractor'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    model = models.CharField(max_length=100)
+    tier = models.CharField(max_length=10, choices=TIERS, blank=True, default='')
+    prompt_version = models.CharField(max_length=16, blank=True, default='')
+    source_type = models.CharField(max_length=20, blank=True, default='')
+    outcome = models.CharField(max_length=20, choices=OUTCOMES)
+    input_tokens = models.PositiveIntegerField(null=True, blank=True)
+    output_tokens = models.PositiveIntegerField(null=True, blank=True)
+    latency_ms = models.FloatField(default=0)
+    chat = models.ForeignKey(Chat, on_delete=models.SET_NULL, null=True, blank=True, related_name='llm_calls')
+    analysis_result = models.ForeignKey(
+        AnalysisResult, on_delete=models.SET_NULL, null=True, blank=True, related_name='llm_calls'
+    )
+    created_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.model} {self.outcome} ({self.latency_ms:.0f} ms)"
+
+
+class DeletedRecord(models.Model):
+    """
+    Tombstone of a row deleted from a JSON API resource, so incremental sync
+    clients can drop it (the "deletions" resource of web.api). Written by
+    analysis.signals and pruned after SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    resource = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Sync keyset pagination per resource: (deleted_at, id)
+            models.Index(fields=['resource', 'deleted_at', 'id'], name='deletedrecord_sync_idx'),
+            models.Index(fields=['deleted_at'], name='deletedrecord_prune_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.resource} {self.object_id}"
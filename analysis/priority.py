@@ -0,0 +1,127 @@
+"""
+Priority classes of analysis work and their Celery queues.
+
+Each item is classified when it is enqueued:
+* urgent: live teacher messages with an explicit urgency word ("срочно") or
+  a date within URGENT_DATE_WINDOW_DAYS days ("экзамен перенесён на завтра",
+  "сдать до 21.10"); deadline words alone ("сдать", "срок") are not enough;
+* live: other live teacher messages;
+* bulk: everything else, including imports, backfills, web schedules,
+  documents, reprocess runs and re-analysis.
+
+Every class has its own queue, and urgent and live each have their own
+worker pool, so a backfill never delays a live message and a burst of live
+messages never delays an urgent one. The time from enqueue
+to saved analysis is exported per class and checked against ANALYSIS_SLO_SECONDS.
+"""
+import logging
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .ai_engine import DATE_PATTERN, RELATIVE_PATTERN, RUS_MONTH_PATTERN, RUS_MONTHS, URGENT_KEYWORDS
+from .calendar import parse_deadline_date
+from .schemas import IngestionData
+
+logger = logging.getLogger(__name__)
+
+URGENT = "urgent"
+LIVE = "live"
+BULK = "bulk"
+PRIORITIES = (URGENT, LIVE, BULK)
+ENQUEUED_AT_KEY = "enqueued_at"
+PRIORITY_KEY = "priority"
+# Replies are analyzed with the student's question in front of the teacher's answer
+TEACHER_ANSWER_MARKER = "\nTeacher Answer: "
+
+
+# Days from today of relative dates; "next week" phrases count as a week
+RELATIVE_DAYS = {"сегодня": 0, "завтра": 1, "послезавтра": 2}
+
+
+def _mentioned_dates(text: str, today: date):
+    for match in RELATIVE_PATTERN.finditer(text):
+        yield today + timedelta(days=RELATIVE_DAYS.get(match.group(1).lower(), 7))
+    for match in DATE_PATTERN.finditer(text):
+        yield parse_deadline_date(match.group(0), today)
+    for match in RUS_MONTH_PATTERN.finditer(text):
+        month = RUS_MONTHS.get(match.group(2).lower())
+        year = f".{match.group(3)}" if match.group(3) else ""
+        yield parse_deadline_date(f"{match.group(1)}.{month}{year}", today)
+
+
+def has_near_date(text: str, today: Optional[date] = None) -> bool:
+    """
+    True if the text mentions a date from today to URGENT_DATE_WINDOW_DAYS ahead.
+    """
+    today = today or timezone.localdate()
+    until = today + timedelta(days=settings.URGENT_DATE_WINDOW_DAYS)
+    return any(day is not None and today <= day <= until for day in _mentioned_dates(text, today))
+
+
+def classify(data: IngestionData, bulk: bool = False) -> str:
+    if bulk or data.source_type != "telegram":
+        return BULK
+    if str(data.metadata.get("sender_role", "")).lower() != "teacher":
+        return BULK
+    # Only the teacher's own words count: a student asking "срочно?" is not urgent
+    text = (data.text or "").rpartition(TEACHER_ANSWER_MARKER)[2].lower()
+    if any(keyword in text for keyword in URGENT_KEYWORDS) or has_near_date(text):
+        return URGENT
+    return LIVE
+
+
+def queue_for(priority: str) -> str:
+    return settings.ANALYSIS_QUEUES[priority]
+
+
+def _stamp(data: IngestionData, priority: str) -> Dict:
+    data.metadata[PRIORITY_KEY] = priority
+    data.metadata[ENQUEUED_AT_KEY] = time.time()
+    return data.model_dump()
+
+
+def enqueue_analysis(data: IngestionData, bulk: bool = False) -> str:
+    """
+    Queues process_content_task for `data` on the queue of its priority
+    class; returns the class.
+    """
+    from .tasks import process_content_task
+
+    priority = classify(data, bulk=bulk)
+    process_content_task.apply_async(args=[_stamp(data, priority)], queue=queue_for(priority))
+    return priority
+
+
+def batch_signature(items: List[IngestionData]):
+    """
+    process_content_batch signature for bulk items, routed to the bulk queue.
+    """
+    from .tasks import process_content_batch
+
+    payloads = [_stamp(item, BULK) for item in items]
+    return process_content_batch.si(payloads).set(queue=queue_for(BULK))
+
+
+def enqueue_batch(items: List[IngestionData]) -> None:
+    batch_signature(items).delay()
+
+
+def observe(metadata: Dict) -> None:
+    """
+    Records the time from enqueue to saved analysis of a processed item.
+    """
+    enqueued_at = metadata.get(ENQUEUED_AT_KEY)
+    priority = metadata.get(PRIORITY_KEY)
+    if enqueued_at is None or priority not in PRIORITIES:
+        return
+    seconds = max(0.0, time.time() - enqueued_at)
+    metrics.TIME_TO_ANALYSIS.labels(priority).observe(seconds)
+    objective = settings.ANALYSIS_SLO_SECONDS.get(priority)
+    if objective and seconds > objective:
+        metrics.SLO_BREACHES.labels(priority).inc()
+        logger.warning(f"{priority} analysis took {seconds:.1f}s (objective {objective}s)")
@@ -0,0 +1,253 @@
+"""
+On-demand profiling of analysis tasks and web requests.
+
+A fraction of process_content_task executions and requests is profiled when
+PROFILING_SAMPLE_RATE is set, or while an active ProfilingSwitch row exists
+(toggled in the admin and published to the shared cache, so running workers
+pick it up within PROFILING_REFRESH_SECONDS). Each sampled call writes one file
+to PROFILING_DIR: a cProfile dump readable with pstats/snakeviz, or collapsed
+stacks from a wall-clock stack sampler for flamegraph.pl/speedscope. When
+profiling is off, a call costs a monotonic clock read and a comparison.
+"""
+import cProfile
+import functools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "profiling:switch"
+FORMATS = ("pstats", "collapsed")
+UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9=.-]+")
+
+_config: Dict = {"checked_at": None}
+_config_lock = threading.Lock()
+
+
+def _settings_config() -> Dict:
+    return {
+        "rate": settings.PROFILING_SAMPLE_RATE,
+        "target": settings.PROFILING_TARGET,
+        "format": settings.PROFILING_FORMAT,
+    }
+
+
+def _load_config() -> Dict:
+    try:
+        switch = cache.get(CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to read the profiling switch: {e}")
+        switch = None
+    if switch and (switch["expires_at"] is None or switch["expires_at"] > timezone.now()):
+        return switch
+    return _settings_config()
+
+
+def current_config() -> Dict:
+    """
+    Effective sample rate, target and format, re-read at most every
+    PROFILING_REFRESH_SECONDS per process.
+    """
+    now = time.monotonic()
+    checked_at = _config["checked_at"]
+    if checked_at is None or now - checked_at >= settings.PROFILING_REFRESH_SECONDS:
+        with _config_lock:
+            _config.update(_load_config(), checked_at=now)
+    return _config
+
+
+def publish() -> None:
+    """
+    Shares the newest active ProfilingSwitch (or its absence) with every process.
+    """
+    from django.db.models import Q
+
+    from .models import ProfilingSwitch
+
+    active = (
+        ProfilingSwitch.objects.filter(enabled=True)
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+        .order_by("-created_at")
+        .first()
+    )
+    if active is None:
+        cache.delete(CACHE_KEY)
+    else:
+        cache.set(CACHE_KEY, {
+            "rate": active.sample_rate,
+            "target": active.target,
+            "format": active.output_format,
+            "expires_at": active.expires_at,
+        }, timeout=None)
+    refresh()
+
+
+def refresh() -> None:
+    _config["checked_at"] = None
+
+
+def sampled(target: str) -> Optional[str]:
+    """
+    Output format if this call of `target` ("tasks" or "views") should be
+    profiled, otherwise None.
+    """
+    config = current_config()
+    if not config["rate"] or config["target"] not in ("all", target):
+        return None
+    if random.random() >= config["rate"]:
+        return None
+    return config["format"] if config["format"] in FORMATS else "pstats"
+
+
+class StackSampler:
+    """
+    Wall-clock sampler of one thread's Python stack, aggregated as collapsed
+    stacks ("outer;inner count" lines).
+    """
+
+    def __init__(self, root: str, interval: float):
+        self.root = root
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profiling-sampler")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join([self.root, *reversed(frames)])] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _path(kind: str, name: str, tags: Dict, extension: str) -> Path:
+    parts = [timezone.now().strftime("%Y%m%dT%H%M%S%f"), kind, name]
+    parts += [f"{key}={value}" for key, value in tags.items() if value is not None]
+    parts.append(f"pid={os.getpid()}")
+    filename = "_".join(UNSAFE_CHARACTERS.sub("-", str(part)).strip("-") for part in parts)
+    return Path(settings.PROFILING_DIR) / f"{filename}.{extension}"
+
+
+@contextmanager
+def profile(kind: str, name: str, output_format: str, **tags) -> Iterator[Dict]:
+    """
+    Profiles the block and writes the result tagged with `tags`; the yielded
+    dict can be extended inside the block (e.g. with the response size).
+    """
+    if output_format == "collapsed":
+        profiler = StackSampler(name, settings.PROFILING_INTERVAL_MS / 1000)
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread (a nested sampled call)
+            yield tags
+            return
+    try:
+        yield tags
+    finally:
+        try:
+            if output_format == "collapsed":
+                profiler.stop()
+                path = _path(kind, name, tags, "collapsed")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(profiler.collapsed(), encoding="utf-8")
+            else:
+                profiler.disable()
+                path = _path(kind, name, tags, "prof")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(path)
+            logger.info(f"Profile written to {path}")
+        except Exception as e:
+            logger.warning(f"Failed to write profile of {name}: {e}")
+
+
+def profiled(name: str):
+    """
+    Decorator for tasks taking a serialized IngestionData; profiles of
+    sampled calls are tagged with its source type and text size.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(payload, *args, **kwargs):
+            output_format = sampled("tasks")
+            if output_format is None:
+                return func(payload, *args, **kwargs)
+            data = payload if isinstance(payload, dict) else {}
+            with profile("task", name, output_format,
+                         source=data.get("source_type"), size=f"{len(data.get('text') or '')}b"):
+                return func(payload, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ProfilingMiddleware:
+    """
+    Profiles sampled web requests; files are tagged with the method, path and
+    response size. Runs natively in both the WSGI and the ASGI stack, so it
+    adds no thread hop in front of async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        output_format = sampled("views")
+        if output_format is None:
+            return self.get_response(request)
+        with profile("view", request.path, output_format, method=request.method) as tags:
+            response = self.get_response(request)
+            _tag_size(tags, response)
+        return response
+
+    async def __acall__(self, request):
+        output_format = sampled("views")
+        if output_format is None:
+            return await self.get_response(request)
+        with profile("view", request.path, output_format, method=request.method) as tags:
+            response = await self.get_response(request)
+            _tag_size(tags, response)
+        return response
+
+
+def _tag_size(tags: Dict, response) -> None:
+    if not response.streaming:
+        tags["size"] = f"{len(response.content)}b"
@@ -0,0 +1,47 @@
+"""
+Celery queue inspection for producers that need backpressure.
+"""
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = "celery"
+# kombu's Redis transport keeps each non-zero priority step in its own list
+PRIORITY_SEPARATOR = "\x06\x16"
+
+_client = None
+
+
+def _broker():
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def _queue_keys(queue: str) -> list:
+    options = getattr(settings, "CELERY_BROKER_TRANSPORT_OPTIONS", {}) or {}
+    steps = options.get("priority_steps") or [0]
+    return [queue if step == 0 else f"{queue}{PRIORITY_SEPARATOR}{step}" for step in steps]
+
+
+def queue_depth(queue: str = DEFAULT_QUEUE) -> int:
+    """
+    Number of messages waiting in a queue (Redis LLEN summed over the broker
+    lists of every priority step). Returns 0 for non-Redis brokers, eager mode
+    or an unreachable broker.
+    """
+    if getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False) or not settings.CELERY_BROKER_URL.startswith("redis"):
+        return 0
+    try:
+        pipeline = _broker().pipeline(transaction=False)
+        for key in _queue_keys(queue):
+            pipeline.llen(key)
+        return sum(int(length) for length in pipeline.execute())
+    except Exception as e:
+        logger.warning(f"Could not read depth of queue {queue}: {e}")
+        return 0
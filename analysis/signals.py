@@ -0,0 +1,138 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Chat, Message
+from . import calendar, profiling, stats
+from .models import AnalysisResult, CourseTask, DeletedRecord, KnowledgeEntry, ProfilingSwitch
+
+
+def _message_chat_id(message_id):
+    return Message.objects.filter(id=message_id).values_list("chat_id", flat=True).first()
+
+
+def _after_commit(func, *args):
+    # Analysis results and entries are written inside the long persist transaction;
+    # bumping the shared stats rows after it commits keeps their row locks short
+    transaction.on_commit(partial(func, *args), robust=True)
+
+
+@receiver(post_save, sender=Chat)
+def chat_saved(sender, instance, created, raw=False, **kwargs):
+    # Every chat gets a stats row so list pages can paginate over ChatStats alone
+    if created and not raw:
+        stats.ensure_chat(instance.id)
+
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.record_message(instance.chat_id, 1)
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, **kwargs):
+    stats.record_message(instance.chat_id, -1)
+
+
+@receiver(post_save, sender=KnowledgeEntry)
+def knowledge_entry_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _after_commit(stats.record_knowledge, _message_chat_id(instance.source_message_id), 1)
+        if instance.course_task_id:
+            # A new entry changes the task page, so it counts as a task update
+            CourseTask.objects.filter(id=instance.course_task_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=KnowledgeEntry)
+def knowledge_entry_deleted(sender, instance, **kwargs):
+    _after_commit(stats.record_knowledge, _message_chat_id(instance.source_message_id), -1)
+    if instance.course_task_id:
+        CourseTask.objects.filter(id=instance.course_task_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=AnalysisResult)
+def analysis_result_presave(sender, instance, raw=False, **kwargs):
+    instance._stats_previous = None
+    if instance.pk and not raw:
+        instance._stats_previous = (
+            AnalysisResult.objects.filter(pk=instance.pk)
+            .values_list("category", "importance_score")
+            .first()
+        )
+
+
+@receiver(post_save, sender=AnalysisResult)
+def analysis_result_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    _after_commit(
+        stats.record_analysis,
+        _message_chat_id(instance.message_id),
+        getattr(instance, "_stats_previous", None),
+        (instance.category, instance.importance_score),
+    )
+
+
+@receiver(post_delete, sender=AnalysisResult)
+def analysis_result_deleted(sender, instance, **kwargs):
+    _after_commit(
+        stats.record_analysis,
+        _message_chat_id(instance.message_id),
+        (instance.category, instance.importance_score),
+        None,
+    )
+
+
+@receiver(post_save, sender=CourseTask)
+@receiver(post_delete, sender=CourseTask)
+def course_task_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        calendar.mark_dirty(instance.chat_id)
+
+
+def _task_chat_id(task_id):
+    return CourseTask.objects.filter(id=task_id).values_list("chat_id", flat=True).first()
+
+
+@receiver(post_save, sender=KnowledgeEntry)
+def deadline_entry_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.course_task_id:
+        calendar.mark_dirty(_task_chat_id(instance.course_task_id))
+
+
+@receiver(post_delete, sender=KnowledgeEntry)
+def deadline_entry_deleted(sender, instance, **kwargs):
+    # Entries removed by discard_knowledge take their deadlines off the calendar
+    if instance.course_task_id:
+        calendar.mark_dirty(_task_chat_id(instance.course_task_id))
+
+
+@receiver(post_save, sender=Chat)
+def chat_renamed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # The chat title is the calendar name and part of the global feed
+    if not created and not raw and (update_fields is None or "title" in update_fields):
+        calendar.mark_dirty(instance.id)
+
+
+@receiver(post_delete, sender=Chat)
+@receiver(post_delete, sender=CourseTask)
+@receiver(post_delete, sender=KnowledgeEntry)
+@receiver(post_delete, sender=AnalysisResult)
+def record_deletion(sender, instance, **kwargs):
+    # Tombstones for the JSON API sync feed, one per resource the row was listed in
+    resources = {Chat: ["chats"], CourseTask: ["tasks"], KnowledgeEntry: ["entries"], AnalysisResult: ["analysis"]}[sender]
+    if sender is KnowledgeEntry and instance.entry_type == "deadline":
+        resources = ["entries", "deadlines"]
+    DeletedRecord.objects.bulk_create(
+        [DeletedRecord(resource=resource, object_id=instance.pk) for resource in resources]
+    )
+
+
+@receiver(post_save, sender=ProfilingSwitch)
+@receiver(post_delete, sender=ProfilingSwitch)
+def profiling_switch_changed(sender, instance, **kwargs):
+    profiling.publish()
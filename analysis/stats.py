@@ -0,0 +1,155 @@
+"""
+Materialized dashboard statistics.
+
+Counters are adjusted with F() expressions by the signal handlers in
+analysis.signals. Message counts commit or roll back together with the
+message; analysis and knowledge counts are applied right after the analysis
+transaction commits, so it does not hold the shared stats rows locked. rebuild() recomputes everything from the source tables to repair
+drift (e.g. after raw SQL or bulk operations that bypass signals).
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from core.models import Chat, Message
+from .models import AnalysisResult, CategoryStats, ChatStats, KnowledgeEntry
+
+logger = logging.getLogger(__name__)
+
+# (category, importance_score) of an AnalysisResult
+AnalysisKey = Tuple[str, int]
+
+
+def _ensure_row(model, **lookup) -> None:
+    if model.objects.filter(**lookup).exists():
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup)
+    except IntegrityError:
+        # Created concurrently by another worker
+        pass
+
+
+def _adjust_chat(chat_id: Optional[int], **deltas) -> None:
+    if not chat_id:
+        return
+    # Decrements never create rows: during a chat cascade delete the stats row
+    # may already be gone and must not be recreated for a vanishing chat
+    if any(delta > 0 for delta in deltas.values()):
+        _ensure_row(ChatStats, chat_id=chat_id)
+    # update() skips auto_now; updated_at tells API sync clients the counts changed
+    ChatStats.objects.filter(chat_id=chat_id).update(
+        updated_at=timezone.now(), **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def _adjust_category(category: str, **deltas) -> None:
+    if any(delta > 0 for delta in deltas.values()):
+        _ensure_row(CategoryStats, category=category)
+    CategoryStats.objects.filter(category=category).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def ensure_chat(chat_id: int) -> None:
+    _ensure_row(ChatStats, chat_id=chat_id)
+
+
+def record_message(chat_id: int, delta: int = 1) -> None:
+    _adjust_chat(chat_id, message_count=delta)
+
+
+def record_knowledge(chat_id: int, delta: int = 1) -> None:
+    _adjust_chat(chat_id, knowledge_count=delta)
+
+
+def record_analysis(chat_id: int, old: Optional[AnalysisKey], new: Optional[AnalysisKey]) -> None:
+    """
+    Moves one AnalysisResult from its old (category, importance) to the new one.
+    Either side may be None for a created or deleted result.
+    """
+    if old == new:
+        return
+    if old:
+        _adjust_chat(chat_id, analysis_count=-1, importance_sum=-old[1])
+        _adjust_category(old[0], count=-1, importance_sum=-old[1])
+    if new:
+        _adjust_chat(chat_id, analysis_count=1, importance_sum=new[1])
+        _adjust_category(new[0], count=1, importance_sum=new[1])
+
+
+def dashboard_totals() -> Dict[str, float]:
+    totals = ChatStats.objects.aggregate(
+        messages=Sum("message_count"),
+        knowledge=Sum("knowledge_count"),
+        analyses=Sum("analysis_count"),
+        importance=Sum("importance_sum"),
+    )
+    analyses = totals["analyses"] or 0
+    return {
+        "total_messages": totals["messages"] or 0,
+        "total_knowledge": totals["knowledge"] or 0,
+        "avg_importance": (totals["importance"] or 0) / analyses if analyses else 0,
+    }
+
+
+def category_counts() -> List[Dict]:
+    return list(
+        CategoryStats.objects.filter(count__gt=0)
+        .order_by("category")
+        .values("category", "count")
+    )
+
+
+def top_chats(limit: int = 10) -> List[Dict]:
+    return list(
+        ChatStats.objects.filter(message_count__gt=0)
+        .order_by("-message_count", "chat_id")
+        .values("chat__title", "chat__tg_chat_id", "message_count")[:limit]
+    )
+
+
+def rebuild() -> None:
+    """
+    Recompute every counter from Message, KnowledgeEntry and AnalysisResult.
+    """
+    with transaction.atomic():
+        messages = dict(
+            Message.objects.values("chat_id").annotate(total=Count("id")).values_list("chat_id", "total")
+        )
+        knowledge = dict(
+            KnowledgeEntry.objects.values("source_message__chat_id")
+            .annotate(total=Count("id"))
+            .values_list("source_message__chat_id", "total")
+        )
+        analyses = {
+            row["message__chat_id"]: row
+            for row in AnalysisResult.objects.values("message__chat_id").annotate(
+                total=Count("id"), importance=Sum("importance_score")
+            )
+        }
+
+        ChatStats.objects.all().delete()
+        ChatStats.objects.bulk_create([
+            ChatStats(
+                chat_id=chat_id,
+                message_count=messages.get(chat_id, 0),
+                knowledge_count=knowledge.get(chat_id, 0),
+                analysis_count=analyses.get(chat_id, {}).get("total", 0),
+                importance_sum=analyses.get(chat_id, {}).get("importance") or 0,
+            )
+            for chat_id in Chat.objects.values_list("id", flat=True)
+        ])
+
+        CategoryStats.objects.all().delete()
+        CategoryStats.objects.bulk_create([
+            CategoryStats(category=row["category"], count=row["total"], importance_sum=row["importance"] or 0)
+            for row in AnalysisResult.objects.values("category").annotate(
+                total=Count("id"), importance=Sum("importance_score")
+            )
+        ])
+    logger.info("Dashboard statistics rebuilt")
@@ -0,0 +1,100 @@
+import logging
+import re
+from difflib import SequenceMatcher
+from typing import Optional, Tuple
+
+from django.db import connection, transaction
+
+from .models import CourseTask
+
+logger = logging.getLogger(__name__)
+
+NON_WORD_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+DIGIT_BOUNDARY_PATTERN = re.compile(r"(?<=\d)(?=[^\W\d])|(?<=[^\W\d])(?=\d)", re.UNICODE)
+NUMBER_PATTERN = re.compile(r"\d+")
+
+# Near-exact titles must be this similar to be merged without a vector search.
+LEXICAL_SIMILARITY_THRESHOLD = 0.9
+TRIGRAM_SIMILARITY_THRESHOLD = 0.6
+# How many recent tasks of a chat are compared in Python when pg_trgm is unavailable.
+FALLBACK_CANDIDATES_LIMIT = 200
+
+
+def normalize_task_title(title: str) -> str:
+    """
+    Lowercase, strip punctuation and split numbers from words:
+    "Лабораторная работа №03!" -> "лабораторная работа 3".
+    """
+    text = (title or "").lower().replace("ё", "е").replace("_", " ")
+    text = NON_WORD_PATTERN.sub(" ", text)
+    text = DIGIT_BOUNDARY_PATTERN.sub(" ", text)
+    tokens = []
+    for token in text.split():
+        if token.isdigit():
+            token = str(int(token))
+        tokens.append(token)
+    return " ".join(tokens)[:255]
+
+
+def title_numbers(normalized_title: str) -> Tuple[str, ...]:
+    return tuple(NUMBER_PATTERN.findall(normalized_title or ""))
+
+
+class LexicalTaskMatcher:
+    """
+    First-pass matcher that resolves a candidate task title against the
+    normalized titles of existing tasks in the same chat. Only titles that
+    differ in wording (not in numbers) are treated as near-exact matches,
+    so "Лабораторная работа №3" never merges into "Лабораторная работа №4".
+    """
+
+    def __init__(self, threshold: float = LEXICAL_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+
+    def match(self, title: str, chat=None) -> Optional[CourseTask]:
+        normalized = normalize_task_title(title)
+        if not normalized:
+            return None
+
+        tasks = CourseTask.objects.filter(chat=chat) if chat is not None else CourseTask.objects.all()
+
+        exact = tasks.filter(normalized_title=normalized).order_by("-updated_at").first()
+        if exact:
+            return exact
+
+        if connection.vendor == "postgresql":
+            candidates = self._trigram_candidates(tasks, normalized)
+        else:
+            candidates = tasks.order_by("-updated_at").values_list("id", "normalized_title")[
+                :FALLBACK_CANDIDATES_LIMIT
+            ]
+
+        numbers = title_numbers(normalized)
+        best_id, best_ratio = None, 0.0
+        for task_id, candidate_title in candidates:
+            if not candidate_title or title_numbers(candidate_title) != numbers:
+                continue
+            ratio = SequenceMatcher(None, normalized, candidate_title).ratio()
+            if ratio >= self.threshold and ratio > best_ratio:
+                best_id, best_ratio = task_id, ratio
+
+        if best_id is None:
+            return None
+        logger.info(f"Lexical near-exact match for '{title}' (ratio {best_ratio:.2f})")
+        return CourseTask.objects.filter(id=best_id).first()
+
+    def _trigram_candidates(self, tasks, normalized: str):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        try:
+            with transaction.atomic():
+                return list(
+                    tasks.annotate(similarity=TrigramSimilarity("normalized_title", normalized))
+                    .filter(similarity__gte=TRIGRAM_SIMILARITY_THRESHOLD)
+                    .order_by("-similarity")
+                    .values_list("id", "normalized_title")[:5]
+                )
+        except Exception as e:
+            # pg_trgm may be missing on managed databases without superuser rights
+            logger.warning(f"Trigram lookup failed, skipping near-exact match: {e}")
+            return []
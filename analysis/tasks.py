@@ -1,16 +1,217 @@
 import logging
 import uuid
+from datetime import timedelta
 from celery import shared_task
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
 from .schemas import IngestionData
 from .ai_engine import AIService
-from .models import AnalysisResult, KnowledgeEntry, CourseTask
+from .models import AnalysisResult, DeletedRecord, KnowledgeEntry, CourseTask, SourceAnalysis
 from core.models import Message
+from ingestion.models import IngestedDocument
+from . import breakers, counters, events, ledger, metrics, priority, profiling, tracing, warmup
+from .task_matching import LexicalTaskMatcher
 from .vector_db import VectorDBService
 
 logger = logging.getLogger(__name__)
 
+MATCH_COUNTERS = ("task_match.lexical", "task_match.semantic", "task_match.created")
+# A degraded result queued for re-analysis is not queued again for this long
+REANALYSIS_LOCK_SECONDS = 60 * 60
+
+
+def record_match(method: str) -> None:
+    counters.increment(f"task_match.{method}")
+    metrics.TASK_MATCHES.labels(method).inc()
+
+
+def apply_task_action(task: CourseTask, action: str) -> None:
+    old_status = task.status
+    if action == 'cancel':
+        task.status = 'cancelled'
+        with tracing.span("db.course_task", action=action):
+            task.save()
+    elif action == 'completed':
+        task.status = 'completed'
+        with tracing.span("db.course_task", action=action):
+            task.save()
+    if task.status != old_status:
+        events.task_status_changed(task, old_status)
+
+def task_title_for(analysis_result: dict):
+    """
+    Task title of an analysis; generated when the LLM gave none but the
+    content is likely important.
+    """
+    category = analysis_result.get('category')
+    importance = analysis_result.get('importance_score', 0)
+    task_title = analysis_result.get('task_title')
+    summary = analysis_result.get('summary', '').strip()
+
+    # Auto-generate title if missing but content is likely important
+    if not task_title and (importance >= 4 or category in ['deadline', 'announcement']):
+        if category == 'deadline':
+            extracts = analysis_result.get('extracted_deadlines', [])
+            date_str = extracts[0].get('date', '') if extracts and isinstance(extracts, list) and isinstance(extracts[0], dict) else ''
+            task_title = f"Дедлайн {date_str}".strip() or "Новый дедлайн"
+        elif category == 'announcement':
+            # Use first sentence or first few words
+            first_line = summary.split('.')[0]
+            task_title = (first_line[:50] + '...') if len(first_line) > 50 else first_line
+            if not task_title:
+                task_title = "Важное объявление"
+        elif category == 'link':
+            task_title = "Полезные ссылки"
+        elif importance >= 6:
+            task_title = "Важное сообщение"
+    return task_title
+
+
+def match_task(data: IngestionData, message: Message, task_title, summary: str):
+    """
+    Finds the existing task of a message: inherited from the replied-to
+    message, then a lexical title match, then a semantic match in Qdrant.
+    Returns (task or None, match method or None for an inherited task, the
+    VectorDBService used or None).
+    """
+    # Context Inheritance Logic
+    reply_to_msg_id = data.metadata.get('reply_to_msg_id')
+    tg_chat_id = data.metadata.get('tg_chat_id')
+
+    if reply_to_msg_id and tg_chat_id:
+        try:
+            # IDs are only unique within a chat, so the parent is looked up in the message's chat
+            parent_msg = Message.objects.filter(
+                tg_message_id=reply_to_msg_id,
+                chat=message.chat
+            ).first()
+
+            if parent_msg:
+                # Look for any task linked to this parent message
+                related_entry = KnowledgeEntry.objects.filter(
+                    source_message=parent_msg,
+                    course_task__isnull=False
+                ).select_related('course_task').first()
+
+                if related_entry:
+                    target_task = related_entry.course_task
+                    logger.info(f"Inherited task '{target_task.title}' from parent message {parent_msg.id}")
+                    return target_task, None, None
+        except Exception as e:
+            logger.warning(f"Failed to inherit task: {e}")
+
+    # If we have a title, treat it as a task candidate
+    if not task_title:
+        return None, None, None
+
+    # 1. Cheap lexical pass over normalized titles in this chat
+    target_task = LexicalTaskMatcher().match(task_title, chat=message.chat)
+    if target_task:
+        logger.info(f"Lexically matched existing task: {target_task.title}")
+        return target_task, "lexical", None
+
+    # 2. Semantic search for existing task. The Qdrant client is created
+    # only here so lexically resolved titles never touch Ollama or Qdrant
+    vector_db = VectorDBService()
+    existing = vector_db.search_tasks(f"{task_title} {summary}", threshold=0.82)
+    if existing:
+        best_match = existing[0]
+        vector_id = best_match['id']
+        target_task = CourseTask.objects.filter(vector_id=vector_id).first()
+        if target_task:
+            logger.info(f"Matched existing task: {target_task.title} (Score: {best_match['score']})")
+            return target_task, "semantic", vector_db
+        logger.warning(f"Vector ID {vector_id} found in Qdrant but not in DB")
+    return None, None, vector_db
+
+
+def save_knowledge_entries(data: IngestionData, message: Message, target_task, analysis_result: dict) -> None:
+    category = analysis_result.get('category')
+    action = analysis_result.get('action', 'info')
+    summary = analysis_result.get('summary', '').strip()
+
+    # Create KnowledgeEntry
+    if summary:
+        # Determine entry type
+        entry_type = 'generic'
+        if category == 'deadline': entry_type = 'deadline'
+        elif category == 'link': entry_type = 'link'
+        elif data.metadata.get('is_reply'): entry_type = 'explanation'
+
+        with tracing.span("db.knowledge_entry", entry_type=entry_type):
+            KnowledgeEntry.objects.create(
+                source_message=message,
+                course_task=target_task,
+                entry_type=entry_type,
+                content=summary,
+                metadata={
+                    'deadlines': analysis_result.get('extracted_deadlines'),
+                    'links': analysis_result.get('extracted_links'),
+                    'original_action': action
+                }
+            )
+
+    links = analysis_result.get('extracted_links') or []
+    if isinstance(links, str):
+        links = [links]
+    if not isinstance(links, list):
+        links = []
+    seen_links = set()
+    for link in links:
+        link_text = str(link).strip()
+        if not link_text or link_text in seen_links:
+            continue
+        seen_links.add(link_text)
+        with tracing.span("db.knowledge_entry", entry_type="link"):
+            KnowledgeEntry.objects.get_or_create(
+                source_message=message,
+                course_task=target_task,
+                entry_type='link',
+                content=link_text,
+            )
+
+    deadlines = analysis_result.get('extracted_deadlines') or []
+    if isinstance(deadlines, dict):
+        deadlines = [deadlines]
+    if isinstance(deadlines, str):
+        deadlines = [{"date": deadlines, "description": ""}]
+    if not isinstance(deadlines, list):
+        deadlines = []
+    seen_deadlines = set()
+    for item in deadlines:
+        if isinstance(item, str):
+            date_text = item.strip()
+            description = ""
+        elif isinstance(item, dict):
+            date_text = str(item.get("date") or "").strip()
+            description = str(item.get("description") or "").strip()
+        else:
+            continue
+        if not date_text and not description:
+            continue
+        content_parts = [part for part in [date_text, description] if part]
+        content = " - ".join(content_parts)
+        dedupe_key = (date_text, description)
+        if dedupe_key in seen_deadlines:
+            continue
+        seen_deadlines.add(dedupe_key)
+        with tracing.span("db.knowledge_entry", entry_type="deadline"):
+            KnowledgeEntry.objects.get_or_create(
+                source_message=message,
+                course_task=target_task,
+                entry_type='deadline',
+                content=content,
+            )
+
+
 @shared_task
+@tracing.traced("process_content_task")
+@profiling.profiled("process_content_task")
+@ledger.collected
+@warmup.requires_warm_models
 def process_content_task(ingestion_data_dict: dict):
     """
     Celery task to process content asynchronously.
@@ -23,196 +224,88 @@ def process_content_task(ingestion_data_dict: dict):
         # Call AI Service
         ai_service = AIService()
         analysis_result = ai_service.analyze_content(data)
-        
-        # Initialize Vector DB
-        vector_db = VectorDBService()
+        degraded = set(analysis_result.get('degraded') or [])
 
         # Save results based on source type
         if data.source_type == 'telegram':
             try:
-                message = Message.objects.get(id=data.source_id)
-
-                # Create AnalysisResult
-                AnalysisResult.objects.update_or_create(
-                    message=message,
-                    defaults={
-                        'category': analysis_result.get('category', 'other'),
-                        'importance_score': analysis_result.get('importance_score', 0),
-                        'summary': analysis_result.get('summary', ''),
-                        'extracted_links': analysis_result.get('extracted_links', []),
-                        'extracted_deadlines': analysis_result.get('extracted_deadlines', []),
-                    }
-                )
-                
+                message = Message.objects.select_related('chat').get(id=data.source_id)
+
+                if data.metadata.get('reanalysis'):
+                    # Replace what the degraded analysis extracted, before matching
+                    # so the old tasks of this message are not matched again
+                    with transaction.atomic():
+                        discard_knowledge(message)
+
                 # Logic for Knowledge Base & CourseTask
                 category = analysis_result.get('category')
-                importance = analysis_result.get('importance_score', 0)
                 action = analysis_result.get('action', 'info')
-                task_title = analysis_result.get('task_title')
                 summary = analysis_result.get('summary', '').strip()
-                
-                # Auto-generate title if missing but content is likely important
-                if not task_title and (importance >= 4 or category in ['deadline', 'announcement']):
-                    if category == 'deadline':
-                        extracts = analysis_result.get('extracted_deadlines', [])
-                        date_str = extracts[0].get('date', '') if extracts and isinstance(extracts, list) and isinstance(extracts[0], dict) else ''
-                        task_title = f"Дедлайн {date_str}".strip() or "Новый дедлайн"
-                    elif category == 'announcement':
-                        # Use first sentence or first few words
-                        first_line = summary.split('.')[0]
-                        task_title = (first_line[:50] + '...') if len(first_line) > 50 else first_line
-                        if not task_title:
-                            task_title = "Важное объявление"
-                    elif category == 'link':
-                         task_title = "Полезные ссылки"
-                    elif importance >= 6:
-                        task_title = "Важное сообщение"
-
-                target_task = None
-                
-                # Context Inheritance Logic
-                reply_to_msg_id = data.metadata.get('reply_to_msg_id')
-                tg_chat_id = data.metadata.get('tg_chat_id')
-                
-                if reply_to_msg_id and tg_chat_id:
-                    try:
-                        # Find the parent message in DB. We need to filter by chat because IDs are only unique within a chat (mostly)
-                        # But wait, tg_chat_id in metadata might be different from internal chat ID.
-                        # Actually data.source_id is the internal Message.id. Message object is already fetched as 'message'.
-                        # message.chat.tg_chat_id is available.
-                        
-                        parent_msg = Message.objects.filter(
-                            tg_message_id=reply_to_msg_id,
-                            chat=message.chat
-                        ).first()
-                        
-                        if parent_msg:
-                            # Look for any task linked to this parent message
-                            related_entry = KnowledgeEntry.objects.filter(
-                                source_message=parent_msg, 
-                                course_task__isnull=False
-                            ).first()
-                            
-                            if related_entry:
-                                target_task = related_entry.course_task
-                                logger.info(f"Inherited task '{target_task.title}' from parent message {parent_msg.id}")
-                    except Exception as e:
-                        logger.warning(f"Failed to inherit task: {e}")
-
-                # Try to interpret task logic if it's significant AND we haven't found one yet
-                # Rewritten condition: If we have a title, treat it as a task candidate.
-                if not target_task and task_title: 
-                    
-                    # 1. Search for existing task
-                    search_query = f"{task_title} {summary}"
-                    existing = vector_db.search_tasks(search_query, threshold=0.82)
-                    
-                    if existing:
-                        # Update existing task
-                        best_match = existing[0]
-                        vector_id = best_match['id']
-                        try:
-                            target_task = CourseTask.objects.get(vector_id=vector_id)
-                            logger.info(f"Matched existing task: {target_task.title} (Score: {best_match['score']})")
-                            
+                task_title = task_title_for(analysis_result)
+
+                # Task matching reads and the embedding/Qdrant calls run before the
+                # transaction, so no transaction or row lock waits on the network
+                target_task, match_method, vector_db = match_task(data, message, task_title, summary)
+
+                # Every DB write below (and the dashboard counters updated by
+                # analysis.signals) commits or rolls back as one unit
+                new_vector_id = None
+                with metrics.timed("persist"), tracing.span("persist"), transaction.atomic():
+                    # Create AnalysisResult
+                    with tracing.span("db.analysis_result"):
+                        result, _ = AnalysisResult.objects.update_or_create(
+                            message=message,
+                            defaults={
+                                'category': analysis_result.get('category', 'other'),
+                                'importance_score': analysis_result.get('importance_score', 0),
+                                'summary': analysis_result.get('summary', ''),
+                                'extracted_links': analysis_result.get('extracted_links', []),
+                                'extracted_deadlines': analysis_result.get('extracted_deadlines', []),
+                                'degraded': bool(degraded),
+                                'degraded_reason': ",".join(sorted(degraded)),
+                                **({} if data.metadata.get('reanalysis') else {'reanalysis_attempts': 0}),
+                            }
+                        )
+                    ledger.link(result)
+                    # Sent to live dashboards after commit
+                    events.analysis_saved(result)
+
+                    if target_task:
+                        if match_method:
+                            record_match(match_method)
                             # Update logic based on action
-                            if action == 'cancel':
-                                target_task.status = 'cancelled'
-                                target_task.save()
-                            elif action == 'completed':
-                                target_task.status = 'completed'
-                                target_task.save()
-                                
-                        except CourseTask.DoesNotExist:
-                            logger.warning(f"Vector ID {vector_id} found in Qdrant but not in DB")
-                    
-                    if not target_task:
+                            apply_task_action(target_task, action)
+                    elif task_title:
                         # Create new task if not found
                         # Use uuid for vector id
                         new_vector_id = str(uuid.uuid4())
-                        target_task = CourseTask.objects.create(
-                            title=task_title,
-                            description=summary,
-                            task_type=analysis_result.get('task_type', 'one_time'),
-                            vector_id=new_vector_id,
-                            status='active'
-                        )
-                        
-                        # Upsert to Vector DB
-                        vector_db.upsert_task(
-                            task_id=new_vector_id,
-                            text=f"{task_title} {summary}",
-                            payload={"title": task_title, "type": analysis_result.get('task_type')}
-                        )
+                        with tracing.span("db.course_task"):
+                            target_task = CourseTask.objects.create(
+                                title=task_title,
+                                description=summary,
+                                task_type=analysis_result.get('task_type', 'one_time'),
+                                vector_id=new_vector_id,
+                                status='active',
+                                chat=message.chat,
+                            )
+                        record_match("created")
+                        events.task_created(target_task)
 
-                # Create KnowledgeEntry
-                if summary:
-                    # Determine entry type
-                    entry_type = 'generic'
-                    if category == 'deadline': entry_type = 'deadline'
-                    elif category == 'link': entry_type = 'link'
-                    elif data.metadata.get('is_reply'): entry_type = 'explanation'
-                    
-                    KnowledgeEntry.objects.create(
-                        source_message=message,
-                        course_task=target_task,
-                        entry_type=entry_type,
-                        content=summary,
-                        metadata={
-                            'deadlines': analysis_result.get('extracted_deadlines'),
-                            'links': analysis_result.get('extracted_links'),
-                            'original_action': action
-                        }
-                    )
+                    save_knowledge_entries(data, message, target_task, analysis_result)
 
-                links = analysis_result.get('extracted_links') or []
-                if isinstance(links, str):
-                    links = [links]
-                if not isinstance(links, list):
-                    links = []
-                seen_links = set()
-                for link in links:
-                    link_text = str(link).strip()
-                    if not link_text or link_text in seen_links:
-                        continue
-                    seen_links.add(link_text)
-                    KnowledgeEntry.objects.get_or_create(
-                        source_message=message,
-                        course_task=target_task,
-                        entry_type='link',
-                        content=link_text,
+                if new_vector_id:
+                    # Upsert to Vector DB once the task is committed
+                    vector_db.upsert_task(
+                        task_id=new_vector_id,
+                        text=f"{task_title} {summary}",
+                        payload={"title": task_title, "type": analysis_result.get('task_type')}
                     )
 
-                deadlines = analysis_result.get('extracted_deadlines') or []
-                if isinstance(deadlines, dict):
-                    deadlines = [deadlines]
-                if isinstance(deadlines, str):
-                    deadlines = [{"date": deadlines, "description": ""}]
-                if not isinstance(deadlines, list):
-                    deadlines = []
-                seen_deadlines = set()
-                for item in deadlines:
-                    if isinstance(item, str):
-                        date_text = item.strip()
-                        description = ""
-                    elif isinstance(item, dict):
-                        date_text = str(item.get("date") or "").strip()
-                        description = str(item.get("description") or "").strip()
-                    else:
-                        continue
-                    if not date_text and not description:
-                        continue
-                    content_parts = [part for part in [date_text, description] if part]
-                    content = " - ".join(content_parts)
-                    dedupe_key = (date_text, description)
-                    if dedupe_key in seen_deadlines:
-                        continue
-                    seen_deadlines.add(dedupe_key)
-                    KnowledgeEntry.objects.get_or_create(
-                        source_message=message,
-                        course_task=target_task,
-                        entry_type='deadline',
-                        content=content,
+                if vector_db is not None and set(vector_db.degraded) - degraded:
+                    # Task matching fell back to creating a task; re-match it later
+                    degraded |= set(vector_db.degraded)
+                    AnalysisResult.objects.filter(pk=result.pk).update(
+                        degraded=True, degraded_reason=",".join(sorted(degraded)), updated_at=timezone.now()
                     )
 
                 logger.info(f"Successfully processed message {message.id}")
@@ -221,8 +314,154 @@ def process_content_task(ingestion_data_dict: dict):
                 logger.error(f"Message with ID {data.source_id} not found.")
 
         else:
-            # Handle other sources (Stub for now)
-            logger.info(f"Processed non-telegram source: {analysis_result}")
+            save_source_analysis(data, analysis_result, degraded)
+
+        priority.observe(data.metadata)
 
     except Exception as e:
         logger.error(f"Error in process_content_task: {e}", exc_info=True)
+
+
+def save_source_analysis(data: IngestionData, analysis_result: dict, degraded: set) -> SourceAnalysis:
+    """
+    Stores the analysis of a document or web schedule item, linked to its
+    IngestedDocument when there is one.
+    """
+    document_id = data.metadata.get('document_id')
+    if document_id and not IngestedDocument.objects.filter(id=document_id).exists():
+        document_id = None
+    result, _ = SourceAnalysis.objects.update_or_create(
+        source_type=data.source_type,
+        source_id=data.source_id,
+        defaults={
+            'document_id': document_id,
+            'category': analysis_result.get('category', 'other'),
+            'importance_score': analysis_result.get('importance_score', 0),
+            'summary': analysis_result.get('summary') or '',
+            'extracted_links': analysis_result.get('extracted_links', []),
+            'extracted_deadlines': analysis_result.get('extracted_deadlines', []),
+            'metadata': data.metadata,
+            'degraded': bool(degraded),
+        }
+    )
+    logger.info(f"Saved analysis of {data.source_type} item {data.source_id}")
+    return result
+
+
+def discard_knowledge(message: Message) -> None:
+    """
+    Deletes the knowledge entries of `message` and the tasks left without entries.
+    """
+    entries = KnowledgeEntry.objects.filter(source_message=message)
+    task_ids = set(entries.exclude(course_task__isnull=True).values_list('course_task_id', flat=True))
+    entries.delete()
+    if task_ids:
+        CourseTask.objects.filter(id__in=task_ids).annotate(entry_count=Count('entries')).filter(entry_count=0).delete()
+
+
+def message_ingestion_data(message: Message) -> IngestionData:
+    """
+    IngestionData of a stored Telegram message, built like the bot handler does.
+    """
+    text = message.text or ""
+    parent = None
+    if message.reply_to_id:
+        parent = Message.objects.filter(chat=message.chat, tg_message_id=message.reply_to_id).first()
+    if message.sender_role == 'teacher' and parent is not None and parent.text:
+        text = f"Student Question: {parent.text}\nTeacher Answer: {text}"
+    return IngestionData(
+        text=text,
+        source_type='telegram',
+        source_id=str(message.id),
+        metadata={
+            'sender_role': message.sender_role,
+            'chat_title': message.chat.title or 'Private',
+            'is_reply': bool(message.reply_to_id),
+            'reply_to_msg_id': message.reply_to_id,
+            'tg_chat_id': message.chat.tg_chat_id,
+        }
+    )
+
+
+@shared_task
+def process_content_batch(items: list):
+    """
+    Processes a batch of serialized IngestionData in order. One broker
+    message per batch keeps bulk ingestion from flooding the queue.
+    """
+    for item in items:
+        process_content_task(item)
+
+
+@shared_task
+def prune_llm_ledger():
+    """
+    Drops LLM ledger records older than LLM_LEDGER_RETENTION_DAYS (0 keeps them).
+    """
+    if not settings.LLM_LEDGER_RETENTION_DAYS:
+        return 0
+    deleted = ledger.prune(settings.LLM_LEDGER_RETENTION_DAYS)
+    logger.info(f"Pruned {deleted} LLM ledger records")
+    return deleted
+
+
+@shared_task
+def prune_deleted_records():
+    """
+    Drops API sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS (0 keeps them).
+    """
+    if not settings.SYNC_TOMBSTONE_RETENTION_DAYS:
+        return 0
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = DeletedRecord.objects.filter(deleted_at__lt=cutoff).delete()
+    logger.info(f"Pruned {deleted} deleted-record tombstones")
+    return deleted
+
+
+@shared_task
+def keep_models_warm():
+    """
+    Renews the Ollama keep-alive of the chat and embedding models.
+    """
+    if not warmup.enabled():
+        return {}
+    return warmup.warm_up()
+
+
+@shared_task
+def reanalyze_degraded():
+    """
+    Re-queues messages analyzed while a dependency was down. While a needed
+    breaker is half-open only REANALYSIS_PROBE_SIZE messages are queued: they
+    make the probe call, and without live traffic nothing else would. Once
+    the breakers are closed a full batch is queued. Each result is retried at
+    most REANALYSIS_MAX_ATTEMPTS times, so a message that fails on its own
+    (e.g. too long for the model) stops being re-queued. Returns the number
+    of queued messages.
+    """
+    queued = 0
+    probes = 0
+    results = (
+        AnalysisResult.objects.filter(degraded=True, reanalysis_attempts__lt=settings.REANALYSIS_MAX_ATTEMPTS)
+        .select_related('message__chat')
+        .order_by('created_at')
+    )
+    for result in results:
+        if queued >= settings.REANALYSIS_BATCH_SIZE:
+            break
+        reasons = [reason for reason in result.degraded_reason.split(",") if reason]
+        state = breakers.combined_state(reasons)
+        if state == "open" or (state == "half_open" and probes >= settings.REANALYSIS_PROBE_SIZE):
+            continue
+        if not cache.add(f"reanalysis:{result.pk}", 1, timeout=REANALYSIS_LOCK_SECONDS):
+            continue
+        if state == "half_open":
+            probes += 1
+        AnalysisResult.objects.filter(pk=result.pk).update(reanalysis_attempts=F('reanalysis_attempts') + 1)
+        data = message_ingestion_data(result.message)
+        data.metadata['reanalysis'] = True
+        priority.enqueue_analysis(data, bulk=True)
+        queued += 1
+    if queued:
+        logger.info(f"Queued {queued} degraded analyses for re-analysis")
+    return queued
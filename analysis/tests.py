@@ -1,10 +1,18 @@
 import json
+from datetime import date
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
-from analysis.ai_engine import AIService
+from analysis import calendar, counters, events, stats
+from analysis.ai_engine import AIService, PromptFactory
+from analysis.models import AnalysisResult, CategoryStats, ChatStats, CourseTask, DeadlineFeed, KnowledgeEntry
 from analysis.schemas import IngestionData
+from analysis.task_matching import LexicalTaskMatcher, normalize_task_title
+from analysis.tasks import process_content_task
+from core.models import Chat, Message
 
 
 class AIServiceTests(TestCase):
@@ -57,3 +65,1031 @@ class AIServiceTests(TestCase):
         self.assertEqual(result["category"], "other")
         self.assertEqual(result["summary"], "Test message")
         self.assertEqual(result["importance_score"], 2)
+
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_fallbacks_are_counted(self, mock_llm):
+        from prometheus_client import REGISTRY
+
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+
+        before_json = sample("smartarg_llm_invalid_json_total")
+        before_error = sample("smartarg_heuristic_fallbacks_total", reason="llm_error")
+        before_llm = sample("smartarg_stage_duration_seconds_count", stage="llm")
+        data = IngestionData(text="Test", source_type="telegram", source_id="3", metadata={"sender_role": "student"})
+
+        mock_llm.return_value.invoke.return_value = type("FakeResponse", (), {"content": "no json"})()
+        AIService().analyze_content(data)
+        mock_llm.return_value.invoke.side_effect = TimeoutError("model is loading")
+        AIService().analyze_content(data)
+
+        self.assertEqual(sample("smartarg_llm_invalid_json_total"), before_json + 1)
+        self.assertEqual(sample("smartarg_heuristic_fallbacks_total", reason="llm_error"), before_error + 1)
+        self.assertEqual(sample("smartarg_stage_duration_seconds_count", stage="llm"), before_llm + 2)
+
+    def test_web_schedule_prompt_formats(self):
+        messages = PromptFactory.get_prompt("web_schedule").format_messages(text="Лекция в 10:00")
+        self.assertIn('"extracted_deadlines"', messages[0].content)
+
+
+class LexicalTaskMatcherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.chat = Chat.objects.create(tg_chat_id=100, title="Группа", chat_type="group")
+        self.other_chat = Chat.objects.create(tg_chat_id=200, title="Другая", chat_type="group")
+        self.task = CourseTask.objects.create(title="Лабораторная работа №3", chat=self.chat)
+
+    def test_normalize_task_title(self):
+        self.assertEqual(normalize_task_title("Лабораторная работа №03!"), "лабораторная работа 3")
+        self.assertEqual(normalize_task_title("Лаб.3 — отчёт"), "лаб 3 отчет")
+        self.assertEqual(self.task.normalized_title, "лабораторная работа 3")
+
+    def test_exact_match_is_scoped_to_chat(self):
+        matcher = LexicalTaskMatcher()
+        self.assertEqual(matcher.match("лабораторная работа 3", chat=self.chat), self.task)
+        self.assertIsNone(matcher.match("Лабораторная работа №3", chat=self.other_chat))
+
+    def test_near_exact_match_requires_same_numbers(self):
+        matcher = LexicalTaskMatcher()
+        self.assertEqual(matcher.match("Лабораторные работа №3", chat=self.chat), self.task)
+        self.assertIsNone(matcher.match("Лабораторная работа №4", chat=self.chat))
+
+    @patch("analysis.tasks.VectorDBService")
+    @patch("analysis.tasks.AIService")
+    def test_lexical_match_skips_vector_search(self, mock_ai, mock_vector_db):
+        message = Message.objects.create(
+            chat=self.chat,
+            tg_message_id=1,
+            sender_role="teacher",
+            text="Лабораторная работа №3: сдать до 20.05",
+            sent_at=timezone.now(),
+        )
+        mock_ai.return_value.analyze_content.return_value = {
+            "category": "deadline",
+            "importance_score": 8,
+            "task_title": "Лабораторная работа № 3",
+            "summary": "Сдать до 20.05",
+            "extracted_links": [],
+            "extracted_deadlines": [],
+        }
+
+        process_content_task(IngestionData(
+            text=message.text,
+            source_type="telegram",
+            source_id=str(message.id),
+            metadata={"sender_role": "teacher"},
+        ).model_dump())
+
+        mock_vector_db.assert_not_called()
+        entry = KnowledgeEntry.objects.get(source_message=message, entry_type="deadline")
+        self.assertEqual(entry.course_task, self.task)
+        self.assertEqual(counters.get_counts(["task_match.lexical"])["task_match.lexical"], 1)
+
+
+class SourceAnalysisTests(TestCase):
+    @patch("analysis.tasks.AIService")
+    def test_document_results_are_saved_per_item(self, mock_ai):
+        from ingestion.models import IngestedDocument
+        from .models import SourceAnalysis
+
+        document = IngestedDocument.objects.create(sha256="a" * 64, file_name="syllabus.pdf", source="telegram")
+        mock_ai.return_value.analyze_content.return_value = {
+            "category": "deadline",
+            "importance_score": 7,
+            "summary": "Лабораторная 1 до 20.05",
+            "extracted_links": [],
+            "extracted_deadlines": [{"date": "2024-05-20", "description": "Лабораторная 1"}],
+        }
+        payload = IngestionData(
+            text="Лабораторная 1 — до 20.05.",
+            source_type="document",
+            source_id="document:aaaa:1:0:1",
+            metadata={"document_id": document.id, "page_start": 1},
+        ).model_dump()
+
+        process_content_task(payload)
+        process_content_task(payload)
+
+        result = SourceAnalysis.objects.get()
+        self.assertEqual((result.document, result.category, result.importance_score), (document, "deadline", 7))
+        self.assertEqual(result.metadata["page_start"], 1)
+        self.assertEqual(document.analyses.count(), 1)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.chat = Chat.objects.create(tg_chat_id=300, title="Статистика", chat_type="group")
+        self.message = Message.objects.create(
+            chat=self.chat,
+            tg_message_id=1,
+            sender_role="teacher",
+            text="Экзамен 20.06",
+            sent_at=timezone.now(),
+        )
+
+    def test_counters_follow_writes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = AnalysisResult.objects.create(message=self.message, category="deadline", importance_score=8)
+            KnowledgeEntry.objects.create(source_message=self.message, entry_type="deadline", content="20.06")
+        # Analysis counters are bumped after the writing transaction commits
+        self.assertEqual(ChatStats.objects.get(chat=self.chat).knowledge_count, 0)
+        for callback in callbacks:
+            callback()
+
+        chat_stats = ChatStats.objects.get(chat=self.chat)
+        self.assertEqual(chat_stats.message_count, 1)
+        self.assertEqual(chat_stats.knowledge_count, 1)
+        self.assertEqual(chat_stats.importance_sum, 8)
+
+        result.category = "announcement"
+        result.importance_score = 6
+        with self.captureOnCommitCallbacks(execute=True):
+            result.save()
+        self.assertEqual(CategoryStats.objects.get(category="deadline").count, 0)
+        self.assertEqual(CategoryStats.objects.get(category="announcement").importance_sum, 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.message.delete()
+        chat_stats.refresh_from_db()
+        self.assertEqual(
+            (chat_stats.message_count, chat_stats.knowledge_count, chat_stats.analysis_count),
+            (0, 0, 0),
+        )
+
+    def test_rebuild_repairs_drift(self):
+        AnalysisResult.objects.create(message=self.message, category="deadline", importance_score=8)
+        ChatStats.objects.filter(chat=self.chat).update(message_count=42, importance_sum=0)
+        CategoryStats.objects.all().delete()
+
+        stats.rebuild()
+
+        self.assertEqual(stats.dashboard_totals()["total_messages"], 1)
+        self.assertEqual(stats.dashboard_totals()["avg_importance"], 8)
+        self.assertEqual(stats.category_counts(), [{"category": "deadline", "count": 1}])
+
+    def test_chat_delete_does_not_recreate_stats(self):
+        self.chat.delete()
+        self.assertFalse(ChatStats.objects.exists())
+
+
+class DeadlineFeedTests(TestCase):
+    def setUp(self):
+        self.chat = Chat.objects.create(tg_chat_id=400, title="Календарь", chat_type="group")
+        self.message = Message.objects.create(
+            chat=self.chat,
+            tg_message_id=1,
+            sender_role="teacher",
+            text="Лабораторная 3 до 20.05.2024",
+            sent_at=timezone.now(),
+        )
+        self.task = CourseTask.objects.create(title="Лабораторная работа 3", chat=self.chat)
+        KnowledgeEntry.objects.create(
+            source_message=self.message,
+            course_task=self.task,
+            entry_type="deadline",
+            content="20.05.2024 - сдать отчёт",
+        )
+
+    def test_parse_deadline_date(self):
+        reference = date(2024, 11, 1)
+        self.assertEqual(calendar.parse_deadline_date("20.05.2024", reference), date(2024, 5, 20))
+        self.assertEqual(calendar.parse_deadline_date("2024-05-20", reference), date(2024, 5, 20))
+        self.assertEqual(calendar.parse_deadline_date("15.12", reference), date(2024, 12, 15))
+        self.assertEqual(calendar.parse_deadline_date("15.01", reference), date(2025, 1, 15))
+        self.assertIsNone(calendar.parse_deadline_date("relative: завтра", reference))
+        self.assertIsNone(calendar.parse_deadline_date("31.02.2024", reference))
+
+    def test_chat_feed_contains_deadline_events(self):
+        feed = calendar.get_feed(self.chat.id)
+        self.assertIn("DTSTART;VALUE=DATE:20240520", feed.content)
+        self.assertIn("SUMMARY:Лабораторная работа 3: сдать отчёт", feed.content)
+        self.assertTrue(feed.content.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertFalse(feed.dirty)
+
+    def test_task_change_marks_feeds_dirty(self):
+        calendar.get_feed(self.chat.id)
+        calendar.get_feed(include_global=True)
+        self.assertFalse(DeadlineFeed.objects.filter(dirty=True).exists())
+
+        self.task.status = "completed"
+        self.task.save()
+
+        self.assertEqual(DeadlineFeed.objects.filter(dirty=True).count(), 2)
+        self.assertNotIn("VEVENT", calendar.get_feed(include_global=True).content)
+
+    def test_change_during_rebuild_keeps_the_feed_dirty(self):
+        build_events = calendar.task_events
+
+        def change_mid_rebuild(task, entries):
+            # Another process commits a task change after the rebuild read the tasks
+            calendar.mark_dirty(self.chat.id)
+            return build_events(task, entries)
+
+        with patch("analysis.calendar.task_events", side_effect=change_mid_rebuild):
+            feed = calendar.get_feed(self.chat.id)
+        self.assertIn("VEVENT", feed.content)
+        self.assertTrue(feed.dirty)
+
+        self.task.status = "completed"
+        self.task.save()
+        feed = calendar.get_feed(self.chat.id)
+        self.assertNotIn("VEVENT", feed.content)
+        self.assertFalse(feed.dirty)
+
+    def test_deleted_entry_and_renamed_chat_mark_feeds_dirty(self):
+        calendar.get_feed(include_global=True)
+        self.assertFalse(DeadlineFeed.objects.filter(dirty=True).exists())
+
+        KnowledgeEntry.objects.filter(course_task=self.task).delete()
+        self.assertEqual(DeadlineFeed.objects.filter(dirty=True).count(), 2)
+        self.assertNotIn("VEVENT", calendar.get_feed(self.chat.id).content)
+
+        self.chat.title = "Календарь 2"
+        self.chat.save()
+        self.assertIn("X-WR-CALNAME:SmartArg — Календарь 2", calendar.get_feed(self.chat.id).content)
+
+
+@override_settings(EVENTS_REDIS_URL="redis://events.invalid:6379/0")
+class LiveEventsTests(TestCase):
+    def setUp(self):
+        self.chat = Chat.objects.create(tg_chat_id=500, title="События", chat_type="group")
+        self.message = Message.objects.create(
+            chat=self.chat, tg_message_id=1, sender_role="teacher", text="Экзамен", sent_at=timezone.now(),
+        )
+
+    @patch("analysis.events._redis")
+    def test_events_are_published_after_commit(self, mock_redis):
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = AnalysisResult.objects.create(message=self.message, category="announcement", importance_score=3)
+            events.analysis_saved(result)
+            self.assertFalse(mock_redis.return_value.publish.called)
+
+        for callback in callbacks:
+            callback()
+
+        channel, raw = mock_redis.return_value.publish.call_args.args
+        payload = json.loads(raw)
+        self.assertEqual(payload["type"], "analysis")
+        self.assertTrue(payload["data"]["alert"])
+        self.assertEqual(payload["data"]["totals"]["total_messages"], 1)
+
+    @patch("analysis.events._redis")
+    def test_status_change_publishes_once(self, mock_redis):
+        from analysis.tasks import apply_task_action
+
+        task = CourseTask.objects.create(title="Курсовая", chat=self.chat)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_task_action(task, "completed")
+            apply_task_action(task, "completed")
+
+        self.assertEqual(mock_redis.return_value.publish.call_count, 1)
+        payload = json.loads(mock_redis.return_value.publish.call_args.args[1])
+        self.assertEqual((payload["type"], payload["data"]["status"]), ("task_status", "completed"))
+
+    @patch("analysis.events._redis")
+    def test_publish_failure_is_swallowed(self, mock_redis):
+        mock_redis.return_value.publish.side_effect = ConnectionError("redis down")
+        task = CourseTask.objects.create(title="Курсовая", chat=self.chat)
+        with self.captureOnCommitCallbacks(execute=True):
+            events.task_created(task)
+
+
+class BenchmarkTests(TestCase):
+    def test_corpus_is_seeded(self):
+        from analysis.corpus import generate_corpus
+
+        first = [(m.chat.tg_chat_id, m.text, m.reply_to_id) for m in generate_corpus(seed=7, messages=80)]
+        second = [(m.chat.tg_chat_id, m.text, m.reply_to_id) for m in generate_corpus(seed=7, messages=80)]
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, [(m.chat.tg_chat_id, m.text, m.reply_to_id)
+                                    for m in generate_corpus(seed=8, messages=80)])
+
+    def test_every_deadline_format_is_extracted(self):
+        from analysis.corpus import generate_corpus
+
+        service = AIService()
+        corpus = generate_corpus(seed=3, messages=300)
+        deadlines = [m for m in corpus if m.kind == "deadline"]
+        self.assertTrue(deadlines)
+        self.assertTrue(any(m.reply_to_id for m in corpus))
+        for message in deadlines:
+            result = service._heuristic_result(message.ingestion_data("1"))
+            self.assertEqual(result["category"], "deadline", message.text)
+
+    def test_run_benchmarks_with_fakes(self):
+        from analysis.benchmark import compare_results, run_benchmarks
+        from analysis.corpus import generate_corpus
+
+        with self.captureOnCommitCallbacks(execute=True):
+            results = run_benchmarks(
+                generate_corpus(seed=5, messages=40, chats=2),
+                suites=["heuristic", "parse_json", "pipeline"],
+                repeat=1,
+            )
+
+        self.assertEqual(set(results), {"heuristic", "parse_json", "pipeline"})
+        self.assertEqual(results["pipeline"]["count"], 40)
+        self.assertEqual(AnalysisResult.objects.count(), 40)
+        self.assertTrue(CourseTask.objects.exists())
+        self.assertEqual(ChatStats.objects.get(chat__tg_chat_id=-1001000000000).analysis_count,
+                         Message.objects.filter(chat__tg_chat_id=-1001000000000).count())
+
+        baseline = {"results": {"heuristic": {"p50_ms": 1.0}, "pipeline": {"p50_ms": 0.0}}}
+        current = {"results": {"heuristic": {"p50_ms": 1.5}, "pipeline": {"p50_ms": 2.0}}}
+        rows = compare_results(baseline, current, threshold=20)
+        self.assertEqual([(row["name"], row["change_pct"], row["regression"]) for row in rows],
+                         [("heuristic", 50.0, True)])
+
+
+class TracingTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.trace_file = f"{self.directory.name}/traces.jsonl"
+        self.chat = Chat.objects.create(tg_chat_id=-100777, title="Сети")
+
+    def _spans(self):
+        from analysis.tracing import load_spans
+
+        with open(self.trace_file, encoding="utf-8") as fp:
+            return load_spans(fp)
+
+    @patch("analysis.tasks.VectorDBService")
+    @patch("analysis.tasks.AIService")
+    def test_trace_follows_message_into_worker(self, mock_ai, mock_vector_db):
+        from analysis import tracing
+        from analysis.management.commands.trace_report import summarize_traces
+
+        mock_ai.return_value.analyze_content.return_value = {
+            "category": "deadline",
+            "importance_score": 8,
+            "task_title": "Курсовая работа",
+            "summary": "Сдать до 20.05",
+            "extracted_links": [],
+            "extracted_deadlines": [{"date": "20.05", "description": "Сдать"}],
+        }
+        mock_vector_db.return_value.search_tasks.return_value = []
+        message = Message.objects.create(chat=self.chat, tg_message_id=1, sender_role="teacher",
+                                         text="Курсовая: сдать до 20.05", sent_at=timezone.now())
+
+        with self.settings(TRACING_EXPORTER="jsonl", TRACING_FILE=self.trace_file):
+            with tracing.start_trace("telegram.update", chat_id=self.chat.tg_chat_id):
+                with tracing.span("celery.enqueue") as enqueue_id:
+                    context = tracing.inject()
+            process_content_task(IngestionData(
+                text=message.text,
+                source_type="telegram",
+                source_id=str(message.id),
+                metadata={"sender_role": "teacher", tracing.METADATA_KEY: context},
+            ).model_dump())
+
+        spans = self._spans()
+        by_name = {span["name"]: span for span in spans}
+        self.assertEqual({span["trace_id"] for span in spans}, {context["trace_id"]})
+        self.assertTrue({"queue.wait", "process_content_task", "persist", "db.analysis_result",
+                         "db.course_task", "db.knowledge_entry"} <= set(by_name))
+        self.assertEqual(by_name["queue.wait"]["parent_id"], enqueue_id)
+        self.assertEqual(by_name["process_content_task"]["parent_id"], enqueue_id)
+        self.assertEqual(by_name["persist"]["parent_id"], by_name["process_content_task"]["span_id"])
+        self.assertEqual(by_name["db.course_task"]["attributes"]["chat_id"], self.chat.tg_chat_id)
+
+        summary = summarize_traces(spans)
+        self.assertEqual(summary["complete"], 1)
+        self.assertEqual(list(summary["chats"]), [str(self.chat.tg_chat_id)])
+
+    def test_untraced_calls_export_nothing(self):
+        import os
+
+        from analysis import tracing
+
+        with self.settings(TRACING_EXPORTER="jsonl", TRACING_FILE=self.trace_file):
+            with tracing.span("llm") as span_id:
+                self.assertIsNone(span_id)
+            self.assertIsNone(tracing.inject())
+        with self.settings(TRACING_EXPORTER=""), tracing.start_trace("telegram.update") as trace:
+            self.assertIsNone(trace)
+        self.assertFalse(os.path.exists(self.trace_file))
+
+    def test_otlp_payload_round_trip(self):
+        from analysis import tracing
+
+        with self.settings(TRACING_EXPORTER="jsonl", TRACING_FILE=self.trace_file):
+            with tracing.start_trace("telegram.update", chat_id=42):
+                with tracing.span("llm", model="qwen3:8b"):
+                    pass
+        spans = self._spans()
+
+        payload = tracing.otlp_payload(spans)
+        otlp_spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(len(otlp_spans), 2)
+        self.assertNotIn("parentSpanId", next(item for item in otlp_spans if item["name"] == "telegram.update"))
+
+        loaded = tracing.load_spans([json.dumps(payload)])
+        self.assertEqual(
+            sorted((span["name"], span["attributes"]["chat_id"]) for span in loaded),
+            [("llm", 42), ("telegram.update", 42)],
+        )
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        from analysis import profiling
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(profiling.refresh)
+        self.addCleanup(cache.delete, profiling.CACHE_KEY)
+        profiling.refresh()
+
+    def _files(self):
+        import os
+
+        return sorted(os.listdir(self.directory.name)) if os.path.isdir(self.directory.name) else []
+
+    @patch("analysis.tasks.VectorDBService")
+    @patch("analysis.tasks.AIService")
+    def test_sampled_task_writes_tagged_pstats(self, mock_ai, mock_vector_db):
+        import pstats
+
+        mock_ai.return_value.analyze_content.return_value = {
+            "category": "info", "importance_score": 3, "summary": "Объявление",
+            "extracted_links": [], "extracted_deadlines": [],
+        }
+        chat = Chat.objects.create(tg_chat_id=-100555, title="Физика")
+        message = Message.objects.create(chat=chat, tg_message_id=1, sender_role="teacher",
+                                         text="Пара переносится", sent_at=timezone.now())
+
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.directory.name):
+            process_content_task(IngestionData(
+                text=message.text, source_type="telegram", source_id=str(message.id),
+                metadata={"sender_role": "teacher"},
+            ).model_dump())
+
+        files = self._files()
+        self.assertEqual(len(files), 1)
+        self.assertIn("_task_process-content-task_source=telegram_size=16b_", files[0])
+        self.assertTrue(files[0].endswith(".prof"))
+        stats = pstats.Stats(f"{self.directory.name}/{files[0]}")
+        self.assertTrue(any(name == "process_content_task" for _, _, name in stats.stats))
+
+    def test_admin_switch_profiles_views_as_collapsed_stacks(self):
+        from datetime import timedelta
+
+        from analysis.models import ProfilingSwitch
+
+        with self.settings(PROFILING_DIR=self.directory.name, PROFILING_INTERVAL_MS=1):
+            self.client.get("/chats/")
+            self.assertEqual(self._files(), [])
+
+            switch = ProfilingSwitch.objects.create(sample_rate=1.0, target="views", output_format="collapsed")
+            self.client.get("/chats/")
+            files = self._files()
+            self.assertEqual(len(files), 1)
+            self.assertIn("_view_chats_method=GET_size=", files[0])
+            self.assertTrue(files[0].endswith(".collapsed"))
+
+            switch.expires_at = timezone.now() - timedelta(minutes=1)
+            switch.save()
+            self.client.get("/chats/")
+            self.assertEqual(len(self._files()), 1)
+
+    def test_middleware_runs_natively_under_asgi(self):
+        import asyncio
+
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from analysis import profiling
+        from analysis.profiling import ProfilingMiddleware
+
+        async def view(request):
+            return HttpResponse("ok")
+
+        middleware = ProfilingMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertFalse(asyncio.iscoroutinefunction(ProfilingMiddleware(lambda request: HttpResponse())))
+
+        request = RequestFactory().get("/chats/")
+        self.assertEqual(asyncio.run(middleware(request)).content, b"ok")
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.directory.name):
+            profiling.refresh()
+            asyncio.run(middleware(request))
+        files = self._files()
+        self.assertEqual(len(files), 1)
+        self.assertIn("_view_chats_method=GET_size=2b_", files[0])
+
+    def test_stack_sampler_collapses_stacks(self):
+        import time
+
+        from analysis.profiling import StackSampler
+
+        sampler = StackSampler("root", interval=0.001)
+        sampler.start()
+        deadline = time.monotonic() + 0.05
+        while time.monotonic() < deadline:
+            sum(range(1000))
+        sampler.stop()
+
+        lines = sampler.collapsed().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.startswith("root;"))
+        self.assertIn("test_stack_sampler_collapses_stacks", stack)
+        self.assertGreater(int(count), 0)
+
+
+class LLMLedgerTests(TestCase):
+    def setUp(self):
+        self.chat = Chat.objects.create(tg_chat_id=-100888, title="Химия")
+        self.message = Message.objects.create(chat=self.chat, tg_message_id=1, sender_role="teacher",
+                                              text="Контрольная 12.04", sent_at=timezone.now())
+
+    def _payload(self):
+        return IngestionData(
+            text=self.message.text,
+            source_type="telegram",
+            source_id=str(self.message.id),
+            metadata={"sender_role": "teacher"},
+        ).model_dump()
+
+    @patch("analysis.tasks.VectorDBService")
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_task_calls_are_linked_to_the_result(self, mock_llm, mock_vector_db):
+        from analysis.ai_engine import PromptFactory
+        from analysis.models import LLMCall
+
+        mock_llm.return_value.invoke.return_value = type("FakeResponse", (), {
+            "content": json.dumps({"category": "deadline", "importance_score": 6, "summary": "Контрольная"}),
+            "usage_metadata": {"input_tokens": 420, "output_tokens": 35, "total_tokens": 455},
+        })()
+        mock_vector_db.return_value.search_tasks.return_value = []
+
+        process_content_task(self._payload())
+
+        call = LLMCall.objects.get()
+        self.assertEqual((call.kind, call.outcome, call.source_type), ("llm", "ok", "telegram"))
+        self.assertEqual((call.input_tokens, call.output_tokens), (420, 35))
+        self.assertEqual(call.prompt_version, PromptFactory.version("telegram"))
+        self.assertEqual(call.analysis_result, self.message.analysis_result)
+        self.assertEqual(call.chat, self.chat)
+
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_outcomes_outside_a_task(self, mock_llm):
+        from analysis.models import LLMCall
+
+        mock_llm.return_value.invoke.side_effect = [
+            type("FakeResponse", (), {"content": "not a json response"})(),
+            RuntimeError("connection refused"),
+        ]
+        service = AIService()
+        data = IngestionData(**self._payload())
+        service.analyze_content(data)
+        service.analyze_content(data)
+        service.llm = None
+        service.analyze_content(data)
+
+        self.assertEqual(
+            list(LLMCall.objects.order_by("id").values_list("outcome", flat=True)),
+            ["invalid_json", "error", "heuristic"],
+        )
+        self.assertFalse(LLMCall.objects.filter(analysis_result__isnull=False).exists())
+
+    def test_daily_report(self):
+        from analysis import ledger
+        from analysis.models import LLMCall
+
+        now = timezone.now()
+        LLMCall.objects.bulk_create([
+            LLMCall(kind="llm", model="qwen3:8b", outcome="ok", input_tokens=400, output_tokens=50,
+                    latency_ms=2000, chat=self.chat, created_at=now),
+            LLMCall(kind="llm", model="qwen3:8b", outcome="invalid_json", input_tokens=380, output_tokens=30,
+                    latency_ms=3000, chat=self.chat, created_at=now),
+            LLMCall(kind="embedding", model="nomic", outcome="cache_hit", chat=self.chat, created_at=now),
+            LLMCall(kind="llm", model="qwen3:8b", outcome="ok", input_tokens=1, output_tokens=1,
+                    latency_ms=1, chat=self.chat, created_at=now - timezone.timedelta(days=30)),
+        ])
+
+        row, = ledger.daily_report(days=7)
+        self.assertEqual(row["chat_title"], "Химия")
+        self.assertEqual((row["calls"], row["llm_calls"], row["cache_hits"], row["fallbacks"]), (3, 2, 1, 1))
+        self.assertEqual((row["input_tokens"], row["output_tokens"]), (780, 80))
+        self.assertEqual(row["output_tokens_per_second"], 16.0)
+
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        response = self.client.get("/admin/analysis/llmcall/report/?days=7")
+        self.assertContains(response, "Химия")
+        self.assertContains(response, "<td>780</td>", html=True)
+
+
+class ModelRoutingTests(TestCase):
+    def _data(self, text):
+        return IngestionData(text=text, source_type="telegram", source_id="1", metadata={"sender_role": "teacher"})
+
+    def _response(self, payload, input_tokens=10, output_tokens=5):
+        return type("FakeResponse", (), {
+            "content": json.dumps(payload),
+            "usage_metadata": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+        })()
+
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_heuristic_classifier_skips_small_talk(self, mock_llm):
+        from analysis.models import LLMCall
+
+        mock_llm.return_value.invoke.return_value = self._response({"category": "deadline", "importance_score": 8})
+        routing = {"telegram": {"classifier": "heuristic", "threshold": 0.5, "model": "qwen3:8b"}}
+        with self.settings(AI_ROUTING=routing, AI_MODEL_NAME="qwen3:1.7b"):
+            service = AIService()
+            skipped = service.analyze_content(self._data("Спасибо, ок"))
+            routed = service.analyze_content(self._data("Лабораторную сдать до 15.03"))
+
+        self.assertEqual((skipped["category"], skipped["importance_score"]), ("other", 1))
+        self.assertEqual(routed["category"], "deadline")
+        self.assertEqual(mock_llm.return_value.invoke.call_count, 1)
+        self.assertEqual(mock_llm.call_args.kwargs["model"], "qwen3:8b")
+        call = LLMCall.objects.get()
+        self.assertEqual((call.tier, call.model), ("extractor", "qwen3:8b"))
+
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_model_classifier(self, mock_llm):
+        from analysis.models import LLMCall
+
+        mock_llm.return_value.invoke.side_effect = [
+            self._response({"relevant": False, "confidence": 0.9}),
+            RuntimeError("classifier is down"),
+            self._response({"category": "announcement", "importance_score": 6}),
+        ]
+        routing = {"*": {"classifier": "qwen3:1.7b", "threshold": 0.5}}
+        with self.settings(AI_ROUTING=routing, AI_MODEL_NAME="qwen3:8b"):
+            service = AIService()
+            skipped = service.analyze_content(self._data("Хорошо, понял"))
+            # A failing classifier sends the message to the extractor
+            routed = service.analyze_content(self._data("Завтра пары не будет"))
+
+        self.assertEqual(skipped["category"], "other")
+        self.assertEqual(routed["category"], "announcement")
+        self.assertEqual(
+            list(LLMCall.objects.order_by("id").values_list("tier", "model", "outcome")),
+            [("classifier", "qwen3:1.7b", "ok"), ("classifier", "qwen3:1.7b", "error"),
+             ("extractor", "qwen3:8b", "ok")],
+        )
+
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_unrouted_source_type_uses_one_model(self, mock_llm):
+        from analysis.models import LLMCall
+
+        mock_llm.return_value.invoke.return_value = self._response({"category": "other", "importance_score": 2})
+        with self.settings(AI_ROUTING={"web": {"classifier": "heuristic"}}):
+            AIService().analyze_content(self._data("Спасибо, ок"))
+
+        self.assertEqual(mock_llm.return_value.invoke.call_count, 1)
+        self.assertEqual(LLMCall.objects.get().tier, "")
+
+
+class ModelWarmupTests(TestCase):
+    def setUp(self):
+        from analysis import warmup
+
+        cache.delete_many([warmup.READY_KEY, warmup.FAILED_KEY])
+        self.addCleanup(cache.delete_many, [warmup.READY_KEY, warmup.FAILED_KEY])
+
+    def test_keep_alive_seconds(self):
+        from analysis.warmup import keep_alive_seconds
+
+        self.assertEqual(keep_alive_seconds("10m"), 600)
+        self.assertEqual(keep_alive_seconds("1h"), 3600)
+        self.assertEqual(keep_alive_seconds("300"), 300)
+        self.assertIsNone(keep_alive_seconds("-1"))
+
+    def test_warm_up_loads_every_model_and_sets_the_flag(self):
+        from analysis import warmup
+        from analysis.vector_db import EMBEDDING_MODEL
+
+        routing = {"telegram": {"classifier": "qwen3:1.7b"}, "web": {"classifier": "heuristic"}}
+        loads = {"qwen3:8b": 12.5, "qwen3:1.7b": 0.0, EMBEDDING_MODEL: 3.0}
+        with self.settings(AI_MODEL_NAME="qwen3:8b", AI_ROUTING=routing, OLLAMA_WARMUP=True), \
+                patch("analysis.warmup._load", side_effect=lambda model, kind: loads[model]) as mock_load:
+            self.assertEqual(warmup.warm_up(), loads)
+            self.assertTrue(warmup.is_ready())
+
+        self.assertEqual(
+            [call.args for call in mock_load.call_args_list],
+            [("qwen3:8b", "chat"), ("qwen3:1.7b", "chat"), (EMBEDDING_MODEL, "embedding")],
+        )
+
+    def test_task_waits_for_warm_models(self):
+        from analysis import warmup
+
+        order = []
+        with self.settings(OLLAMA_WARMUP=True, OLLAMA_WARMUP_TIMEOUT=5, AI_ROUTING={}), \
+                patch("analysis.warmup._load", side_effect=lambda model, kind: 0.0) as mock_load:
+            task = warmup.requires_warm_models(lambda: order.append("task"))
+            task()
+            task()
+
+        # The chat model and the embedder are loaded once, before the first task
+        self.assertEqual(order, ["task", "task"])
+        self.assertEqual(mock_load.call_count, 2)
+
+    def test_failed_warm_up_does_not_block(self):
+        from analysis import warmup
+
+        with self.settings(OLLAMA_WARMUP=True, OLLAMA_WARMUP_TIMEOUT=5), \
+                patch("analysis.warmup._load", side_effect=ConnectionError("refused")):
+            self.assertFalse(warmup.ensure_warm())
+            self.assertFalse(warmup.is_ready())
+
+    def test_failed_warm_up_is_not_retried_by_every_task(self):
+        from analysis import warmup
+
+        order = []
+        with self.settings(OLLAMA_WARMUP=True, OLLAMA_WARMUP_TIMEOUT=5, AI_ROUTING={}), \
+                patch("analysis.warmup._load", side_effect=ConnectionError("refused")) as mock_load, \
+                patch("analysis.warmup.time.sleep") as mock_sleep:
+            task = warmup.requires_warm_models(lambda: order.append("task"))
+            task()
+            task()
+            self.assertFalse(warmup.ensure_warm())
+
+        self.assertEqual(order, ["task", "task"])
+        # Only the first task tried the two models; nobody waited for the lock
+        self.assertEqual(mock_load.call_count, 2)
+        mock_sleep.assert_not_called()
+
+        # The beat task's successful warm-up clears the failed flag
+        with self.settings(AI_ROUTING={}), patch("analysis.warmup._load", return_value=0.0):
+            warmup.warm_up()
+        self.assertFalse(warmup.recently_failed())
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.chat = Chat.objects.create(tg_chat_id=-100777, title="Физика")
+        self.message = Message.objects.create(chat=self.chat, tg_message_id=1, sender_role="teacher",
+                                              text="Контрольная 12.04", sent_at=timezone.now())
+
+    def _payload(self):
+        return IngestionData(
+            text=self.message.text,
+            source_type="telegram",
+            source_id=str(self.message.id),
+            metadata={"sender_role": "teacher"},
+        ).model_dump()
+
+    @patch("analysis.breakers.time.sleep")
+    def test_retries_with_backoff_then_opens(self, mock_sleep):
+        from analysis import breakers
+
+        failing = Exception("connection refused")
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            raise failing
+
+        with self.settings(BREAKER_FAILURE_THRESHOLD=2, BREAKER_BACKOFF_BASE=0.5, BREAKER_BACKOFF_MAX=8):
+            breaker = breakers.get("qdrant")
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    breaker.call(flaky)
+            self.assertEqual(breaker.state(), "open")
+            with self.assertRaises(breakers.CircuitOpenError):
+                breaker.call(flaky)
+
+        # Two retries per call, no call at all while open
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(mock_sleep.call_count, 4)
+        self.assertTrue(all(0 <= call.args[0] <= 1.0 for call in mock_sleep.call_args_list))
+
+    def test_half_open_lets_one_probe_through(self):
+        from analysis import breakers
+
+        breaker = breakers.get("llm")
+        cache.set(breaker._key("open_until"), 0, timeout=None)
+        self.assertEqual(breaker.state(), "half_open")
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), "open")
+        cache.set(breaker._key("open_until"), 0, timeout=None)
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state(), "closed")
+
+        # A success while closed and clean writes nothing
+        with patch("analysis.breakers.cache.delete_many") as mock_delete:
+            breaker.record_success()
+        mock_delete.assert_not_called()
+
+    @patch("analysis.tasks.VectorDBService")
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_open_llm_breaker_fast_paths_to_heuristic(self, mock_llm, mock_vector_db):
+        mock_llm.return_value.invoke.side_effect = TimeoutError("model is loading")
+        mock_vector_db.return_value.search_tasks.return_value = []
+        with self.settings(BREAKER_FAILURE_THRESHOLD=2):
+            for _ in range(3):
+                process_content_task(self._payload())
+
+        # The third task does not call the LLM at all
+        self.assertEqual(mock_llm.return_value.invoke.call_count, 2)
+        result = AnalysisResult.objects.get(message=self.message)
+        self.assertEqual(result.category, "deadline")
+        self.assertTrue(result.degraded)
+        self.assertEqual(result.degraded_reason, "llm")
+
+    @patch("analysis.tasks.VectorDBService")
+    @patch("analysis.ai_engine.ChatOpenAI")
+    def test_failed_task_matching_marks_result_degraded(self, mock_llm, mock_vector_db):
+        mock_llm.return_value.invoke.return_value = type("FakeResponse", (), {"content": json.dumps({
+            "category": "deadline", "importance_score": 8, "task_title": "Контрольная", "summary": "12.04",
+        })})()
+        mock_vector_db.return_value.search_tasks.return_value = []
+        mock_vector_db.return_value.degraded = {"qdrant"}
+
+        process_content_task(self._payload())
+
+        result = AnalysisResult.objects.get(message=self.message)
+        self.assertEqual((result.degraded, result.degraded_reason), (True, "qdrant"))
+
+    @patch("analysis.tasks.process_content_task.apply_async")
+    def test_reanalysis_waits_for_the_breaker(self, mock_apply):
+        from analysis import breakers
+        from analysis.tasks import reanalyze_degraded
+
+        task = CourseTask.objects.create(title="Дедлайн 12.04", chat=self.chat)
+        KnowledgeEntry.objects.create(source_message=self.message, course_task=task, entry_type="deadline",
+                                      content="12.04")
+        AnalysisResult.objects.create(message=self.message, category="deadline", degraded=True,
+                                      degraded_reason="llm")
+        other = Message.objects.create(chat=self.chat, tg_message_id=2, sender_role="teacher",
+                                       text="Зачёт 20.04", sent_at=timezone.now())
+        AnalysisResult.objects.create(message=other, degraded=True, degraded_reason="llm")
+        cache.set(breakers.get("llm")._key("open_until"), timezone.now().timestamp() + 60, timeout=None)
+        self.assertEqual(reanalyze_degraded(), 0)
+        # Half-open: one message is queued to make the probe call
+        cache.set(breakers.get("llm")._key("open_until"), 0, timeout=None)
+        self.assertEqual(reanalyze_degraded(), 1)
+        payload = mock_apply.call_args.kwargs["args"][0]
+
+        breakers.get("llm").record_success()
+        self.assertEqual(reanalyze_degraded(), 1)
+        # Already queued
+        self.assertEqual(reanalyze_degraded(), 0)
+        self.assertEqual(mock_apply.call_args.kwargs["queue"], "analysis.bulk")
+        self.assertEqual(payload["source_id"], str(self.message.id))
+        self.assertTrue(payload["metadata"]["reanalysis"])
+
+        with patch("analysis.tasks.AIService") as mock_ai:
+            mock_ai.return_value.analyze_content.return_value = {
+                "category": "other", "importance_score": 2, "summary": "",
+            }
+            process_content_task(payload)
+
+        result = AnalysisResult.objects.get(message=self.message)
+        self.assertFalse(result.degraded)
+        self.assertEqual(result.category, "other")
+        self.assertFalse(KnowledgeEntry.objects.filter(source_message=self.message).exists())
+        self.assertFalse(CourseTask.objects.filter(pk=task.pk).exists())
+
+    @patch("analysis.tasks.process_content_task.apply_async")
+    def test_reanalysis_attempts_are_capped(self, mock_apply):
+        from analysis.tasks import reanalyze_degraded
+
+        AnalysisResult.objects.create(message=self.message, degraded=True, degraded_reason="llm")
+        with self.settings(REANALYSIS_MAX_ATTEMPTS=2):
+            for _ in range(3):
+                reanalyze_degraded()
+                cache.clear()
+
+        self.assertEqual(mock_apply.call_count, 2)
+        self.assertEqual(AnalysisResult.objects.get(message=self.message).reanalysis_attempts, 2)
+
+    @patch("analysis.tasks.VectorDBService")
+    def test_missing_llm_client_is_not_degraded(self, mock_vector_db):
+        mock_vector_db.return_value.search_tasks.return_value = []
+        mock_vector_db.return_value.degraded = set()
+        with patch("analysis.ai_engine.ChatOpenAI", side_effect=Exception("no api key")):
+            process_content_task(self._payload())
+
+        self.assertFalse(AnalysisResult.objects.get(message=self.message).degraded)
+
+    def test_collection_is_ensured_lazily(self):
+        from analysis import vector_db
+
+        with patch("analysis.vector_db.QdrantClient") as mock_client, \
+                patch("analysis.vector_db.OllamaEmbeddings") as mock_embeddings:
+            mock_embeddings.return_value.embed_query.return_value = [0.1]
+            mock_client.return_value.search.return_value = []
+            vector_db._ensured_collections.discard("course_tasks")
+            service = vector_db.VectorDBService()
+            mock_client.return_value.get_collections.assert_not_called()
+            service.search_tasks("Контрольная")
+            service.search_tasks("Контрольная")
+
+        mock_client.return_value.get_collections.assert_called_once()
+        self.assertEqual(service.degraded, set())
+
+
+class PriorityQueueTests(TestCase):
+    def _data(self, text, sender_role="teacher", source_type="telegram"):
+        return IngestionData(text=text, source_type=source_type, source_id="1", metadata={"sender_role": sender_role})
+
+    def test_classify(self):
+        from analysis import priority
+
+        self.assertEqual(priority.classify(self._data("Экзамен перенесён на завтра")), "urgent")
+        self.assertEqual(priority.classify(self._data("Срочно пришлите отчёты")), "urgent")
+        self.assertEqual(priority.classify(self._data("Хорошая работа на семинаре")), "live")
+        # Deadline words alone, or a date beyond the window, are not urgent
+        self.assertEqual(priority.classify(self._data("Срок сдачи лабораторной указан в задании")), "live")
+        self.assertEqual(priority.classify(self._data("Лабораторную сдать на следующей неделе")), "live")
+        self.assertEqual(priority.classify(self._data("Когда экзамен завтра?", sender_role="student")), "bulk")
+        self.assertEqual(priority.classify(self._data("Лекция 10:00", source_type="web_schedule")), "bulk")
+        self.assertEqual(priority.classify(self._data("Экзамен перенесён на завтра"), bulk=True), "bulk")
+        # Keywords in the quoted student question don't make the answer urgent
+        reply = "Student Question: Экзамен завтра? Срочно!\nTeacher Answer: Посмотрите расписание на сайте"
+        self.assertEqual(priority.classify(self._data(reply)), "live")
+
+    def test_has_near_date(self):
+        from datetime import date
+
+        from analysis import priority
+
+        today = date(2024, 5, 18)
+        self.assertTrue(priority.has_near_date("сдать до 20.05", today))
+        self.assertTrue(priority.has_near_date("зачёт 19 мая", today))
+        self.assertTrue(priority.has_near_date("консультация послезавтра", today))
+        self.assertFalse(priority.has_near_date("сдать до 25.05", today))
+        self.assertFalse(priority.has_near_date("экзамен 30 мая 2024", today))
+        self.assertFalse(priority.has_near_date("итоги за 15.05", today))
+        self.assertFalse(priority.has_near_date("сдать до 31.02", today))
+        with self.settings(URGENT_DATE_WINDOW_DAYS=7):
+            self.assertTrue(priority.has_near_date("сдать до 25.05", today))
+
+    @patch("analysis.tasks.process_content_task.apply_async")
+    def test_enqueue_routes_to_the_class_queue(self, mock_apply):
+        from analysis import priority
+
+        self.assertEqual(priority.enqueue_analysis(self._data("Срочно: дедлайн по лабораторной перенесён")), "urgent")
+
+        self.assertEqual(mock_apply.call_args.kwargs["queue"], "analysis.urgent")
+        metadata = mock_apply.call_args.kwargs["args"][0]["metadata"]
+        self.assertEqual(metadata["priority"], "urgent")
+        self.assertIn("enqueued_at", metadata)
+
+        signature = priority.batch_signature([self._data("Лекция", source_type="web_schedule")])
+        self.assertEqual(signature.options["queue"], "analysis.bulk")
+        self.assertEqual(signature.args[0][0]["metadata"]["priority"], "bulk")
+
+    def test_time_to_analysis_is_checked_against_the_objective(self):
+        import time
+
+        from prometheus_client import REGISTRY
+
+        from analysis import priority
+
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+
+        before_count = sample("smartarg_time_to_analysis_seconds_count", priority="live")
+        before_breaches = sample("smartarg_analysis_slo_breaches_total", priority="live")
+        with self.settings(ANALYSIS_SLO_SECONDS={"urgent": 60, "live": 300, "bulk": 0}):
+            priority.observe({"priority": "live", "enqueued_at": time.time() - 5})
+            priority.observe({"priority": "live", "enqueued_at": time.time() - 600})
+            priority.observe({"sender_role": "teacher"})
+
+        self.assertEqual(sample("smartarg_time_to_analysis_seconds_count", priority="live"), before_count + 2)
+        self.assertEqual(sample("smartarg_analysis_slo_breaches_total", priority="live"), before_breaches + 1)
+
+
+class TaskMatchingTransactionTests(TestCase):
+    @patch("analysis.tasks.VectorDBService")
+    @patch("analysis.tasks.AIService")
+    def test_vector_calls_run_outside_the_transaction(self, mock_ai, mock_vector_db):
+        from django.db import connection
+
+        chat = Chat.objects.create(tg_chat_id=-100555, title="История")
+        message = Message.objects.create(chat=chat, tg_message_id=1, sender_role="teacher",
+                                         text="Реферат до 01.06", sent_at=timezone.now())
+        mock_ai.return_value.analyze_content.return_value = {
+            "category": "deadline", "importance_score": 8, "task_title": "Реферат", "summary": "До 01.06",
+        }
+        depth = len(connection.atomic_blocks)
+        depths = []
+        mock_vector_db.return_value.search_tasks.side_effect = lambda *args, **kwargs: depths.append(
+            len(connection.atomic_blocks)) or []
+        mock_vector_db.return_value.upsert_task.side_effect = lambda **kwargs: depths.append(
+            len(connection.atomic_blocks))
+
+        process_content_task(IngestionData(text=message.text, source_type="telegram", source_id=str(message.id),
+                                           metadata={"sender_role": "teacher"}).model_dump())
+
+        self.assertEqual(depths, [depth, depth])
+        self.assertTrue(CourseTask.objects.filter(title="Реферат", chat=chat).exists())
@@ -0,0 +1,275 @@
+"""
+Lightweight end-to-end tracing from a Telegram update to its knowledge entries.
+
+The bot starts a trace in on_message and passes its context to the worker in
+the Celery payload (metadata["trace"]); the worker continues it, records the
+time the task sat in the queue, and nests spans for the LLM, embedding, vector
+and DB calls. Finished spans are exported per process either as JSON lines
+(TRACING_FILE) or as OTLP/HTTP JSON to a local collector. Outside a trace,
+span() is a no-op, so untraced callers (bulk ingestion, tests) pay nothing.
+"""
+import functools
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEY = "trace"
+
+# OTLP posts leave the request or task thread; one worker keeps their order
+EXPORT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-export")
+_file_lock = threading.Lock()
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    attributes: Dict
+    spans: List[Dict] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, span: Dict) -> None:
+        with self.lock:
+            self.spans.append(span)
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span_id: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+
+def enabled() -> bool:
+    return settings.TRACING_EXPORTER in ("jsonl", "otlp")
+
+
+def _new_span(trace: Trace, name: str, parent_id: Optional[str], start_ns: int, end_ns: int,
+              attributes: Dict, span_id: Optional[str] = None) -> Dict:
+    return {
+        "trace_id": trace.trace_id,
+        "span_id": span_id or secrets.token_hex(8),
+        "parent_id": parent_id,
+        "name": name,
+        "service": settings.TRACING_SERVICE_NAME,
+        "start_ns": start_ns,
+        "end_ns": end_ns,
+        "duration_ms": round((end_ns - start_ns) / 1e6, 3),
+        "attributes": {**trace.attributes, **attributes},
+    }
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[str]]:
+    """
+    Records a child span of the current span; yields its id (None when untraced).
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    span_id = secrets.token_hex(8)
+    parent_id = _span_id.get()
+    token = _span_id.set(span_id)
+    start_ns = time.time_ns()
+    try:
+        yield span_id
+    except Exception as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _span_id.reset(token)
+        trace.record(_new_span(trace, name, parent_id, start_ns, time.time_ns(), attributes, span_id))
+
+
+@contextmanager
+def _activate(trace: Trace, parent_id: Optional[str]):
+    trace_token = _trace.set(trace)
+    span_token = _span_id.set(parent_id)
+    try:
+        yield
+    finally:
+        _span_id.reset(span_token)
+        _trace.reset(trace_token)
+        export(trace.spans)
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Optional[Trace]]:
+    """
+    Starts a new sampled trace with a root span `name`.
+    """
+    if not enabled() or random.random() >= settings.TRACING_SAMPLE_RATE:
+        yield None
+        return
+    trace = Trace(trace_id=secrets.token_hex(16), attributes=attributes)
+    with _activate(trace, None), span(name):
+        yield trace
+
+
+@contextmanager
+def continue_trace(context: Optional[Dict], name: str, **attributes) -> Iterator[Optional[Trace]]:
+    """
+    Continues a trace injected by another process. The gap between the
+    injection and now is recorded as a "queue.wait" span.
+    """
+    if not context or not enabled():
+        yield None
+        return
+    try:
+        trace = Trace(trace_id=str(context["trace_id"]), attributes={**context.get("attributes", {}), **attributes})
+        parent_id = context.get("parent_id")
+        enqueued_at = int(context["enqueued_at"])
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"Ignoring malformed trace context: {context!r}")
+        yield None
+        return
+    trace.record(_new_span(trace, "queue.wait", parent_id, enqueued_at, time.time_ns(), {}))
+    with _activate(trace, parent_id), span(name):
+        yield trace
+
+
+def inject() -> Optional[Dict]:
+    """
+    Serializable context of the current span, for metadata["trace"].
+    """
+    trace = _trace.get()
+    if trace is None:
+        return None
+    return {
+        "trace_id": trace.trace_id,
+        "parent_id": _span_id.get(),
+        "enqueued_at": time.time_ns(),
+        "attributes": trace.attributes,
+    }
+
+
+def traced(name: str):
+    """
+    Decorator for tasks taking a serialized IngestionData: continues the
+    trace carried in its metadata for the duration of the call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(payload, *args, **kwargs):
+            context = None
+            if isinstance(payload, dict):
+                context = (payload.get("metadata") or {}).get(METADATA_KEY)
+            with continue_trace(context, name):
+                return func(payload, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: List[Dict]) -> Dict:
+    """
+    OTLP/HTTP JSON body (ExportTraceServiceRequest) for finished spans.
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": settings.TRACING_SERVICE_NAME}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "smartarg"},
+                "spans": [
+                    {
+                        "traceId": item["trace_id"],
+                        "spanId": item["span_id"],
+                        **({"parentSpanId": item["parent_id"]} if item["parent_id"] else {}),
+                        "name": item["name"],
+                        "kind": 1,
+                        "startTimeUnixNano": str(item["start_ns"]),
+                        "endTimeUnixNano": str(item["end_ns"]),
+                        "attributes": [
+                            {"key": key, "value": _otlp_value(value)}
+                            for key, value in item["attributes"].items() if value is not None
+                        ],
+                    }
+                    for item in spans
+                ],
+            }],
+        }],
+    }
+
+
+def _post_otlp(spans: List[Dict]) -> None:
+    import httpx
+
+    try:
+        httpx.post(settings.TRACING_OTLP_ENDPOINT, json=otlp_payload(spans), timeout=2.0).raise_for_status()
+    except Exception as e:
+        logger.warning(f"Failed to export {len(spans)} spans to {settings.TRACING_OTLP_ENDPOINT}: {e}")
+
+
+def _write_jsonl(spans: List[Dict]) -> None:
+    lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in spans)
+    try:
+        with _file_lock, open(settings.TRACING_FILE, "a", encoding="utf-8") as fp:
+            fp.write(lines)
+    except OSError as e:
+        logger.warning(f"Failed to write spans to {settings.TRACING_FILE}: {e}")
+
+
+def export(spans: List[Dict]) -> None:
+    if not spans:
+        return
+    if settings.TRACING_EXPORTER == "otlp":
+        EXPORT_EXECUTOR.submit(_post_otlp, list(spans))
+    elif settings.TRACING_EXPORTER == "jsonl":
+        _write_jsonl(spans)
+
+
+def load_spans(lines: Iterator[str]) -> List[Dict]:
+    """
+    Reads spans written by the JSONL exporter, or OTLP JSON lines as written
+    by the collector's file exporter.
+    """
+    spans = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if "resourceSpans" not in record:
+            spans.append(record)
+            continue
+        for resource in record["resourceSpans"]:
+            for scope in resource.get("scopeSpans", []):
+                for item in scope.get("spans", []):
+                    attributes = {}
+                    for attribute in item.get("attributes", []):
+                        value = attribute.get("value", {})
+                        raw = next(iter(value.values()), None)
+                        attributes[attribute["key"]] = int(raw) if "intValue" in value else raw
+                    spans.append({
+                        "trace_id": item["traceId"],
+                        "span_id": item["spanId"],
+                        "parent_id": item.get("parentSpanId") or None,
+                        "name": item["name"],
+                        "start_ns": int(item["startTimeUnixNano"]),
+                        "end_ns": int(item["endTimeUnixNano"]),
+                        "attributes": attributes,
+                    })
+    return spans
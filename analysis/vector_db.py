@@ -1,39 +1,65 @@
 import os
+import hashlib
 import logging
-from typing import List, Optional, Dict
+import time
+from typing import List, Optional, Dict, Set
+from django.conf import settings
+from django.core.cache import cache
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from langchain_ollama import OllamaEmbeddings
 
+from . import breakers, ledger, metrics, tracing
+
 logger = logging.getLogger(__name__)
 
+# Query embeddings are deterministic per model, so repeated searches reuse them
+EMBEDDING_MODEL = "nomic-embed-text-v2-moe"
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 24 * 60 * 60))
+
+# Collections this process has already checked or created
+_ensured_collections: Set[str] = set()
+
 class VectorDBService:
     def __init__(self):
         self.qdrant_url = os.getenv("QDRANT_URL", "http://qdrant:6333")
         self.collection_name = "course_tasks"
-        self.client = QdrantClient(url=self.qdrant_url)
+        # Retries and backoff are done by the "qdrant" and "embedding" circuit breakers.
+        # No version check: it is a request to Qdrant before any work is done
+        self.client = QdrantClient(
+            url=self.qdrant_url,
+            timeout=int(settings.DEPENDENCY_TIMEOUTS["qdrant"]),
+            check_compatibility=False,
+        )
         
         # Configure Ollama Embeddings
         # We strip /v1 because langchain_ollama expects the base ollama URL
         base_url = os.getenv("AI_BASE_URL", "http://ollama:11434").replace("/v1", "")
-        self.embedding_model = "nomic-embed-text-v2-moe"
+        self.embedding_model = EMBEDDING_MODEL
         
         self.embeddings = OllamaEmbeddings(
             base_url=base_url,
-            model=self.embedding_model
+            model=self.embedding_model,
+            client_kwargs={"timeout": settings.DEPENDENCY_TIMEOUTS["embedding"]},
         )
         # nomic-embed-text-v2-moe supports Matryoshka learning, but defaults to 768
         self.vector_size = 768 
-
-        self._ensure_collection()
+        # Dependencies ("embedding", "qdrant") that failed or were skipped by an open breaker
+        self.degraded: Set[str] = set()
 
     def _ensure_collection(self):
+        """
+        Creates the collection if missing. Called before the first search or
+        upsert of the process rather than in __init__, so a Qdrant outage does
+        not hold up tasks that never reach the vector store.
+        """
         try:
-            collections = self.client.get_collections()
+            collections = breakers.get("qdrant").call(self.client.get_collections)
             exists = any(c.name == self.collection_name for c in collections.collections)
             
             if not exists:
-                self.client.create_collection(
+                breakers.get("qdrant").call(
+                    self.client.create_collection,
                     collection_name=self.collection_name,
                     vectors_config=models.VectorParams(
                         size=self.vector_size,
@@ -41,22 +67,68 @@ class VectorDBService:
                     )
                 )
                 logger.info(f"Created Qdrant collection: {self.collection_name}")
+            _ensured_collections.add(self.collection_name)
         except Exception as e:
             logger.error(f"Failed to ensure collection: {e}")
+            metrics.VECTOR_ERRORS.labels("ensure_collection").inc()
+
+    def _ensure_collection_once(self):
+        if self.collection_name not in _ensured_collections:
+            self._ensure_collection()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed text, reusing a cached vector for text seen before.
+        """
+        digest = hashlib.sha1(f"{self.embedding_model}:{text}".encode("utf-8")).hexdigest()
+        key = f"embedding:{digest}"
+        vector = cache.get(key)
+        metrics.cache_lookup("embedding", vector is not None)
+        if vector is None:
+            vector = self._embed(text)
+            cache.set(key, vector, EMBEDDING_CACHE_TTL)
+        else:
+            ledger.record("embedding", self.embedding_model, "cache_hit")
+        return vector
 
-    def search_tasks(self, query_text: str, threshold: float = 0.85) -> List[Dict]:
+    def _embed(self, text: str) -> List[float]:
+        started = time.perf_counter()
+        try:
+            with metrics.timed("embedding"), tracing.span("embedding", model=self.embedding_model):
+                vector = breakers.get("embedding").call(self.embeddings.embed_query, text)
+        except breakers.CircuitOpenError:
+            self.degraded.add("embedding")
+            raise
+        except Exception:
+            self.degraded.add("embedding")
+            ledger.record("embedding", self.embedding_model, "error", (time.perf_counter() - started) * 1000)
+            raise
+        ledger.record("embedding", self.embedding_model, "ok", (time.perf_counter() - started) * 1000)
+        return vector
+
+    def _qdrant(self, method, **kwargs):
+        try:
+            return breakers.get("qdrant").call(method, **kwargs)
+        except Exception:
+            self.degraded.add("qdrant")
+            raise
+
+    def search_tasks(self, query_text: str, threshold: float = 0.85, limit: int = 3) -> List[Dict]:
         """
         Search for existing tasks semantically similar to query_text.
         """
         try:
-            query_vector = self.embeddings.embed_query(query_text)
+            query_vector = self.embed_query(query_text)
+            self._ensure_collection_once()
             
-            search_result = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=3,
-                score_threshold=threshold
-            )
+            with metrics.timed("vector_search"), tracing.span("vector.search", limit=limit):
+                search_result = self._qdrant(
+                    self.client.search,
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    limit=limit,
+                    score_threshold=threshold
+                )
             
             return [
                 {
@@ -68,6 +140,7 @@ class VectorDBService:
             ]
         except Exception as e:
             logger.error(f"Search failed: {e}")
+            metrics.VECTOR_ERRORS.labels("search").inc()
             return []
 
     def upsert_task(self, task_id: str, text: str, payload: Dict):
@@ -75,18 +148,22 @@ class VectorDBService:
         Insert or update a task vector.
         """
         try:
-            vector = self.embeddings.embed_query(text)
-            
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    models.PointStruct(
-                        id=task_id, 
-                        vector=vector,
-                        payload=payload
-                    )
-                ]
-            )
+            vector = self._embed(text)
+            self._ensure_collection_once()
+
+            with metrics.timed("vector_upsert"), tracing.span("vector.upsert"):
+                self._qdrant(
+                    self.client.upsert,
+                    collection_name=self.collection_name,
+                    points=[
+                        models.PointStruct(
+                            id=task_id,
+                            vector=vector,
+                            payload=payload
+                        )
+                    ]
+                )
             logger.info(f"Upserted task {task_id} to Qdrant")
         except Exception as e:
             logger.error(f"Upsert failed: {e}")
+            metrics.VECTOR_ERRORS.labels("upsert").inc()
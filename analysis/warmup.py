@@ -0,0 +1,184 @@
+"""
+Warm-up and keep-alive of the Ollama chat and embedding models.
+
+Ollama unloads a model after its keep-alive expires, and the next request pays
+the load time (tens of seconds for an 8B model), often enough to time out and
+fall back to the heuristic. Workers load every model the analysis uses when
+they start, the keep_models_warm beat task renews the keep-alive, and
+process_content_task waits for the shared "ready" flag before its first LLM
+call. Load times reported by Ollama are exported as cold-start metrics.
+"""
+import functools
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ingestion.locks import acquire_lock, release_lock
+
+from . import breakers, metrics
+
+logger = logging.getLogger(__name__)
+
+READY_KEY = "warmup:ready"
+FAILED_KEY = "warmup:failed"
+LOCK_KEY = "warmup:lock"
+# How often a task waiting for another process's warm-up checks the flags
+POLL_SECONDS = 0.5
+DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smh]?)$")
+DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+# A load_duration above this means Ollama had to (re)load the model
+COLD_LOAD_SECONDS = 1.0
+
+
+def enabled() -> bool:
+    return settings.OLLAMA_WARMUP
+
+
+def ollama_url() -> str:
+    return (settings.AI_BASE_URL or "http://ollama:11434").replace("/v1", "").rstrip("/")
+
+
+def keep_alive_seconds(value: str) -> Optional[int]:
+    """
+    Seconds of an Ollama keep_alive value ("10m", "1h", "300"); None for
+    negative values, which keep the model loaded forever.
+    """
+    match = DURATION_PATTERN.match(str(value).strip())
+    if not match:
+        return None
+    return int(float(match.group(1)) * DURATION_UNITS[match.group(2)])
+
+
+def chat_models() -> List[str]:
+    """
+    AI_MODEL_NAME plus the classifier and extractor models of AI_ROUTING.
+    """
+    models = [settings.AI_MODEL_NAME]
+    for route in (settings.AI_ROUTING or {}).values():
+        for model in (route.get("classifier"), route.get("model")):
+            if model and model != "heuristic" and model not in models:
+                models.append(model)
+    return models
+
+
+def _load(model: str, kind: str) -> float:
+    """
+    Loads `model` with the configured keep-alive; returns Ollama's load time in seconds.
+    """
+    import httpx
+
+    if kind == "embedding":
+        path, body = "/api/embed", {"model": model, "input": "warm-up"}
+    else:
+        # An empty prompt only loads the model
+        path, body = "/api/generate", {"model": model, "prompt": ""}
+    body["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
+    response = httpx.post(f"{ollama_url()}{path}", json=body, timeout=settings.OLLAMA_WARMUP_TIMEOUT)
+    response.raise_for_status()
+    return response.json().get("load_duration", 0) / 1e9
+
+
+def warm_up() -> Dict[str, Optional[float]]:
+    """
+    Loads every chat model and the embedder, renewing their keep-alive.
+    Returns the load time per model (None when loading failed) and sets the
+    shared ready flag when all of them are loaded, or the failed flag for
+    OLLAMA_WARMUP_RETRY_SECONDS otherwise.
+    """
+    from .vector_db import EMBEDDING_MODEL
+
+    models = [(model, "chat") for model in chat_models()] + [(EMBEDDING_MODEL, "embedding")]
+    results: Dict[str, Optional[float]] = {}
+    for model, kind in models:
+        started = time.perf_counter()
+        try:
+            load_seconds = _load(model, kind)
+        except Exception as e:
+            logger.warning(f"Failed to warm up {model}: {e}")
+            metrics.MODEL_READY.labels(model).set(0)
+            results[model] = None
+            continue
+        metrics.MODEL_READY.labels(model).set(1)
+        metrics.MODEL_WARMUP_SECONDS.labels(model).observe(time.perf_counter() - started)
+        if load_seconds >= COLD_LOAD_SECONDS:
+            metrics.MODEL_COLD_STARTS.labels(model).inc()
+            metrics.MODEL_LOAD_SECONDS.labels(model).observe(load_seconds)
+            logger.info(f"Loaded {model} in {load_seconds:.1f}s")
+        results[model] = load_seconds
+
+    if all(value is not None for value in results.values()):
+        cache.set(READY_KEY, time.time(), keep_alive_seconds(settings.OLLAMA_KEEP_ALIVE))
+        cache.delete(FAILED_KEY)
+    else:
+        cache.set(FAILED_KEY, time.time(), int(settings.OLLAMA_WARMUP_RETRY_SECONDS))
+    return results
+
+
+def is_ready() -> bool:
+    try:
+        return bool(cache.get(READY_KEY))
+    except Exception as e:
+        logger.warning(f"Failed to read the warm-up flag: {e}")
+        return True
+
+
+def recently_failed() -> bool:
+    try:
+        return bool(cache.get(FAILED_KEY))
+    except Exception as e:
+        logger.warning(f"Failed to read the warm-up failure flag: {e}")
+        return False
+
+
+def ensure_warm() -> bool:
+    """
+    Blocks until the models are warm or OLLAMA_WARMUP_TIMEOUT passes. One
+    process loads them while the others wait for the shared flag. After a
+    failed warm-up tasks run without waiting until the failed flag expires
+    (or keep_models_warm succeeds), instead of each retrying every model.
+    """
+    if not enabled() or is_ready():
+        return True
+    deadline = time.monotonic() + settings.OLLAMA_WARMUP_TIMEOUT
+    while time.monotonic() < deadline and not recently_failed():
+        token = acquire_lock(LOCK_KEY, int(settings.OLLAMA_WARMUP_TIMEOUT))
+        if token:
+            try:
+                warm_up()
+            finally:
+                release_lock(LOCK_KEY, token)
+        if is_ready():
+            return True
+        if token:
+            break
+        time.sleep(POLL_SECONDS)
+    logger.warning("Models are not warm, continuing without waiting")
+    return False
+
+
+def requires_warm_models(func):
+    """
+    Decorator deferring a task until the models are warm.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # With the LLM breaker open the task takes the heuristic path at once
+        if enabled() and not is_ready() and not recently_failed() and breakers.get("llm").state() != "open":
+            started = time.perf_counter()
+            ensure_warm()
+            metrics.WARMUP_WAIT_SECONDS.observe(time.perf_counter() - started)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def warm_up_in_background() -> None:
+    """
+    Worker startup hook: loads the models without delaying the worker's start.
+    """
+    if enabled():
+        threading.Thread(target=ensure_warm, daemon=True, name="model-warmup").start()
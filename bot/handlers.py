@@ -1,11 +1,17 @@
 import logging
 import asyncio
-from aiogram import types
+import os
+from aiogram import F, types
 from aiogram.filters import CommandStart, Command, CommandObject
 from asgiref.sync import sync_to_async
 from core.models import Chat, Message
+from analysis import tracing
 from analysis.schemas import IngestionData
-from analysis.tasks import process_content_task
+from analysis.priority import enqueue_analysis
+from django.conf import settings
+from django.db import transaction
+from ingestion.parsers.documents import SUPPORTED_EXTENSIONS
+from ingestion.tasks import ingest_telegram_document
 from .loader import dp, bot
 
 logger = logging.getLogger(__name__)
@@ -110,14 +116,7 @@ def get_pinned_teacher_id(chat_id):
     except Chat.DoesNotExist:
         return None
 
-@dp.message()
-async def on_message(message: types.Message):
-    """
-    Handle incoming messages. Checks role and dispatches analysis task.
-    """
-    if not message.text:
-        return
-
+async def resolve_sender_role(message: types.Message) -> str:
     sender_role = 'student'
     
     # Check pinned teacher first
@@ -135,9 +134,47 @@ async def on_message(message: types.Message):
                     sender_role = 'teacher'
             except Exception:
                 pass
+    return sender_role
+
+@dp.message(F.document)
+async def on_document(message: types.Message):
+    """
+    Teacher-posted PDF/DOCX files (syllabi, assignments) are downloaded and
+    parsed by the workers; the bot only queues them.
+    """
+    document = message.document
+    extension = os.path.splitext(document.file_name or "")[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        return
+    if document.file_size and document.file_size > settings.DOCUMENT_MAX_BYTES:
+        logger.info(f"Skipping {document.file_name}: {document.file_size} bytes is over the limit")
+        return
+    if await resolve_sender_role(message) != 'teacher':
+        return
+
+    await sync_to_async(update_chat)(message.chat.id, message.chat.title, message.chat.type, 'member')
+    ingest_telegram_document.delay(document.file_id, document.file_name, message.chat.id)
+
+@dp.message()
+async def on_message(message: types.Message):
+    """
+    Handle incoming messages. Checks role and dispatches analysis task.
+    """
+    if not message.text:
+        return
+
+    # The trace ends once the task is queued; the worker continues it from metadata["trace"]
+    with tracing.start_trace("telegram.update", chat_id=message.chat.id, tg_message_id=message.message_id):
+        await handle_text_message(message)
+
+
+async def handle_text_message(message: types.Message):
+    with tracing.span("resolve_sender_role"):
+        sender_role = await resolve_sender_role(message)
 
     # Save to DB
-    db_message = await sync_to_async(save_message)(message, sender_role)
+    with tracing.span("db.save_message"):
+        db_message = await sync_to_async(save_message)(message, sender_role)
 
     # Logic: 
     # 1. If it's a teacher message, process it as usual (high priority).
@@ -179,23 +216,29 @@ async def on_message(message: types.Message):
             }
         )
 
-        process_content_task.delay(ingestion_data.model_dump())
+        with tracing.span("celery.enqueue"):
+            trace_context = tracing.inject()
+            if trace_context:
+                ingestion_data.metadata[tracing.METADATA_KEY] = trace_context
+            enqueue_analysis(ingestion_data)
 
 def save_message(message: types.Message, role: str) -> Message:
-    chat, _ = Chat.objects.get_or_create(
-        tg_chat_id=message.chat.id,
-        defaults={
-            'title': message.chat.title,
-            'chat_type': message.chat.type
-        }
-    )
+    # One short transaction: the message and its ChatStats bump (post_save) commit together
+    with transaction.atomic():
+        chat, _ = Chat.objects.get_or_create(
+            tg_chat_id=message.chat.id,
+            defaults={
+                'title': message.chat.title,
+                'chat_type': message.chat.type
+            }
+        )
 
-    return Message.objects.create(
-        chat=chat,
-        tg_message_id=message.message_id,
-        sender_name=message.from_user.full_name if message.from_user else "Unknown",
-        sender_role=role,
-        text=message.text,
-        sent_at=message.date,
-        reply_to_id=message.reply_to_message.message_id if message.reply_to_message else None
-    )
+        return Message.objects.create(
+            chat=chat,
+            tg_message_id=message.message_id,
+            sender_name=message.from_user.full_name if message.from_user else "Unknown",
+            sender_role=role,
+            text=message.text,
+            sent_at=message.date,
+            reply_to_id=message.reply_to_message.message_id if message.reply_to_message else None
+        )
@@ -0,0 +1,326 @@
+"""
+Replay load harness for the bot and the analysis workers.
+
+A synthetic (analysis.corpus) or recorded update stream is fed into the real
+aiogram dispatcher at a fixed rate. The Telegram Bot API and the
+OpenAI-compatible LLM (plus the Ollama embedding endpoint) are replaced by
+local fake servers, so the numbers describe this code and the queue rather
+than the upstream services.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+from urllib.parse import parse_qs
+
+from analysis.benchmark import FakeAIService, FakeLLM, HashingEmbeddings, percentile
+from analysis.corpus import CorpusMessage
+
+logger = logging.getLogger(__name__)
+
+FAKE_BOT_TOKEN = "123456789:LOADTEST-fake-token-for-the-fake-api"
+BOT_USER = {"id": 123456789, "is_bot": True, "first_name": "SmartArg load test", "username": "smartarg_loadtest_bot"}
+USER_ID_PATTERN = re.compile(rb'name="user_id"\r\n\r\n(-?\d+)')
+
+
+class FakeServer:
+    """
+    Threaded HTTP server on a free local port; subclasses implement handle().
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._dispatch(b"")
+
+            def do_POST(self):
+                self._dispatch(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+            def _dispatch(self, body: bytes):
+                server.sleep()
+                status, payload = server.handle(self.path, body, self.headers.get("Content-Type", ""))
+                raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sleep(self) -> None:
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+
+    def handle(self, path: str, body: bytes, content_type: str) -> Tuple[int, Dict]:
+        raise NotImplementedError
+
+    def start(self) -> "FakeServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeTelegramAPI(FakeServer):
+    """
+    Bot API stand-in. Users in `teachers` are chat owners for getChatMember,
+    everyone else is a plain member.
+    """
+
+    def __init__(self, teachers: Iterable[int] = (), **kwargs):
+        super().__init__(**kwargs)
+        self.teachers: Set[int] = set(teachers)
+        self.message_id = 0
+
+    def handle(self, path: str, body: bytes, content_type: str) -> Tuple[int, Dict]:
+        method = path.rstrip("/").rsplit("/", 1)[-1]
+        self.count(method)
+        if method == "getMe":
+            return 200, {"ok": True, "result": BOT_USER}
+        if method == "getChatMember":
+            user_id = _form_value(body, content_type, "user_id", USER_ID_PATTERN)
+            user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+            if user_id in self.teachers:
+                return 200, {"ok": True, "result": {"status": "creator", "user": user, "is_anonymous": False}}
+            return 200, {"ok": True, "result": {"status": "member", "user": user}}
+        if method == "sendMessage":
+            with self._lock:
+                self.message_id += 1
+                message_id = self.message_id
+            return 200, {"ok": True, "result": {
+                "message_id": message_id, "date": int(time.time()),
+                "chat": {"id": 0, "type": "supergroup"}, "from": BOT_USER, "text": "",
+            }}
+        return 200, {"ok": True, "result": True}
+
+
+def _form_value(body: bytes, content_type: str, name: str, pattern: re.Pattern) -> int:
+    # aiogram posts urlencoded forms, multipart only when uploading files
+    try:
+        if "json" in content_type:
+            return int(json.loads(body or b"{}").get(name, 0))
+        if "multipart" in content_type:
+            match = pattern.search(body)
+            return int(match.group(1)) if match else 0
+        return int(parse_qs(body.decode("utf-8")).get(name, ["0"])[0])
+    except (ValueError, TypeError):
+        return 0
+
+
+class FakeLLMServer(FakeServer):
+    """
+    OpenAI-compatible /v1/chat/completions plus Ollama's /api/embed, so both
+    AIService (AI_BASE_URL) and VectorDBService (AI_BASE_URL without /v1)
+    can be pointed at it. Answers come from analysis.benchmark.FakeLLM.
+    """
+
+    def __init__(self, embedding_latency: float = 0.0, embedding_size: int = 768, **kwargs):
+        super().__init__(**kwargs)
+        self.embedding_latency = embedding_latency
+        self.embeddings = HashingEmbeddings(size=embedding_size)
+        self.llm = FakeLLM(FakeAIService())
+
+    def sleep(self) -> None:
+        # Latency is applied per endpoint in handle()
+        pass
+
+    def handle(self, path: str, body: bytes, content_type: str) -> Tuple[int, Dict]:
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "invalid JSON"}
+
+        if path.endswith("/chat/completions"):
+            self.count("chat.completions")
+            FakeServer.sleep(self)
+            messages = request.get("messages") or [{}]
+            prompt = str(messages[-1].get("content", ""))
+            content = self.llm.reply(prompt)
+            prompt_tokens = sum(len(str(item.get("content", "")).split()) for item in messages)
+            completion_tokens = len(content.split())
+            return 200, {
+                "id": f"chatcmpl-loadtest-{self.calls['chat.completions']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        if path.endswith("/api/embed") or path.endswith("/api/embeddings"):
+            self.count("embed")
+            if self.embedding_latency:
+                time.sleep(self.embedding_latency)
+            inputs = request.get("input", request.get("prompt", ""))
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            vectors = [self.embeddings.embed_query(text) for text in inputs]
+            if path.endswith("/api/embeddings"):
+                return 200, {"embedding": vectors[0] if vectors else []}
+            return 200, {"model": request.get("model", "fake"), "embeddings": vectors}
+
+        return 404, {"error": f"unknown endpoint {path}"}
+
+
+def corpus_updates(corpus: List[CorpusMessage], message_offset: int) -> Iterator[Dict]:
+    """
+    Bot API updates for a synthetic corpus; message ids are shifted by
+    `message_offset` so repeated runs never collide with stored messages.
+    """
+    texts = {}
+    for index, item in enumerate(corpus, start=1):
+        chat = {"id": item.chat.tg_chat_id, "type": "supergroup", "title": item.chat.title}
+        message = {
+            "message_id": item.tg_message_id + message_offset,
+            "date": int(time.time()),
+            "chat": chat,
+            "from": {"id": item.sender_id, "is_bot": False, "first_name": item.sender_name},
+            "text": item.text,
+        }
+        if item.reply_to_id:
+            message["reply_to_message"] = {
+                "message_id": item.reply_to_id + message_offset,
+                "date": int(time.time()),
+                "chat": chat,
+                "text": texts.get((item.chat.tg_chat_id, item.reply_to_id), ""),
+            }
+        texts[(item.chat.tg_chat_id, item.tg_message_id)] = item.text
+        yield {"update_id": index, "message": message}
+
+
+def recorded_updates(lines: Iterable[str], message_offset: int) -> Iterator[Dict]:
+    """
+    Updates recorded as JSON lines (getUpdates results). Only messages are
+    replayed; their ids are shifted like corpus_updates().
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        update = json.loads(line)
+        message = update.get("message")
+        if not message or not message.get("text"):
+            continue
+        message["message_id"] += message_offset
+        message["date"] = int(time.time())
+        if message.get("reply_to_message"):
+            message["reply_to_message"]["message_id"] += message_offset
+        yield update
+
+
+@dataclass
+class ReplayResult:
+    rate: float
+    sent: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    handler_ms: List[float] = field(default_factory=list)
+    # (chat id, message id) -> wall-clock time the update was fed
+    sent_at: Dict[Tuple[int, int], float] = field(default_factory=dict)
+
+    def summary(self) -> Dict:
+        handler = sorted(self.handler_ms)
+        return {
+            "target_rate": self.rate,
+            "sent": self.sent,
+            "errors": self.errors,
+            "achieved_rate": round(self.sent / self.elapsed, 2) if self.elapsed else 0.0,
+            "handler_p50_ms": round(percentile(handler, 0.5), 1),
+            "handler_p95_ms": round(percentile(handler, 0.95), 1),
+        }
+
+
+async def replay(dp, bot, updates: Iterable[Dict], rate: float, count: int) -> ReplayResult:
+    """
+    Feeds `count` updates at `rate` per second without waiting for handlers
+    (an open loop: a slow bot does not slow the arrivals down).
+    """
+    from aiogram.types import Update
+
+    result = ReplayResult(rate=rate)
+    pending = set()
+
+    async def feed(raw: Dict):
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, Update.model_validate(raw, context={"bot": bot}))
+        except Exception as e:
+            result.errors += 1
+            logger.warning(f"Update {raw.get('update_id')} failed: {e}")
+        result.handler_ms.append((time.perf_counter() - started) * 1000)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    iterator = iter(updates)
+    for index in range(count):
+        raw = next(iterator, None)
+        if raw is None:
+            break
+        delay = start + index / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = raw["message"]
+        result.sent_at[(message["chat"]["id"], message["message_id"])] = time.time()
+        result.sent += 1
+        task = asyncio.create_task(feed(raw))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    result.elapsed = loop.time() - start
+    return result
+
+
+def backlog_growth(samples: List[Dict]) -> float:
+    """
+    Least-squares slope of queue depth over time, in messages per second.
+    """
+    if len(samples) < 2:
+        return 0.0
+    times = [sample["t"] for sample in samples]
+    depths = [sample["queue_depth"] for sample in samples]
+    mean_t = sum(times) / len(times)
+    mean_d = sum(depths) / len(depths)
+    variance = sum((t - mean_t) ** 2 for t in times)
+    if not variance:
+        return 0.0
+    return sum((t - mean_t) * (d - mean_d) for t, d in zip(times, depths)) / variance
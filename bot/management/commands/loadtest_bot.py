@@ -0,0 +1,234 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from itertools import cycle
+from typing import Dict, List, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analysis.benchmark import percentile
+from analysis.corpus import generate_corpus
+from analysis.models import AnalysisResult
+from analysis.queues import DEFAULT_QUEUE, queue_depth
+from bot.loadtest import (
+    FAKE_BOT_TOKEN, FakeLLMServer, FakeTelegramAPI, backlog_growth, corpus_updates, recorded_updates, replay,
+)
+from core.models import Chat, Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a synthetic or recorded update stream into the bot dispatcher at fixed rates, with fake "
+        "Telegram and LLM servers, and report throughput, queue backlog and end-to-end latency. "
+        "Writes messages to the configured database and queues real Celery tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rates", nargs="+", type=float, default=[2.0], help="Messages per second, one step each.")
+        parser.add_argument("--duration", type=float, default=60.0, help="Seconds per rate step.")
+        parser.add_argument("--updates", help="Recorded updates (JSON lines) instead of the synthetic corpus.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--chats", type=int, default=5)
+        parser.add_argument("--teacher-id", type=int, action="append", default=[],
+                            help="Users reported as chat owners by the fake API (recorded streams).")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="Start a Celery worker with this concurrency pointed at the fake LLM "
+                                 "(0: use workers that are already running).")
+        parser.add_argument("--queue", default=settings.ANALYSIS_QUEUES["live"], help="Queue whose depth is sampled.")
+        parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds per completion.")
+        parser.add_argument("--llm-jitter", type=float, default=0.3)
+        parser.add_argument("--embedding-latency", type=float, default=0.02)
+        parser.add_argument("--telegram-latency", type=float, default=0.02)
+        parser.add_argument("--bind", default="127.0.0.1", help="Address of the fake servers.")
+        parser.add_argument("--sample-interval", type=float, default=1.0)
+        parser.add_argument("--drain-timeout", type=float, default=300.0,
+                            help="Seconds to wait for the workers to finish after the last step.")
+        parser.add_argument("--output", help="Write the full report (including backlog samples) as JSON.")
+        parser.add_argument("--keep-data", action="store_true", help="Keep the replayed messages afterwards.")
+
+    def handle(self, *args, **options):
+        if not settings.TELEGRAM_BOT_TOKEN:
+            # bot.loader validates the token on import; the replay never reaches Telegram
+            settings.TELEGRAM_BOT_TOKEN = FAKE_BOT_TOKEN
+
+        message_offset = int(time.time()) * 100_000
+        if options["updates"]:
+            try:
+                with open(options["updates"], encoding="utf-8") as fp:
+                    updates = list(recorded_updates(fp, message_offset))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read updates: {e}")
+            teachers = set(options["teacher_id"])
+        else:
+            total = int(sum(options["rates"]) * options["duration"])
+            corpus = generate_corpus(seed=options["seed"], messages=total, chats=options["chats"])
+            updates = list(corpus_updates(corpus, message_offset))
+            teachers = {item.chat.teacher_id for item in corpus} | set(options["teacher_id"])
+        if not updates:
+            raise CommandError("No updates to replay")
+
+        telegram = FakeTelegramAPI(teachers=teachers, host=options["bind"], latency=options["telegram_latency"]).start()
+        llm = FakeLLMServer(
+            host=options["bind"],
+            latency=options["llm_latency"],
+            jitter=options["llm_jitter"],
+            embedding_latency=options["embedding_latency"],
+        ).start()
+        self.stdout.write(f"Fake Telegram API: {telegram.url}")
+        self.stdout.write(f"Fake LLM: {llm.url}/v1 (point AI_BASE_URL of the workers here)")
+
+        worker = None
+        if options["workers"]:
+            env = {**os.environ, "AI_BASE_URL": f"{llm.url}/v1", "AI_API_KEY": "loadtest", "METRICS_WORKER_PORT": "0"}
+            worker = subprocess.Popen(
+                [sys.executable, "-m", "celery", "-A", "telegram_analyzer", "worker", "--loglevel", "warning",
+                 "--concurrency", str(options["workers"]), "-n", f"loadtest-{os.getpid()}@%h",
+                 "-Q", ",".join([DEFAULT_QUEUE, *settings.ANALYSIS_QUEUES.values()])],
+                cwd=settings.BASE_DIR,
+                env=env,
+            )
+
+        started_at = timezone.now()
+        sent_at: Dict[Tuple[int, int], float] = {}
+        try:
+            report = asyncio.run(self._run(telegram, updates, sent_at, message_offset, options))
+        finally:
+            if worker is not None:
+                worker.terminate()
+                worker.wait(timeout=30)
+            telegram.stop()
+            llm.stop()
+            if not options["keep_data"] and sent_at:
+                self._cleanup({chat_id for chat_id, _ in sent_at}, message_offset, started_at)
+
+        report["api_calls"] = {"telegram": dict(telegram.calls), "llm": dict(llm.calls)}
+        self._print(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fp:
+                json.dump(report, fp, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    async def _run(self, telegram, updates: List[Dict], sent_at: Dict, message_offset: int, options) -> Dict:
+        from aiogram import Bot
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+
+        from bot import handlers  # noqa: F401  registers the handlers on dp
+        from bot.loader import dp
+
+        bot = Bot(token=FAKE_BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(telegram.url)))
+        chat_ids: Set[int] = {update["message"]["chat"]["id"] for update in updates}
+        samples: List[Dict] = []
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        origin = loop.time()
+        current = {"rate": None}
+
+        def processed() -> int:
+            return AnalysisResult.objects.filter(
+                message__chat__tg_chat_id__in=chat_ids, message__tg_message_id__gte=message_offset,
+            ).count()
+
+        async def sample():
+            while not stop.is_set():
+                samples.append({
+                    "t": round(loop.time() - origin, 2),
+                    "rate": current["rate"],
+                    "queue_depth": await sync_to_async(queue_depth)(options["queue"]),
+                    "processed": await sync_to_async(processed)(),
+                })
+                try:
+                    await asyncio.wait_for(stop.wait(), options["sample_interval"])
+                except asyncio.TimeoutError:
+                    pass
+
+        sampler = asyncio.create_task(sample())
+        stream = cycle(updates) if not options["updates"] else iter(updates)
+        steps = []
+        try:
+            for rate in options["rates"]:
+                current["rate"] = rate
+                step_start = loop.time() - origin
+                processed_before = await sync_to_async(processed)()
+                result = await replay(dp, bot, stream, rate, int(rate * options["duration"]))
+                sent_at.update(result.sent_at)
+                processed_after = await sync_to_async(processed)()
+                growth = backlog_growth([sample for sample in samples if sample["t"] >= step_start])
+                steps.append({
+                    **result.summary(),
+                    "processed_rate": round((processed_after - processed_before) / result.elapsed, 2)
+                    if result.elapsed else 0.0,
+                    "backlog_growth_per_s": round(growth, 3),
+                    # A queue that keeps growing at this arrival rate is not sustainable
+                    "sustainable": growth <= 0.05 * rate,
+                })
+
+            current["rate"] = None
+            expected = await sync_to_async(
+                Message.objects.filter(
+                    chat__tg_chat_id__in=chat_ids, tg_message_id__gte=message_offset, sender_role="teacher",
+                ).count
+            )()
+            drain_started = loop.time()
+            done = await sync_to_async(processed)()
+            while done < expected and loop.time() - drain_started < options["drain_timeout"]:
+                await asyncio.sleep(options["sample_interval"])
+                done = await sync_to_async(processed)()
+            drain_seconds = loop.time() - drain_started
+        finally:
+            stop.set()
+            await sampler
+            await bot.session.close()
+
+        latencies = sorted(await sync_to_async(self._latencies)(chat_ids, message_offset, sent_at))
+        return {
+            "steps": steps,
+            "expected": expected,
+            "processed": done,
+            "drain_seconds": round(drain_seconds, 1),
+            "end_to_end": {
+                "count": len(latencies),
+                "p50_ms": round(percentile(latencies, 0.5), 1),
+                "p95_ms": round(percentile(latencies, 0.95), 1),
+                "p99_ms": round(percentile(latencies, 0.99), 1),
+                "max_ms": round(percentile(latencies, 1.0), 1),
+            },
+            "samples": samples,
+        }
+
+    def _latencies(self, chat_ids: Set[int], message_offset: int, sent_at: Dict) -> List[float]:
+        rows = AnalysisResult.objects.filter(
+            message__chat__tg_chat_id__in=chat_ids, message__tg_message_id__gte=message_offset,
+        ).values_list("message__chat__tg_chat_id", "message__tg_message_id", "created_at")
+        return [
+            (created_at.timestamp() - sent_at[(chat_id, message_id)]) * 1000
+            for chat_id, message_id, created_at in rows
+            if (chat_id, message_id) in sent_at
+        ]
+
+    def _cleanup(self, chat_ids: Set[int], message_offset: int, started_at) -> None:
+        Message.objects.filter(chat__tg_chat_id__in=chat_ids, tg_message_id__gte=message_offset).delete()
+        # Chats the replay created are removed; chats that existed before are left alone
+        Chat.objects.filter(tg_chat_id__in=chat_ids, created_at__gte=started_at, messages__isnull=True).delete()
+
+    def _print(self, report: Dict) -> None:
+        for step in report["steps"]:
+            style = self.style.SUCCESS if step["sustainable"] else self.style.ERROR
+            self.stdout.write(style(
+                f"{step['target_rate']:6.1f} msg/s: sent {step['sent']} at {step['achieved_rate']:.1f}/s, "
+                f"processed {step['processed_rate']:.1f}/s, backlog {step['backlog_growth_per_s']:+.2f} msg/s, "
+                f"handler p95 {step['handler_p95_ms']:.0f} ms"
+                + ("" if step["sustainable"] else "  (queue grows)")
+            ))
+        e2e = report["end_to_end"]
+        self.stdout.write(
+            f"processed {report['processed']}/{report['expected']} after {report['drain_seconds']}s drain; "
+            f"end-to-end p50 {e2e['p50_ms']:.0f} ms, p95 {e2e['p95_ms']:.0f} ms, p99 {e2e['p99_ms']:.0f} ms"
+        )
+        self.stdout.write(f"API calls: {report['api_calls']}")
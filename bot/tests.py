@@ -1,3 +1,110 @@
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 
-# Create your tests here.
+from analysis.corpus import generate_corpus
+from analysis.schemas import IngestionData
+from bot.loadtest import (
+    FAKE_BOT_TOKEN, FakeLLMServer, FakeTelegramAPI, backlog_growth, corpus_updates, recorded_updates, replay,
+)
+from core.models import Message
+
+
+class LoadTestTests(TestCase):
+    def _server(self, server):
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def _dispatcher(self, telegram):
+        from aiogram import Bot
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+
+        with self.settings(TELEGRAM_BOT_TOKEN=FAKE_BOT_TOKEN):
+            from bot import handlers  # noqa: F401
+            from bot.loader import dp
+        bot = Bot(token=FAKE_BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(telegram.url)))
+        return dp, bot
+
+    def test_fake_llm_answers_the_ai_service(self):
+        from analysis.ai_engine import AIService
+
+        llm = self._server(FakeLLMServer())
+        with self.settings(AI_BASE_URL=f"{llm.url}/v1", AI_API_KEY="loadtest"):
+            result = AIService().analyze_content(IngestionData(
+                text="Лабораторная работа №2: сдать до 15.03",
+                source_type="telegram",
+                source_id="1",
+                metadata={"sender_role": "teacher"},
+            ))
+
+        self.assertEqual(llm.calls["chat.completions"], 1)
+        self.assertEqual(result["category"], "deadline")
+
+    def test_replay_feeds_the_dispatcher(self):
+        corpus = generate_corpus(seed=3, messages=30, chats=2)
+        teachers = {item.chat.teacher_id for item in corpus}
+        telegram = self._server(FakeTelegramAPI(teachers=teachers))
+        dp, bot = self._dispatcher(telegram)
+        self.addCleanup(async_to_sync(bot.session.close))
+
+        # bot.handlers is importable only once the token is set in _dispatcher()
+        with patch("bot.handlers.enqueue_analysis") as mock_enqueue:
+            result = async_to_sync(replay)(dp, bot, corpus_updates(corpus, 1000), rate=200, count=30)
+
+        self.assertEqual(result.sent, 30)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(Message.objects.filter(tg_message_id__gt=1000).count(), 30)
+        teacher_messages = sum(1 for item in corpus if item.sender_id in teachers)
+        self.assertEqual(Message.objects.filter(sender_role="teacher").count(), teacher_messages)
+        self.assertEqual(mock_enqueue.call_count, teacher_messages)
+        self.assertEqual(len(result.sent_at), 30)
+
+    def test_recorded_updates_are_shifted(self):
+        lines = [
+            '{"update_id": 1, "message": {"message_id": 7, "date": 0, "chat": {"id": -1, "type": "group"}, "text": "hi",'
+            ' "reply_to_message": {"message_id": 5, "date": 0, "chat": {"id": -1, "type": "group"}}}}',
+            '{"update_id": 2, "message": {"message_id": 8, "date": 0, "chat": {"id": -1, "type": "group"}}}',
+            "",
+        ]
+        updates = list(recorded_updates(lines, 100))
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0]["message"]["message_id"], 107)
+        self.assertEqual(updates[0]["message"]["reply_to_message"]["message_id"], 105)
+
+    def test_backlog_growth(self):
+        growing = [{"t": t, "queue_depth": 3 * t} for t in range(5)]
+        steady = [{"t": t, "queue_depth": 4} for t in range(5)]
+        self.assertAlmostEqual(backlog_growth(growing), 3.0)
+        self.assertEqual(backlog_growth(steady), 0.0)
+        self.assertEqual(backlog_growth(steady[:1]), 0.0)
+
+
+class SaveMessageTests(TestCase):
+    def _message(self):
+        from datetime import datetime, timezone
+
+        from aiogram import types
+
+        return types.Message.model_validate({
+            "message_id": 1,
+            "date": datetime(2024, 5, 1, tzinfo=timezone.utc),
+            "chat": {"id": -100900, "type": "group", "title": "Сети"},
+            "from": {"id": 7, "is_bot": False, "first_name": "Анна"},
+            "text": "Лабораторная до пятницы",
+        })
+
+    def test_message_and_stats_commit_together(self):
+        from analysis.models import ChatStats
+        from bot.handlers import save_message
+
+        with self.settings(TELEGRAM_BOT_TOKEN=FAKE_BOT_TOKEN):
+            with patch("analysis.stats.record_message", side_effect=RuntimeError("stats down")):
+                with self.assertRaises(RuntimeError):
+                    save_message(self._message(), "teacher")
+            self.assertFalse(Message.objects.exists())
+
+            save_message(self._message(), "teacher")
+        self.assertEqual(ChatStats.objects.get(chat__tg_chat_id=-100900).message_count, 1)
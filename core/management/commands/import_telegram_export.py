@@ -0,0 +1,213 @@
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+from celery import chain
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from analysis import priority, stats
+from analysis.schemas import IngestionData
+from analysis.tasks import process_content_task
+from core import telegram_export
+from core.models import Chat, Message
+from ingestion.runner import batched
+from web.fragments import bump_fragment_version
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a Telegram Desktop export (result.json) into Chat/Message. "
+        "The file is streamed, so memory stays bounded for any export size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to result.json")
+        parser.add_argument(
+            "--teacher-id",
+            type=int,
+            action="append",
+            default=[],
+            help="Telegram user id of a teacher (repeatable). Defaults to the chat's pinned teacher.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Messages per bulk insert.")
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help=(
+                "Queue analysis of newly imported teacher messages. Each chat's batches run "
+                "as Celery chains, one after another, so they are analyzed in chat order."
+            ),
+        )
+        parser.add_argument(
+            "--chain-batches",
+            type=int,
+            default=20,
+            help=(
+                "Batches per chain. The next chain of a chat is sent once the previous one "
+                "has finished, so the import pauses on long chats."
+            ),
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="With --analyze: process in this process, strictly in order.",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.totals = {"seen": 0, "inserted": 0, "queued": 0}
+        self.teachers: Set[int] = set()
+        # process_content_batch signatures of the current chat, dispatched as a chain
+        # every --chain-batches batches; running_chain is the chat's previous chain
+        self.pending_batches = []
+        self.running_chain = None
+        started = time.monotonic()
+
+        chat: Optional[Chat] = None
+        chat_key = None
+        chunk: List[Message] = []
+        try:
+            with open(options["path"], "rb") as fp:
+                for header, raw in telegram_export.iter_export(fp):
+                    key = (header.get("id"), header.get("type"))
+                    if key != chat_key:
+                        self._flush(chat, chunk)
+                        self._dispatch_batches()
+                        self.running_chain = None
+                        chunk = []
+                        chat, chat_key = self._get_chat(header), key
+                    message = self._build_message(chat, raw)
+                    if message is None:
+                        continue
+                    chunk.append(message)
+                    if len(chunk) >= options["chunk_size"]:
+                        self._flush(chat, chunk)
+                        chunk = []
+                self._flush(chat, chunk)
+                self._dispatch_batches()
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['path']}")
+
+        bump_fragment_version("chats")
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.totals['inserted']} of {self.totals['seen']} messages imported, "
+            f"{self.totals['queued']} queued for analysis in {time.monotonic() - started:.1f}s."
+        ))
+
+    def _get_chat(self, header) -> Chat:
+        if "id" not in header:
+            raise CommandError("Export has no chat id; is this a Telegram Desktop result.json?")
+        chat, _ = Chat.objects.get_or_create(
+            tg_chat_id=telegram_export.bot_api_chat_id(int(header["id"]), header.get("type", "")),
+            defaults={
+                "title": header.get("name"),
+                "chat_type": telegram_export.chat_type(header.get("type", "")),
+            },
+        )
+        teachers = set(self.options["teacher_id"])
+        if chat.pinned_teacher_id:
+            teachers.add(chat.pinned_teacher_id)
+        self.teachers = teachers
+        return chat
+
+    def _build_message(self, chat: Chat, raw) -> Optional[Message]:
+        # Like the bot, only text messages (captions included) are kept
+        if raw.get("type") != "message":
+            return None
+        text = telegram_export.message_text(raw)
+        if not text.strip():
+            return None
+        self.totals["seen"] += 1
+        return Message(
+            chat=chat,
+            tg_message_id=int(raw["id"]),
+            sender_name=raw.get("from") or "Unknown",
+            sender_role="teacher" if telegram_export.sender_id(raw) in self.teachers else "student",
+            text=text,
+            sent_at=telegram_export.sent_at(raw),
+            reply_to_id=raw.get("reply_to_message_id"),
+        )
+
+    def _flush(self, chat: Optional[Chat], chunk: List[Message]) -> None:
+        if not chunk:
+            return
+        ids = [message.tg_message_id for message in chunk]
+        with transaction.atomic():
+            existing = set(
+                Message.objects.filter(chat=chat, tg_message_id__in=ids).values_list("tg_message_id", flat=True)
+            )
+            new = [message for message in chunk if message.tg_message_id not in existing]
+            Message.objects.bulk_create(new, ignore_conflicts=True)
+            # bulk_create bypasses the signals that maintain the dashboard counters
+            stats.record_message(chat.id, len(new))
+        self.totals["inserted"] += len(new)
+
+        if self.options["analyze"]:
+            self._queue_analysis(chat, [message.tg_message_id for message in new if message.sender_role == "teacher"])
+
+    def _queue_analysis(self, chat: Chat, teacher_ids: List[int]) -> None:
+        if not teacher_ids:
+            return
+        messages = list(
+            Message.objects.filter(chat=chat, tg_message_id__in=teacher_ids).order_by("sent_at", "tg_message_id")
+        )
+        reply_ids: Set[int] = {message.reply_to_id for message in messages if message.reply_to_id}
+        parents: Dict[int, str] = dict(
+            Message.objects.filter(chat=chat, tg_message_id__in=reply_ids).values_list("tg_message_id", "text")
+        )
+
+        items = []
+        for message in messages:
+            # Same context the bot builds for a live teacher reply
+            text = message.text
+            if parents.get(message.reply_to_id):
+                text = f"Student Question: {parents[message.reply_to_id]}\nTeacher Answer: {message.text}"
+            items.append(IngestionData(
+                text=text,
+                source_type="telegram",
+                source_id=str(message.id),
+                metadata={
+                    "sender_role": message.sender_role,
+                    "chat_title": chat.title or "Private",
+                    "is_reply": bool(message.reply_to_id),
+                    "reply_to_msg_id": message.reply_to_id,
+                    "tg_chat_id": chat.tg_chat_id,
+                },
+            ))
+
+        if self.options["sync"]:
+            for item in items:
+                process_content_task(item.model_dump())
+        else:
+            # History is bulk work: it must not delay live messages
+            for batch in batched(items, settings.INGESTION_BATCH_SIZE):
+                self.pending_batches.append(priority.batch_signature(batch))
+                if len(self.pending_batches) >= self.options["chain_batches"]:
+                    self._dispatch_batches()
+        self.totals["queued"] += len(items)
+
+    def _dispatch_batches(self) -> None:
+        if not self.pending_batches:
+            return
+        # Chains of one chat must not overlap, or replies could be analyzed before their parents
+        while self.running_chain is not None and not _chain_finished(self.running_chain):
+            time.sleep(settings.INGESTION_BACKPRESSURE_POLL)
+        self.running_chain = chain(*self.pending_batches).delay()
+        self.pending_batches = []
+
+
+def _chain_finished(result) -> bool:
+    """
+    True once the last task of a chain is done, or once any of its tasks
+    failed (the rest of the chain then never runs).
+    """
+    node = result
+    while node is not None:
+        if node.failed():
+            return True
+        node = node.parent
+    return result.ready()
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "ALTER TABLE core_message ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('russian', coalesce(text, ''))) STORED"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS core_message_search_idx ON core_message USING gin (search_vector)"
+    )
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS core_message_search_idx")
+    schema_editor.execute("ALTER TABLE core_message DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text search column for web.search. Postgres only: the column is not
+    declared on the model, so the ORM never writes it and SQLite skips it.
+    """
+
+    dependencies = [
+        ('core', '0003_message_reply_to_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    Chat = apps.get_model("core", "Chat")
+    Chat.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_message_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='chat',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -14,6 +14,7 @@ class Chat(models.Model):
     chat_type = models.CharField(max_length=20, choices=CHAT_TYPES, default='unknown', verbose_name="Chat Type")
     pinned_teacher_id = models.BigIntegerField(null=True, blank=True, verbose_name="Pinned Teacher Telegram ID")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title or str(self.tg_chat_id)
@@ -0,0 +1,99 @@
+"""
+Streaming reader for Telegram Desktop chat exports (result.json).
+
+The file is walked with ijson's event parser, so only one message is
+materialized at a time. Both single-chat exports and full account exports
+("chats": {"list": [...]}) are supported.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+
+import ijson
+from django.utils import timezone
+
+# Message arrays of a single-chat export or of each chat in an account export
+MESSAGES_PREFIX = re.compile(r"^((?:left_)?chats\.list\.item\.)?messages\.item$")
+CHAT_PREFIX = re.compile(r"^(?:left_)?chats\.list\.item$")
+HEADER_KEYS = ("id", "name", "type")
+
+CHAT_TYPES = {
+    "private_supergroup": "supergroup",
+    "public_supergroup": "supergroup",
+    "private_group": "group",
+    "private_channel": "channel",
+    "public_channel": "channel",
+    "personal_chat": "private",
+    "bot_chat": "private",
+    "saved_messages": "private",
+}
+
+
+def iter_export(fp: IO[bytes]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Yields (chat header, message) pairs. The header holds the chat's id, name
+    and type, which Telegram writes before its messages array.
+    """
+    header: Dict[str, Any] = {}
+    builder = None
+    message_prefix = None
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == message_prefix and event == "end_map":
+                yield header, builder.value
+                builder = None
+            continue
+
+        if event == "start_map" and MESSAGES_PREFIX.match(prefix):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            message_prefix = prefix
+        elif event == "start_map" and CHAT_PREFIX.match(prefix):
+            header = {}
+        elif event in ("string", "number"):
+            base, _, key = prefix.rpartition(".")
+            if key in HEADER_KEYS and (base == "" or CHAT_PREFIX.match(base)):
+                header = {**header, key: value}
+
+
+def bot_api_chat_id(export_id: int, export_type: str) -> int:
+    """
+    Exports store bare ids; the Bot API (and so Chat.tg_chat_id) prefixes
+    supergroups and channels with -100 and negates basic groups.
+    """
+    chat_type = CHAT_TYPES.get(export_type, "unknown")
+    if chat_type in ("supergroup", "channel"):
+        return -(10 ** 12 + export_id)
+    if chat_type == "group":
+        return -export_id
+    return export_id
+
+
+def chat_type(export_type: str) -> str:
+    return CHAT_TYPES.get(export_type, "unknown")
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """
+    "text" is either a string or a list of strings and entity objects.
+    """
+    text = message.get("text") or ""
+    if isinstance(text, list):
+        text = "".join(part if isinstance(part, str) else str(part.get("text", "")) for part in text)
+    return text
+
+
+def sender_id(message: Dict[str, Any]) -> Optional[int]:
+    """
+    "from_id" looks like "user12345" (or "channel12345" for channel posts).
+    """
+    match = re.search(r"(\d+)$", str(message.get("from_id") or ""))
+    return int(match.group(1)) if match else None
+
+
+def sent_at(message: Dict[str, Any]) -> datetime:
+    # date_unixtime is UTC; "date" is the exporting machine's local time
+    if message.get("date_unixtime"):
+        return datetime.fromtimestamp(int(message["date_unixtime"]), tz=dt_timezone.utc)
+    return timezone.make_aware(datetime.fromisoformat(message["date"]))
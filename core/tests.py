@@ -1,3 +1,127 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from analysis.models import ChatStats
+from core import telegram_export
+from core.models import Chat, Message
+
+
+def export_message(message_id, text, from_id="user100", **extra):
+    return {
+        "id": message_id,
+        "type": "message",
+        "date": "2024-05-01T10:00:00",
+        "date_unixtime": str(1714557600 + message_id),
+        "from": "Преподаватель" if from_id == "user7" else "Студент",
+        "from_id": from_id,
+        "text": text,
+        **extra,
+    }
+
+
+class TelegramExportImportTests(TestCase):
+    def setUp(self):
+        export = {
+            "name": "ИВТ-21",
+            "type": "private_supergroup",
+            "id": 1234567890,
+            "messages": [
+                {"id": 1, "type": "service", "date": "2024-05-01T09:00:00", "action": "create_group"},
+                export_message(2, "Когда сдавать лабораторную?"),
+                export_message(
+                    3,
+                    ["Лабораторная 3 до ", {"type": "bold", "text": "20.05"}],
+                    from_id="user7",
+                    reply_to_message_id=2,
+                ),
+                export_message(4, ""),
+                export_message(5, "Экзамен 25.06", from_id="user7"),
+            ],
+        }
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w", encoding="utf-8") as fp:
+            json.dump(export, fp, ensure_ascii=False)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def run_import(self, *args):
+        call_command("import_telegram_export", self.path, "--teacher-id", "7", *args, stdout=StringIO())
+
+    def test_iter_export_streams_messages_with_chat_header(self):
+        with open(self.path, "rb") as fp:
+            pairs = list(telegram_export.iter_export(fp))
+        self.assertEqual(len(pairs), 5)
+        self.assertEqual(pairs[0][0], {"name": "ИВТ-21", "type": "private_supergroup", "id": 1234567890})
+        self.assertEqual(telegram_export.message_text(pairs[2][1]), "Лабораторная 3 до 20.05")
+
+    def test_account_export_layout(self):
+        account = {"about": "", "chats": {"list": [
+            {"name": "A", "type": "private_group", "id": 5, "messages": [export_message(1, "a")]},
+            {"name": "B", "type": "personal_chat", "id": 6, "messages": [export_message(1, "b")]},
+        ]}}
+        with tempfile.TemporaryFile() as fp:
+            fp.write(json.dumps(account).encode("utf-8"))
+            fp.seek(0)
+            headers = [header["name"] for header, _ in telegram_export.iter_export(fp)]
+        self.assertEqual(headers, ["A", "B"])
+        self.assertEqual(telegram_export.bot_api_chat_id(5, "private_group"), -5)
+
+    def test_import_maps_chat_messages_and_roles(self):
+        self.run_import("--chunk-size", "2")
+
+        chat = Chat.objects.get()
+        self.assertEqual((chat.tg_chat_id, chat.chat_type), (-1001234567890, "supergroup"))
+        messages = list(Message.objects.order_by("tg_message_id"))
+        self.assertEqual([message.tg_message_id for message in messages], [2, 3, 5])
+        self.assertEqual([message.sender_role for message in messages], ["student", "teacher", "teacher"])
+        self.assertEqual(messages[1].reply_to_id, 2)
+        self.assertEqual(ChatStats.objects.get(chat=chat).message_count, 3)
+
+    def test_reimport_is_idempotent(self):
+        self.run_import()
+        self.run_import()
+        self.assertEqual(Message.objects.count(), 3)
+        self.assertEqual(ChatStats.objects.get().message_count, 3)
+
+    @patch("core.management.commands.import_telegram_export.process_content_task")
+    def test_sync_analysis_of_teacher_messages_in_order(self, mock_task):
+        self.run_import("--analyze", "--sync", "--chunk-size", "2")
+
+        payloads = [call.args[0] for call in mock_task.call_args_list]
+        self.assertEqual(len(payloads), 2)
+        self.assertEqual(
+            payloads[0]["text"],
+            "Student Question: Когда сдавать лабораторную?\nTeacher Answer: Лабораторная 3 до 20.05",
+        )
+        self.assertEqual(payloads[1]["text"], "Экзамен 25.06")
+
+    @patch("core.management.commands.import_telegram_export.chain")
+    def test_analysis_batches_are_chained(self, mock_chain):
+        self.run_import("--analyze", "--chunk-size", "2")
+
+        signatures = mock_chain.call_args.args
+        self.assertEqual([len(signature.args[0]) for signature in signatures], [1, 1])
+        mock_chain.return_value.delay.assert_called_once_with()
+
+    @patch("core.management.commands.import_telegram_export.time.sleep")
+    @patch("core.management.commands.import_telegram_export.chain")
+    def test_chains_are_bounded_and_sent_in_turn(self, mock_chain, mock_sleep):
+        first, second = MagicMock(), MagicMock()
+        first.parent = None
+        first.failed.return_value = False
+        first.ready.side_effect = [False, True]
+        mock_chain.return_value.delay.side_effect = [first, second]
+
+        with self.settings(INGESTION_BATCH_SIZE=1):
+            self.run_import("--analyze", "--chain-batches", "1")
+
+        self.assertEqual([len(call.args) for call in mock_chain.call_args_list], [1, 1])
+        # The second chain waited for the first to finish
+        mock_sleep.assert_called_once()
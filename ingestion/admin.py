@@ -1,3 +1,37 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import IngestedDocument, IngestionRun, IngestionSource, WebPageState
+from .tasks import run_ingestion_source
+
+
+@admin.register(WebPageState)
+class WebPageStateAdmin(admin.ModelAdmin):
+    list_display = ("url", "status_code", "fetched_at", "changed_at")
+    search_fields = ("url",)
+
+
+@admin.register(IngestedDocument)
+class IngestedDocumentAdmin(admin.ModelAdmin):
+    list_display = ("file_name", "source", "chat", "page_count", "chunk_count", "status", "created_at")
+    list_filter = ("source", "status")
+    search_fields = ("file_name", "sha256")
+
+
+@admin.register(IngestionSource)
+class IngestionSourceAdmin(admin.ModelAdmin):
+    list_display = ("name", "parser", "interval_minutes", "priority", "max_concurrency", "enabled", "next_run_at", "last_run_at")
+    list_filter = ("parser", "enabled")
+    search_fields = ("name",)
+    actions = ["run_now"]
+
+    @admin.action(description="Run selected sources now")
+    def run_now(self, request, queryset):
+        for source in queryset:
+            run_ingestion_source.apply_async(args=[source.id], priority=source.celery_priority)
+        self.message_user(request, f"{queryset.count()} sources queued.")
+
+
+@admin.register(IngestionRun)
+class IngestionRunAdmin(admin.ModelAdmin):
+    list_display = ("source", "status", "fetched", "skipped", "enqueued", "started_at", "finished_at")
+    list_filter = ("status", "source")
@@ -0,0 +1,53 @@
+"""
+Cache-backed distributed locks. cache.add() is atomic on Redis (SET NX), so
+only one process across all hosts acquires a key; the timeout is a lease that
+frees the lock if its holder dies. Release is a compare-and-delete, so a
+holder whose lease already expired never deletes its successor's lock.
+"""
+import uuid
+from typing import Optional
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+
+# Deletes the key only while it still holds the caller's token, in one step
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def acquire_lock(key: str, timeout: int) -> Optional[str]:
+    token = uuid.uuid4().hex
+    return token if cache.add(key, token, timeout) else None
+
+
+def release_lock(key: str, token: str) -> None:
+    if isinstance(cache, RedisCache):
+        client = cache._cache.get_client(key, write=True)
+        # Values are stored serialized, so the token is compared the same way
+        client.eval(RELEASE_SCRIPT, 1, cache.make_and_validate_key(key), cache._cache._serializer.dumps(token))
+        return
+    # In-process caches are not shared between processes, so get-then-delete is enough
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def acquire_slot(name: str, limit: int, timeout: int) -> Optional[str]:
+    """
+    Counting semaphore: takes one of `limit` slot keys. Returns "key:token"
+    for release_slot(), or None when all slots are held.
+    """
+    for slot in range(max(1, limit)):
+        key = f"{name}:slot:{slot}"
+        token = acquire_lock(key, timeout)
+        if token:
+            return f"{key}|{token}"
+    return None
+
+
+def release_slot(handle: str) -> None:
+    key, _, token = handle.rpartition("|")
+    release_lock(key, token)
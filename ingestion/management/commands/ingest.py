@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ingestion.parsers.registry import available_parsers, get_parser
+from ingestion.runner import IngestionRunner
+
+
+def add_runner_arguments(parser):
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Process items in order in this process instead of queueing them.",
+    )
+    parser.add_argument("--batch-size", type=int, help="Items per queued batch task.")
+    parser.add_argument(
+        "--max-queue-depth",
+        type=int,
+        help="Pause while the broker queue holds more messages than this.",
+    )
+
+
+def run_parser(command, parser, options):
+    stats = IngestionRunner(
+        parser,
+        sync=options["sync"],
+        batch_size=options["batch_size"],
+        max_queue_depth=options["max_queue_depth"],
+    ).run()
+    mode = "processed" if options["sync"] else "queued"
+    command.stdout.write(command.style.SUCCESS(
+        f"{stats.items} items {mode} in {stats.batches} batches "
+        f"({stats.backpressure_waits} backpressure waits)."
+    ))
+
+
+class Command(BaseCommand):
+    help = "Run a registered ingestion parser and stream its items into the analysis queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("parser", help=f"One of: {', '.join(sorted(available_parsers()))}")
+        add_runner_arguments(parser)
+
+    def handle(self, *args, **options):
+        try:
+            parser = get_parser(options["parser"])
+        except KeyError as e:
+            raise CommandError(e.args[0])
+        run_parser(self, parser, options)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Chat
+from ingestion.parsers.documents import DocumentParser
+from .ingest import add_runner_arguments, run_parser
+
+
+class Command(BaseCommand):
+    help = "Ingest PDF/DOCX files (or directories of them) into the analysis pipeline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Files or directories.")
+        parser.add_argument("--chat", type=int, help="Telegram chat id the documents belong to.")
+        parser.add_argument("--workers", type=int, help="Processes extracting PDF pages.")
+        add_runner_arguments(parser)
+
+    def handle(self, *args, **options):
+        chat = None
+        if options["chat"] is not None:
+            chat = Chat.objects.filter(tg_chat_id=options["chat"]).first()
+            if chat is None:
+                raise CommandError(f"Unknown chat {options['chat']}")
+        parser = DocumentParser(options["paths"], chat=chat, workers=options["workers"])
+        run_parser(self, parser, options)
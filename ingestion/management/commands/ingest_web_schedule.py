@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ingestion.parsers.web_schedule import WebScheduleParser
+from .ingest import add_runner_arguments, run_parser
+
+
+class Command(BaseCommand):
+    help = "Fetch web schedule pages and queue their new or changed sections for analysis."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls",
+            nargs="*",
+            help="Page URLs (defaults to the WEB_SCHEDULE_URLS setting).",
+        )
+        add_runner_arguments(parser)
+
+    def handle(self, *args, **options):
+        run_parser(self, WebScheduleParser(urls=options["urls"] or None), options)
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_message_search_vector'),
+        ('ingestion', '0001_webpagestate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file_name', models.CharField(max_length=255)),
+                ('source', models.CharField(choices=[('telegram', 'Telegram'), ('directory', 'Directory')], max_length=20)),
+                ('path', models.CharField(blank=True, default='', max_length=500)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('pages_processed', models.PositiveIntegerField(default=0)),
+                ('chunk_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chat', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='documents', to='core.chat')),
+            ],
+        ),
+    ]
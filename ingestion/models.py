@@ -1,3 +1,105 @@
 from django.db import models
 
-# Create your models here.
+
+class WebPageState(models.Model):
+    """
+    Conditional-fetch state of a web source page. The validators are sent back
+    on the next fetch, and the hashes let unchanged pages and sections skip
+    the LLM even when the server ignores them.
+    """
+    url = models.URLField(max_length=500, unique=True)
+    etag = models.CharField(max_length=255, blank=True, default='')
+    last_modified = models.CharField(max_length=64, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    section_hashes = models.JSONField(default=list, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    changed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.url
+
+
+class IngestedDocument(models.Model):
+    """
+    A PDF/DOCX file fed to analysis, keyed by content hash so the same
+    syllabus posted twice (or in two chats) is analyzed once.
+    """
+    SOURCES = [
+        ('telegram', 'Telegram'),
+        ('directory', 'Directory'),
+    ]
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file_name = models.CharField(max_length=255)
+    source = models.CharField(max_length=20, choices=SOURCES)
+    chat = models.ForeignKey('core.Chat', on_delete=models.SET_NULL, null=True, blank=True, related_name='documents')
+    path = models.CharField(max_length=500, blank=True, default='')
+    page_count = models.PositiveIntegerField(default=0)
+    # Pages whose ranges finished (failed ones too); ranges finish in any order
+    pages_processed = models.PositiveIntegerField(default=0)
+    chunk_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.file_name
+
+
+class IngestionSource(models.Model):
+    """
+    A parser run on a schedule by the beat-driven dispatcher
+    (ingestion.tasks.dispatch_due_sources). `options` are passed to the
+    parser's constructor, e.g. {"urls": [...]} for web_schedule.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    parser = models.CharField(max_length=50)
+    options = models.JSONField(default=dict, blank=True)
+    interval_minutes = models.PositiveIntegerField(default=60)
+    # 0-9, higher runs first and is served first by the workers
+    priority = models.PositiveSmallIntegerField(default=5)
+    max_concurrency = models.PositiveSmallIntegerField(default=1)
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-priority', 'name']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def celery_priority(self) -> int:
+        # kombu's Redis transport serves the lowest priority number first
+        return 9 - max(0, min(9, self.priority))
+
+
+class IngestionRun(models.Model):
+    STATUSES = [
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+
+    source = models.ForeignKey(IngestionSource, on_delete=models.CASCADE, related_name='runs')
+    status = models.CharField(max_length=20, choices=STATUSES, default='running')
+    fetched = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    enqueued = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.source} @ {self.started_at:%Y-%m-%d %H:%M} ({self.status})"
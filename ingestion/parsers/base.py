@@ -1,4 +1,6 @@
+"""Parser implementations for ingestion sources."""
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 from analysis.schemas import IngestionData
 
@@ -6,9 +8,16 @@ from analysis.schemas import IngestionData
 class BaseParser(ABC):
     """
     Abstract parser for non-Telegram ingestion sources.
+
+    iter_parse() is a generator: it yields items as they are produced, so a
+    source with thousands of items never has to be held in memory at once.
     """
     source_type: str = "unknown"
+    # Per-run counters recorded by scheduled runs: documents fetched, and
+    # fetched documents skipped because they had not changed
+    fetched: int = 0
+    skipped: int = 0
 
     @abstractmethod
-    def parse(self) -> IngestionData:
+    def iter_parse(self) -> Iterator[IngestionData]:
         raise NotImplementedError
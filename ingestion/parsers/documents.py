@@ -0,0 +1,284 @@
+"""
+PDF/DOCX syllabus ingestion.
+
+PDF pages are extracted in page ranges, either across a process pool
+(DocumentParser, local runs) or across Celery tasks (ingestion.tasks, bot
+uploads), since Celery's prefork workers cannot start process pools of their
+own. The extracted lines are cut into section chunks, and every chunk carries
+its source offsets (page and character position within the page).
+"""
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+from analysis.schemas import IngestionData
+from ingestion.models import IngestedDocument
+from .base import BaseParser
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx"}
+
+# Numbered headings, common syllabus section words, or short all-caps lines
+HEADING_PATTERN = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?\s+\S"
+    r"|(?i:раздел|тема|глава|модуль|неделя|лабораторная работа|практическое занятие|section|chapter|week)\b"
+    r"|[A-ZА-ЯЁ0-9][A-ZА-ЯЁ0-9 ,:()\-]{3,}$)"
+)
+HEADING_MAX_CHARS = 80
+
+
+@dataclass
+class Line:
+    text: str
+    page: Optional[int]
+    start: int
+    end: int
+    heading: bool = False
+
+
+@dataclass
+class Chunk:
+    title: str
+    page_start: Optional[int]
+    char_start: int
+    page_end: Optional[int] = None
+    char_end: int = 0
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return sum(len(line) + 1 for line in self.lines)
+
+    @property
+    def text(self) -> str:
+        body = "\n".join(self.lines)
+        return f"{self.title}\n{body}" if self.title else body
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_heading(text: str) -> bool:
+    return len(text) <= HEADING_MAX_CHARS and bool(HEADING_PATTERN.match(text)) and not text.endswith((".", ","))
+
+
+def pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    """
+    Text of pages [start, stop). Module-level so process pools can pickle it.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [reader.pages[index].extract_text() or "" for index in range(start, min(stop, len(reader.pages)))]
+
+
+def pdf_lines(pages: Iterable[str], first_page: int) -> Iterator[Line]:
+    for page_number, text in enumerate(pages, start=first_page):
+        offset = 0
+        for raw in text.splitlines(keepends=True):
+            start, offset = offset, offset + len(raw)
+            line = " ".join(raw.split())
+            if line:
+                yield Line(line, page_number, start, offset, heading=is_heading(line))
+
+
+def docx_lines(path: str) -> Iterator[Line]:
+    """
+    DOCX has no pages; offsets are character positions in the document text
+    and headings come from the paragraph styles.
+    """
+    from docx import Document
+
+    offset = 0
+    for paragraph in Document(path).paragraphs:
+        text = " ".join(paragraph.text.split())
+        start, offset = offset, offset + len(paragraph.text) + 1
+        if not text:
+            continue
+        style = (paragraph.style.name if paragraph.style is not None else "").lower()
+        heading = style.startswith(("heading", "title", "заголовок"))
+        yield Line(text, None, start, offset, heading=heading)
+
+
+def chunk_lines(lines: Iterable[Line], max_chars: int) -> Iterator[Chunk]:
+    """
+    Starts a new chunk at every heading and whenever max_chars would be exceeded.
+    """
+    current: Optional[Chunk] = None
+    for line in lines:
+        if line.heading:
+            if current is not None and current.lines:
+                yield current
+            current = Chunk(title=line.text, page_start=line.page, char_start=line.start)
+            continue
+        if current is None or (current.lines and current.size + len(line.text) > max_chars):
+            if current is not None and current.lines:
+                yield current
+            title = current.title if current is not None else ""
+            current = Chunk(title=title, page_start=line.page, char_start=line.start)
+        if not current.lines:
+            current.page_start, current.char_start = line.page, line.start
+        current.lines.append(line.text)
+        current.page_end, current.char_end = line.page, line.end
+    if current is not None and current.lines:
+        yield current
+
+
+def chunk_item(document: IngestedDocument, index: int, chunk: Chunk) -> IngestionData:
+    return IngestionData(
+        text=chunk.text,
+        source_type="document",
+        source_id=f"document:{document.sha256[:16]}:{chunk.page_start or 0}:{chunk.char_start}:{index}",
+        metadata={
+            "document_id": document.id,
+            "file_name": document.file_name,
+            "sha256": document.sha256,
+            "section_title": chunk.title,
+            "page_start": chunk.page_start,
+            "page_end": chunk.page_end,
+            "char_start": chunk.char_start,
+            "char_end": chunk.char_end,
+            "tg_chat_id": document.chat.tg_chat_id if document.chat_id else None,
+            "chat_title": document.chat.title if document.chat_id else None,
+        },
+    )
+
+
+def page_ranges(page_count: int, size: int) -> List[range]:
+    return [range(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def register_document(path: str, source: str, chat=None, file_name: str = "") -> Optional[IngestedDocument]:
+    """
+    Returns a new IngestedDocument, or None if a file with the same content
+    was ingested before. A document whose ingestion failed is reset and
+    returned, so posting the file again retries it.
+    """
+    sha256 = file_sha256(path)
+    fields = {
+        "file_name": file_name or os.path.basename(path),
+        "source": source,
+        "chat": chat,
+        "path": path,
+    }
+    document, created = IngestedDocument.objects.get_or_create(sha256=sha256, defaults=fields)
+    if created:
+        return document
+    # Conditional, so two concurrent retries don't both restart it
+    retried = IngestedDocument.objects.filter(id=document.id, status="failed").update(
+        status="pending", page_count=0, pages_processed=0, chunk_count=0, **fields
+    )
+    if retried:
+        logger.info(f"Retrying failed document {document.id} from {path}")
+        document.refresh_from_db()
+        return document
+    logger.info(f"Skipping {path}: same content as document {document.id}")
+    return None
+
+
+class DocumentPagesParser(BaseParser):
+    """
+    Chunks of one page range of a registered PDF (or of a whole DOCX), as
+    processed by one ingestion.tasks.ingest_document_pages task.
+    """
+    source_type = "document"
+
+    def __init__(self, document: IngestedDocument, start: int = 0, stop: int = 0, max_chars: Optional[int] = None):
+        self.document = document
+        self.start = start
+        self.stop = stop
+        self.max_chars = max_chars or settings.DOCUMENT_SECTION_MAX_CHARS
+        self.chunk_count = 0
+
+    def iter_parse(self) -> Iterator[IngestionData]:
+        path = self.document.path
+        if path.lower().endswith(".pdf"):
+            lines = pdf_lines(extract_pdf_pages(path, self.start, self.stop), first_page=self.start + 1)
+        else:
+            lines = docx_lines(path)
+        for self.chunk_count, chunk in enumerate(chunk_lines(lines, self.max_chars), start=1):
+            yield chunk_item(self.document, self.chunk_count, chunk)
+
+
+class DocumentParser(BaseParser):
+    """
+    Yields section chunks of every new PDF/DOCX file under the given paths
+    (files or directories). PDF page ranges are extracted in parallel.
+    """
+    source_type = "document"
+
+    def __init__(
+        self,
+        paths: Iterable[str],
+        chat=None,
+        workers: Optional[int] = None,
+        pages_per_task: Optional[int] = None,
+        max_chars: Optional[int] = None,
+    ):
+        self.paths = list(paths)
+        self.chat = chat
+        self.workers = workers or settings.DOCUMENT_WORKERS
+        self.pages_per_task = pages_per_task or settings.DOCUMENT_PAGES_PER_TASK
+        self.max_chars = max_chars or settings.DOCUMENT_SECTION_MAX_CHARS
+
+    def _files(self) -> Iterator[str]:
+        for path in self.paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    for name in sorted(names):
+                        if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                            yield os.path.join(root, name)
+            elif os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield path
+
+    def _pdf_lines(self, path: str, executor: Executor, page_count: int) -> Iterator[Line]:
+        ranges = page_ranges(page_count, self.pages_per_task)
+        # Submitted a window at a time so finished pages do not pile up in memory
+        for window_start in range(0, len(ranges), self.workers * 2):
+            window = ranges[window_start:window_start + self.workers * 2]
+            futures = [executor.submit(extract_pdf_pages, path, pages.start, pages.stop) for pages in window]
+            for pages, future in zip(window, futures):
+                yield from pdf_lines(future.result(), first_page=pages.start + 1)
+
+    def iter_parse(self) -> Iterator[IngestionData]:
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for path in self._files():
+                self.fetched += 1
+                document = register_document(path, source="directory", chat=self.chat)
+                if document is None:
+                    self.skipped += 1
+                    continue
+                try:
+                    if path.lower().endswith(".pdf"):
+                        document.page_count = pdf_page_count(path)
+                        lines = self._pdf_lines(path, executor, document.page_count)
+                    else:
+                        lines = docx_lines(path)
+                    count = 0
+                    for count, chunk in enumerate(chunk_lines(lines, self.max_chars), start=1):
+                        yield chunk_item(document, count, chunk)
+                    document.chunk_count = count
+                    document.pages_processed = document.page_count
+                    document.status = "processed"
+                except Exception as e:
+                    logger.error(f"Failed to extract {path}: {e}", exc_info=True)
+                    document.status = "failed"
+                document.save()
@@ -0,0 +1,27 @@
+"""
+Registry of ingestion parsers by name. Extra parsers can be added without
+code changes through the INGESTION_PARSERS setting ({name: dotted path}).
+"""
+from typing import Dict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import BaseParser
+
+PARSERS: Dict[str, str] = {
+    "mock_web": "ingestion.parsers.web_stub.WebStubParser",
+    "web_schedule": "ingestion.parsers.web_schedule.WebScheduleParser",
+}
+
+
+def available_parsers() -> Dict[str, str]:
+    return {**PARSERS, **getattr(settings, "INGESTION_PARSERS", {})}
+
+
+def get_parser(name: str, **options) -> BaseParser:
+    try:
+        path = available_parsers()[name]
+    except KeyError:
+        raise KeyError(f"Unknown parser '{name}'. Available: {', '.join(sorted(available_parsers()))}")
+    return import_string(path)(**options)
@@ -0,0 +1,123 @@
+"""
+Splits an HTML page into sections at its headings, using only the stdlib
+parser. Each section becomes one analysis unit, so a change in one part of a
+schedule page re-analyzes only that part.
+"""
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import List, Optional
+from urllib.parse import urljoin
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4"}
+SKIPPED_TAGS = {"script", "style", "noscript", "nav", "footer", "template", "svg"}
+BLOCK_TAGS = {"p", "div", "li", "tr", "br", "table", "ul", "ol", "section", "article", "dd", "dt"}
+
+
+@dataclass
+class Section:
+    title: str
+    text: str
+    links: List[str] = field(default_factory=list)
+
+
+class _SectionParser(HTMLParser):
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.page_title = ""
+        self.sections: List[Section] = [Section(title="", text="")]
+        self._parts: List[str] = []
+        self._heading: Optional[List[str]] = None
+        self._in_title = False
+        self._skip_depth = 0
+
+    def _flush(self):
+        lines = (re.sub(r"\s+", " ", line).strip() for line in "".join(self._parts).split("\n"))
+        self.sections[-1].text = "\n".join(line for line in lines if line)
+        self._parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in HEADING_TAGS:
+            self._flush()
+            self._heading = []
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href and not href.startswith(("#", "javascript:", "mailto:")):
+                self.sections[-1].links.append(urljoin(self.base_url, href))
+        if tag in BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in HEADING_TAGS and self._heading is not None:
+            title = " ".join("".join(self._heading).split())
+            self.sections.append(Section(title=title, text=""))
+            self._heading = None
+        if tag in BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._in_title:
+            self.page_title += data
+        elif self._heading is not None:
+            self._heading.append(data)
+        else:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def split_long(text: str, max_chars: int) -> List[str]:
+    """
+    Splits text at line boundaries into chunks of at most max_chars
+    (a single longer line is cut hard).
+    """
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > max_chars:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def html_sections(html: str, base_url: str = "", max_chars: int = 3000):
+    """
+    Returns (page title, sections). Sections without text are dropped and
+    long ones are split into parts titled "<heading> (n)".
+    """
+    parser = _SectionParser(base_url)
+    parser.feed(html)
+    parser.close()
+
+    sections = []
+    for section in parser.sections:
+        if not section.text:
+            continue
+        parts = split_long(section.text, max_chars)
+        for index, part in enumerate(parts, start=1):
+            title = f"{section.title} ({index})" if len(parts) > 1 else section.title
+            sections.append(Section(title=title, text=part, links=section.links if index == 1 else []))
+    return " ".join(parser.page_title.split()), sections
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+from django.utils import timezone as django_timezone
+
+from analysis.schemas import IngestionData
+from ingestion.models import WebPageState
+from .base import BaseParser
+from .sections import Section, html_sections
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "SmartArg schedule fetcher"
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: Optional[int]
+    text: str = ""
+    etag: str = ""
+    last_modified: str = ""
+    error: str = ""
+
+
+class HostRateLimiter:
+    """
+    Spaces requests to the same host at least min_interval seconds apart;
+    different hosts do not wait for each other.
+    """
+
+    def __init__(self, min_interval: float, last_request: Optional[Dict[str, float]] = None):
+        self.min_interval = min_interval
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Shared between windows so spacing holds across event loops
+        self._last_request = last_request if last_request is not None else {}
+
+    async def wait(self, host: str) -> None:
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self._last_request.get(host, 0.0) + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last_request[host] = time.monotonic()
+
+
+class WebScheduleParser(BaseParser):
+    """
+    Fetches schedule pages concurrently and yields one IngestionData per new
+    or changed section. Pages answered with 304, or whose content hash did not
+    change, produce nothing and never reach the LLM.
+
+    URLs are fetched in windows of `concurrency` pages, so only one window of
+    page bodies is in memory at a time however many URLs are configured.
+    """
+    source_type = "web_schedule"
+
+    def __init__(
+        self,
+        urls: Optional[Iterable[str]] = None,
+        concurrency: Optional[int] = None,
+        host_interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_chars: Optional[int] = None,
+    ):
+        self.urls = list(dict.fromkeys(urls if urls is not None else settings.WEB_SCHEDULE_URLS))
+        self.concurrency = concurrency or settings.WEB_FETCH_CONCURRENCY
+        self.host_interval = settings.WEB_FETCH_HOST_INTERVAL if host_interval is None else host_interval
+        self.timeout = timeout or settings.WEB_FETCH_TIMEOUT
+        self.max_chars = max_chars or settings.WEB_SECTION_MAX_CHARS
+
+    async def _fetch(self, client, semaphore, limiter, url, state) -> FetchResult:
+        headers = {}
+        if state is not None and state.etag:
+            headers["If-None-Match"] = state.etag
+        if state is not None and state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+        await limiter.wait(urlsplit(url).netloc)
+        async with semaphore:
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to fetch {url}: {e}")
+                return FetchResult(url=url, status_code=None, error=str(e))
+        return FetchResult(
+            url=url,
+            status_code=response.status_code,
+            text=response.text if response.status_code == 200 else "",
+            etag=response.headers.get("ETag", ""),
+            last_modified=response.headers.get("Last-Modified", ""),
+        )
+
+    async def fetch_all(self, urls: List[str], states: Dict[str, WebPageState],
+                        last_request: Optional[Dict[str, float]] = None) -> List[FetchResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = HostRateLimiter(self.host_interval, last_request)
+        limits = httpx.Limits(max_connections=self.concurrency)
+        async with httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=limits,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        ) as client:
+            return await asyncio.gather(
+                *(self._fetch(client, semaphore, limiter, url, states.get(url)) for url in urls)
+            )
+
+    def _changed_sections(self, result: FetchResult, state: WebPageState):
+        title, sections = html_sections(result.text, base_url=result.url, max_chars=self.max_chars)
+        hashes = [_hash(f"{section.title}\n{section.text}") for section in sections]
+        known = set(state.section_hashes or [])
+        changed = [
+            (index, section, section_hash)
+            for index, (section, section_hash) in enumerate(zip(sections, hashes))
+            if section_hash not in known
+        ]
+        state.section_hashes = hashes
+        return title, changed
+
+    def _item(self, url: str, title: str, index: int, section: Section, section_hash: str) -> IngestionData:
+        return IngestionData(
+            text=f"{section.title}\n{section.text}" if section.title else section.text,
+            source_type=self.source_type,
+            source_id=f"{url}#{index}:{section_hash[:12]}",
+            metadata={
+                "source_name": title or urlsplit(url).netloc,
+                "url": url,
+                "section_title": section.title,
+                "links": section.links,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+
+    def iter_parse(self) -> Iterator[IngestionData]:
+        last_request: Dict[str, float] = {}
+        for start in range(0, len(self.urls), self.concurrency):
+            window = self.urls[start:start + self.concurrency]
+            states = {state.url: state for state in WebPageState.objects.filter(url__in=window)}
+            results = asyncio.run(self.fetch_all(window, states, last_request))
+            for result in results:
+                yield from self._process(result, states.get(result.url))
+
+    def _process(self, result: FetchResult, state: Optional[WebPageState]) -> Iterator[IngestionData]:
+        if result.status_code is None:
+            return
+        self.fetched += 1
+        now = django_timezone.now()
+        state = state or WebPageState(url=result.url)
+        state.status_code = result.status_code
+        state.fetched_at = now
+
+        items = []
+        if result.status_code == 200:
+            state.etag = result.etag
+            state.last_modified = result.last_modified
+            content_hash = _hash(result.text)
+            if content_hash != state.content_hash:
+                title, changed = self._changed_sections(result, state)
+                items = [self._item(result.url, title, *item) for item in changed]
+                state.content_hash = content_hash
+                state.changed_at = now
+                logger.info(f"{result.url}: {len(changed)} new or changed sections")
+            else:
+                self.skipped += 1
+        elif result.status_code == 304:
+            self.skipped += 1
+        else:
+            logger.warning(f"{result.url} answered {result.status_code}")
+        # Saved only after the items were consumed, so a failed run re-fetches the page
+        yield from items
+        state.save()
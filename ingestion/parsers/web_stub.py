@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from typing import Iterator
 import uuid
 
 from analysis.schemas import IngestionData
@@ -11,18 +12,23 @@ class WebStubParser(BaseParser):
     """
     source_type = "web_schedule"
 
-    def parse(self) -> IngestionData:
+    def __init__(self, count: int = 1):
+        self.count = count
+
+    def iter_parse(self) -> Iterator[IngestionData]:
         sample_text = (
             "Course schedule update: Lecture on Monday at 10:00. "
             "Homework deadline: submit lab report by next Friday. "
             "Resources: https://example.com/syllabus"
         )
-        return IngestionData(
-            text=sample_text,
-            source_type=self.source_type,
-            source_id=f"web_stub:{uuid.uuid4()}",
-            metadata={
-                "source_name": "Mock Web Schedule",
-                "fetched_at": datetime.now(timezone.utc).isoformat(),
-            },
-        )
+        for _ in range(self.count):
+            self.fetched += 1
+            yield IngestionData(
+                text=sample_text,
+                source_type=self.source_type,
+                source_id=f"web_stub:{uuid.uuid4()}",
+                metadata={
+                    "source_name": "Mock Web Schedule",
+                    "fetched_at": datetime.now(timezone.utc).isoformat(),
+                },
+            )
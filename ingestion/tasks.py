@@ -0,0 +1,182 @@
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+import httpx
+from celery import shared_task
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Chat
+from .locks import acquire_lock, acquire_slot, release_lock, release_slot
+from .models import IngestedDocument, IngestionRun, IngestionSource
+from .parsers.documents import (
+    DocumentPagesParser,
+    page_ranges,
+    pdf_page_count,
+    register_document,
+)
+from .parsers.registry import get_parser
+from .runner import IngestionRunner
+
+logger = logging.getLogger(__name__)
+
+
+def download_telegram_file(file_id: str, suffix: str) -> str:
+    """
+    Streams a Bot API file into DOCUMENT_STORAGE_DIR and returns its path.
+    """
+    api = f"{settings.TELEGRAM_API_URL}/bot{settings.TELEGRAM_BOT_TOKEN}"
+    with httpx.Client(timeout=60) as client:
+        response = client.get(f"{api}/getFile", params={"file_id": file_id})
+        response.raise_for_status()
+        file_path = response.json()["result"]["file_path"]
+
+        os.makedirs(settings.DOCUMENT_STORAGE_DIR, exist_ok=True)
+        handle, path = tempfile.mkstemp(suffix=suffix, dir=settings.DOCUMENT_STORAGE_DIR)
+        url = f"{settings.TELEGRAM_API_URL}/file/bot{settings.TELEGRAM_BOT_TOKEN}/{file_path}"
+        with os.fdopen(handle, "wb") as fp, client.stream("GET", url) as download:
+            download.raise_for_status()
+            for block in download.iter_bytes():
+                fp.write(block)
+    return path
+
+
+@shared_task
+def ingest_telegram_document(file_id: str, file_name: str, tg_chat_id: int):
+    """
+    Downloads a document posted in a chat and fans its PDF page ranges out
+    to ingest_document_pages, so no single task holds a worker for the
+    whole file. The download is deleted once every range has been parsed.
+    """
+    suffix = os.path.splitext(file_name)[1].lower()
+    path = download_telegram_file(file_id, suffix)
+    chat = Chat.objects.filter(tg_chat_id=tg_chat_id).first()
+
+    document = register_document(path, source="telegram", chat=chat, file_name=file_name)
+    if document is None:
+        os.remove(path)
+        return
+
+    if suffix == ".pdf":
+        try:
+            document.page_count = pdf_page_count(path)
+        except Exception as e:
+            logger.error(f"Failed to read {file_name}: {e}", exc_info=True)
+            IngestedDocument.objects.filter(id=document.id).update(status="failed")
+            remove_downloaded_file(document.id)
+            return
+        document.save(update_fields=["page_count"])
+        for pages in page_ranges(document.page_count, settings.DOCUMENT_PAGES_PER_TASK):
+            ingest_document_pages.delay(document.id, pages.start, pages.stop)
+    else:
+        ingest_document_pages.delay(document.id, 0, 0)
+    logger.info(f"Document {file_name} ({document.page_count} pages) scheduled for ingestion")
+
+
+@shared_task
+def ingest_document_pages(document_id: int, start: int, stop: int):
+    document = IngestedDocument.objects.select_related("chat").get(id=document_id)
+    parser = DocumentPagesParser(document, start, stop)
+    try:
+        IngestionRunner(parser).run()
+    except Exception as e:
+        logger.error(f"Failed to ingest pages {start}-{stop} of {document.file_name}: {e}", exc_info=True)
+        # Failed ranges count as done too, so the file is still cleaned up
+        IngestedDocument.objects.filter(id=document_id).update(
+            status="failed", pages_processed=F("pages_processed") + (stop - start)
+        )
+    else:
+        IngestedDocument.objects.filter(id=document_id).update(
+            chunk_count=F("chunk_count") + parser.chunk_count,
+            pages_processed=F("pages_processed") + (stop - start),
+        )
+        IngestedDocument.objects.filter(
+            id=document_id, status="pending", pages_processed__gte=F("page_count")
+        ).update(status="processed")
+    remove_downloaded_file(document_id)
+
+
+def remove_downloaded_file(document_id: int) -> None:
+    """
+    Deletes a Telegram document's download once all of its page ranges
+    are done. Files ingested from a directory belong to the user and stay.
+    """
+    document = IngestedDocument.objects.filter(
+        id=document_id, source="telegram", pages_processed__gte=F("page_count")
+    ).exclude(path="").first()
+    if document is None:
+        return
+    try:
+        os.remove(document.path)
+    except FileNotFoundError:
+        pass
+    IngestedDocument.objects.filter(id=document_id).update(path="")
+
+
+DISPATCH_LOCK = "ingestion:dispatch-lock"
+
+
+@shared_task
+def dispatch_due_sources():
+    """
+    Beat entry point: queues a run for every enabled source that is due,
+    highest priority first. The dispatch lock keeps a second beat instance
+    from dispatching the same tick, and each source is claimed by moving its
+    next_run_at with a conditional UPDATE, so a source is never queued twice.
+    """
+    token = acquire_lock(DISPATCH_LOCK, settings.INGESTION_DISPATCH_LOCK_TIMEOUT)
+    if token is None:
+        logger.info("Ingestion dispatch already running elsewhere")
+        return 0
+
+    dispatched = 0
+    try:
+        now = timezone.now()
+        due = IngestionSource.objects.filter(enabled=True).filter(
+            Q(next_run_at__isnull=True) | Q(next_run_at__lte=now)
+        ).order_by("-priority", "next_run_at")
+        for source in due:
+            claimed = IngestionSource.objects.filter(id=source.id, next_run_at=source.next_run_at).update(
+                next_run_at=now + timedelta(minutes=source.interval_minutes)
+            )
+            if not claimed:
+                continue
+            run_ingestion_source.apply_async(args=[source.id], priority=source.celery_priority)
+            dispatched += 1
+    finally:
+        release_lock(DISPATCH_LOCK, token)
+    return dispatched
+
+
+@shared_task
+def run_ingestion_source(source_id: int):
+    source = IngestionSource.objects.get(id=source_id)
+    run = IngestionRun.objects.create(source=source)
+
+    slot = acquire_slot(f"ingestion:source:{source.id}", source.max_concurrency, settings.INGESTION_SOURCE_LEASE)
+    if slot is None:
+        run.status = "skipped"
+        run.error = f"Concurrency limit of {source.max_concurrency} reached"
+        run.finished_at = timezone.now()
+        run.save()
+        return run.id
+
+    try:
+        parser = get_parser(source.parser, **source.options)
+        stats = IngestionRunner(parser).run()
+        run.status = "succeeded"
+        run.fetched, run.skipped, run.enqueued = parser.fetched, parser.skipped, stats.items
+    except Exception as e:
+        logger.error(f"Ingestion source {source.name} failed: {e}", exc_info=True)
+        run.status = "failed"
+        run.error = str(e)
+    finally:
+        release_slot(slot)
+
+    run.finished_at = timezone.now()
+    run.save()
+    IngestionSource.objects.filter(id=source.id).update(last_run_at=run.finished_at)
+    return run.id
@@ -1,3 +1,385 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from docx import Document
+
+from core.models import Chat
+
+from ingestion.locks import acquire_lock, acquire_slot, release_lock
+from ingestion.models import IngestedDocument, IngestionRun, IngestionSource, WebPageState
+from ingestion.parsers.documents import DocumentParser, Line, chunk_lines, file_sha256
+from ingestion.parsers.registry import get_parser
+from ingestion.parsers.sections import html_sections, split_long
+from ingestion.parsers.web_schedule import WebScheduleParser
+from ingestion.parsers.web_stub import WebStubParser
+from ingestion.runner import IngestionRunner, batched
+from ingestion.tasks import (
+    DISPATCH_LOCK,
+    dispatch_due_sources,
+    ingest_document_pages,
+    ingest_telegram_document,
+    run_ingestion_source,
+)
+
+SCHEDULE_PAGE = """
+<html><head><title>Расписание ИВТ</title><style>body {color: red}</style></head>
+<body>
+  <nav><a href="/">Главная</a></nav>
+  <h2>Лекции</h2>
+  <p>Понедельник 10:00 — Базы данных</p>
+  <h2>Дедлайны</h2>
+  <ul><li>Лабораторная 3 — до {deadline}</li></ul>
+  <a href="/files/lab3.pdf">Задание</a>
+</body></html>
+"""
+
+
+class ScheduleHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in schedule site: honours If-None-Match and records every request.
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get("If-None-Match"), time.monotonic()))
+        body = SCHEDULE_PAGE.replace("{deadline}", server.deadline).encode("utf-8")
+        etag = f'"{server.deadline}"'
+        if self.headers.get("If-None-Match") == etag and server.honour_etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class WebScheduleParserTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ScheduleHandler)
+        self.server.requests = []
+        self.server.deadline = "20.05"
+        self.server.honour_etag = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def parser(self, *paths, **kwargs):
+        kwargs.setdefault("host_interval", 0)
+        return WebScheduleParser(urls=[self.base_url + path for path in paths], **kwargs)
+
+    def test_html_sections(self):
+        title, sections = html_sections(SCHEDULE_PAGE.replace("{deadline}", "20.05"), base_url="https://uni.example/")
+        self.assertEqual(title, "Расписание ИВТ")
+        self.assertEqual([section.title for section in sections], ["Лекции", "Дедлайны"])
+        self.assertEqual(sections[1].text, "Лабораторная 3 — до 20.05\nЗадание")
+        self.assertEqual(sections[1].links, ["https://uni.example/files/lab3.pdf"])
+        self.assertNotIn("color", sections[0].text)
+
+    def test_split_long(self):
+        self.assertEqual(split_long("aaaa\nbb\ncc", 5), ["aaaa", "bb\ncc"])
+        self.assertEqual(split_long("abcdefg", 3), ["abc", "def", "g"])
+
+    def test_unchanged_pages_never_reach_the_llm(self):
+        first = list(self.parser("/schedule").iter_parse())
+        self.assertEqual(len(first), 2)
+        self.assertEqual(first[0].source_type, "web_schedule")
+        self.assertEqual(first[0].metadata["source_name"], "Расписание ИВТ")
+
+        # 304 thanks to the stored ETag
+        self.assertEqual(list(self.parser("/schedule").iter_parse()), [])
+        self.assertEqual(self.server.requests[-1][1], '"20.05"')
+
+        # Server ignores validators: the content hash still filters the page
+        self.server.honour_etag = False
+        self.assertEqual(list(self.parser("/schedule").iter_parse()), [])
+
+    def test_only_changed_sections_are_emitted(self):
+        list(self.parser("/schedule").iter_parse())
+        self.server.deadline = "27.05"
+
+        changed = list(self.parser("/schedule").iter_parse())
+
+        self.assertEqual(len(changed), 1)
+        self.assertIn("27.05", changed[0].text)
+        self.assertEqual(WebPageState.objects.get().status_code, 200)
+
+    def test_requests_to_one_host_are_rate_limited(self):
+        # Two fetch windows: the spacing must hold across them too
+        list(self.parser("/a", "/b", "/c", host_interval=0.1, concurrency=2).iter_parse())
+
+        times = sorted(request[2] for request in self.server.requests)
+        self.assertEqual(len(times), 3)
+        self.assertGreaterEqual(times[-1] - times[0], 0.18)
+
+    def test_unreachable_page_is_skipped(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+        parser = WebScheduleParser(urls=[f"http://127.0.0.1:{closed_port}/schedule"], timeout=1)
+
+        self.assertEqual(list(parser.iter_parse()), [])
+        self.assertFalse(WebPageState.objects.exists())
+
+
+class IngestionRunnerTests(TestCase):
+    def test_registry(self):
+        self.assertIsInstance(get_parser("mock_web", count=2), WebStubParser)
+        with self.assertRaises(KeyError):
+            get_parser("missing")
+
+    def test_batched_is_lazy(self):
+        produced = []
+
+        def items():
+            for index in range(5):
+                produced.append(index)
+                yield index
+
+        batches = batched(items(), 2)
+        self.assertEqual(next(batches), [0, 1])
+        self.assertEqual(produced, [0, 1])
+        self.assertEqual(list(batches), [[2, 3], [4]])
+
+    @patch("ingestion.runner.queue_depth", return_value=0)
+    @patch("ingestion.runner.priority.enqueue_batch")
+    def test_items_are_enqueued_in_batches(self, mock_batch, mock_depth):
+        stats = IngestionRunner(WebStubParser(count=5), batch_size=2).run()
+
+        self.assertEqual((stats.items, stats.batches), (5, 3))
+        self.assertEqual([len(call.args[0]) for call in mock_batch.call_args_list], [2, 2, 1])
+        self.assertEqual(mock_batch.call_args_list[0].args[0][0].source_type, "web_schedule")
+
+    @patch("ingestion.runner.time.sleep")
+    @patch("ingestion.runner.queue_depth", side_effect=[10, 10, 0, 0])
+    @patch("ingestion.runner.priority.enqueue_batch")
+    def test_backpressure_waits_for_queue_to_drain(self, mock_batch, mock_depth, mock_sleep):
+        stats = IngestionRunner(WebStubParser(count=2), batch_size=1, max_queue_depth=5).run()
+
+        self.assertEqual(stats.backpressure_waits, 2)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(mock_batch.call_count, 2)
+
+    @patch("ingestion.runner.priority.enqueue_batch")
+    @patch("ingestion.runner.process_content_task")
+    def test_sync_processes_in_order(self, mock_task, mock_batch):
+        stats = IngestionRunner(WebStubParser(count=3), sync=True, batch_size=2).run()
+
+        self.assertEqual(stats.items, 3)
+        self.assertEqual(mock_task.call_count, 3)
+        self.assertFalse(mock_batch.called)
+
+
+def make_pdf(path, pages):
+    """
+    Writes a minimal PDF whose pages hold the given lines of ASCII text.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        commands = " ".join(f"({line}) Tj 0 -16 Td" for line in lines)
+        stream = f"BT /F1 12 Tf 50 750 Td {commands} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as fp:
+        fp.write(body)
+
+
+class DocumentIngestionTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_docx(self, name="syllabus.docx"):
+        document = Document()
+        document.add_heading("Раздел 1. Введение", level=1)
+        document.add_paragraph("Лекции по понедельникам.")
+        document.add_heading("Лабораторные работы", level=1)
+        document.add_paragraph("Лабораторная 1 — до 20.05.")
+        document.add_paragraph("Лабораторная 2 — до 27.05.")
+        path = os.path.join(self.directory, name)
+        document.save(path)
+        return path
+
+    def test_chunk_lines_splits_at_headings_and_size(self):
+        lines = [
+            Line("1. Intro", 1, 0, 9, heading=True),
+            Line("a" * 30, 1, 9, 40),
+            Line("b" * 30, 2, 0, 31),
+            Line("2. Labs", 2, 31, 39, heading=True),
+            Line("c" * 10, 3, 0, 11),
+        ]
+        chunks = list(chunk_lines(lines, max_chars=40))
+        self.assertEqual([(chunk.title, chunk.page_start, chunk.page_end) for chunk in chunks], [
+            ("1. Intro", 1, 1), ("1. Intro", 2, 2), ("2. Labs", 3, 3),
+        ])
+        self.assertEqual((chunks[1].char_start, chunks[1].char_end), (0, 31))
+
+    def test_docx_sections_and_dedupe_by_hash(self):
+        path = self.make_docx()
+        shutil.copy(path, os.path.join(self.directory, "copy.docx"))
+
+        items = list(DocumentParser([self.directory], workers=1).iter_parse())
+
+        self.assertEqual([item.metadata["section_title"] for item in items], ["Раздел 1. Введение", "Лабораторные работы"])
+        self.assertEqual(items[1].text, "Лабораторные работы\nЛабораторная 1 — до 20.05.\nЛабораторная 2 — до 27.05.")
+        self.assertEqual(items[0].source_type, "document")
+        document = IngestedDocument.objects.get()
+        self.assertEqual((document.status, document.chunk_count), ("processed", 2))
+        self.assertEqual(list(DocumentParser([path], workers=1).iter_parse()), [])
+
+    def test_pdf_pages_are_extracted_in_parallel_ranges(self):
+        path = os.path.join(self.directory, "course.pdf")
+        make_pdf(path, [["1. Schedule", "Lecture on Monday"], ["Lab 1 due 20.05"], ["2. Exams", "Exam on 25.06"]])
+
+        items = list(DocumentParser([path], workers=2, pages_per_task=1).iter_parse())
+
+        self.assertEqual([item.metadata["section_title"] for item in items], ["1. Schedule", "2. Exams"])
+        self.assertEqual((items[0].metadata["page_start"], items[0].metadata["page_end"]), (1, 2))
+        self.assertIn("Lab 1 due 20.05", items[0].text)
+        self.assertEqual(IngestedDocument.objects.get().page_count, 3)
+
+    @patch("ingestion.runner.queue_depth", return_value=0)
+    @patch("ingestion.runner.priority.enqueue_batch")
+    @patch("ingestion.tasks.ingest_document_pages.delay")
+    @patch("ingestion.tasks.download_telegram_file")
+    def test_bot_documents_fan_out_page_ranges(self, mock_download, mock_pages, mock_batch, mock_depth):
+        path = os.path.join(self.directory, "course.pdf")
+        make_pdf(path, [["1. Schedule", "Lecture"], ["Lab 1"], ["Lab 2"]])
+        mock_download.return_value = path
+        chat = Chat.objects.create(tg_chat_id=-100777, title="ИВТ", chat_type="supergroup")
+
+        with self.settings(DOCUMENT_PAGES_PER_TASK=2):
+            ingest_telegram_document("file-id", "course.pdf", chat.tg_chat_id)
+        self.assertEqual([call.args[1:] for call in mock_pages.call_args_list], [(0, 2), (2, 3)])
+
+        document = IngestedDocument.objects.get()
+        for call in mock_pages.call_args_list:
+            ingest_document_pages(*call.args)
+        document.refresh_from_db()
+        self.assertEqual((document.status, document.pages_processed, document.chat), ("processed", 3, chat))
+        item = mock_batch.call_args_list[0].args[0][0]
+        self.assertEqual(item.metadata["tg_chat_id"], -100777)
+        # The download is deleted once the last range is parsed
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(document.path, "")
+
+    @patch("ingestion.tasks.ingest_document_pages.delay")
+    @patch("ingestion.tasks.download_telegram_file")
+    def test_failed_document_is_retried_when_posted_again(self, mock_download, mock_pages):
+        path = self.make_docx()
+        mock_download.return_value = path
+        IngestedDocument.objects.create(
+            sha256=file_sha256(path), file_name="syllabus.docx", source="telegram", status="failed",
+        )
+
+        ingest_telegram_document("file-id", "syllabus.docx", -100777)
+
+        document = IngestedDocument.objects.get()
+        self.assertEqual((document.status, document.path), ("pending", path))
+        mock_pages.assert_called_once_with(document.id, 0, 0)
+
+        ingest_telegram_document("file-id", "syllabus.docx", -100777)
+        mock_pages.assert_called_once()
+
+
+class ScheduledIngestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.low = IngestionSource.objects.create(name="low", parser="mock_web", priority=1)
+        self.high = IngestionSource.objects.create(
+            name="high", parser="mock_web", priority=9, next_run_at=now - timezone.timedelta(minutes=1),
+        )
+        IngestionSource.objects.create(name="later", parser="mock_web", next_run_at=now + timezone.timedelta(hours=1))
+        IngestionSource.objects.create(name="off", parser="mock_web", enabled=False)
+
+    @patch("ingestion.tasks.run_ingestion_source.apply_async")
+    def test_due_sources_are_dispatched_once_by_priority(self, mock_apply):
+        self.assertEqual(dispatch_due_sources(), 2)
+        self.assertEqual(
+            [(call.kwargs["args"], call.kwargs["priority"]) for call in mock_apply.call_args_list],
+            # The Redis transport serves lower numbers first
+            [([self.high.id], 0), ([self.low.id], 8)],
+        )
+        self.low.refresh_from_db()
+        self.assertGreater(self.low.next_run_at, timezone.now())
+
+        # Already claimed: a second tick finds nothing due
+        self.assertEqual(dispatch_due_sources(), 0)
+
+    def test_release_lock_only_deletes_own_lease(self):
+        token = acquire_lock("ingestion:test-lock", 60)
+        release_lock("ingestion:test-lock", "expired-holder")
+        self.assertIsNone(acquire_lock("ingestion:test-lock", 60))
+
+        release_lock("ingestion:test-lock", token)
+        self.assertIsNotNone(acquire_lock("ingestion:test-lock", 60))
+
+    @patch("ingestion.tasks.run_ingestion_source.apply_async")
+    def test_dispatch_lock_blocks_second_beat(self, mock_apply):
+        cache.add(DISPATCH_LOCK, "other-beat", 60)
+        self.assertEqual(dispatch_due_sources(), 0)
+        self.assertFalse(mock_apply.called)
+
+    @patch("ingestion.runner.queue_depth", return_value=0)
+    @patch("ingestion.runner.priority.enqueue_batch")
+    def test_run_records_counts(self, mock_batch, mock_depth):
+        self.low.options = {"count": 3}
+        self.low.save()
+
+        run = IngestionRun.objects.get(id=run_ingestion_source(self.low.id))
+
+        self.assertEqual((run.status, run.fetched, run.skipped, run.enqueued), ("succeeded", 3, 0, 3))
+        self.assertIsNotNone(run.finished_at)
+
+    def test_concurrency_limit_skips_run(self):
+        acquire_slot(f"ingestion:source:{self.low.id}", 1, 60)
+
+        run = IngestionRun.objects.get(id=run_ingestion_source(self.low.id))
+
+        self.assertEqual(run.status, "skipped")
+
+    def test_failed_run_records_error(self):
+        self.low.options = {"unexpected": True}
+        self.low.save()
+
+        run = IngestionRun.objects.get(id=run_ingestion_source(self.low.id))
 
-# Create your tests here.
+        self.assertEqual(run.status, "failed")
+        self.assertIn("unexpected", run.error)
+        self.assertIsNotNone(acquire_slot(f"ingestion:source:{self.low.id}", 1, 60))
@@ -2,6 +2,8 @@
 ASGI config for telegram_analyzer project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to settings.EVENTS_PATH are streamed by web.sse, everything else is
+handled by Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +15,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "telegram_analyzer.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: both need configured settings
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+
+from web.sse import events_app  # noqa: E402
+
+if settings.DEBUG:
+    django_application = ASGIStaticFilesHandler(django_application)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == settings.EVENTS_PATH:
+        await events_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_shutdown, worker_ready
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'telegram_analyzer.settings')
@@ -18,3 +19,24 @@ app.autodiscover_tasks()
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs):
+    from analysis.metrics import start_worker_exporter
+
+    start_worker_exporter()
+
+
+@worker_ready.connect
+def warm_up_models(**kwargs):
+    from analysis.warmup import warm_up_in_background
+
+    warm_up_in_background()
+
+
+@worker_process_shutdown.connect
+def release_child_metrics(pid=None, **kwargs):
+    from analysis.metrics import mark_process_dead
+
+    mark_process_dead(pid or os.getpid())
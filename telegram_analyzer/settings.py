@@ -1,4 +1,5 @@
 
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -27,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "analysis.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -70,6 +72,65 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:63
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+# Honour per-task priorities (0-9) on the Redis broker
+CELERY_BROKER_TRANSPORT_OPTIONS = {"priority_steps": list(range(10)), "queue_order_strategy": "priority"}
+# Analysis work is split by priority class (analysis.priority) into its own
+# queues; run separate worker pools for the urgent and the live queue.
+ANALYSIS_QUEUES = {
+    "urgent": os.getenv("ANALYSIS_QUEUE_URGENT", "analysis.urgent"),
+    "live": os.getenv("ANALYSIS_QUEUE_LIVE", "analysis.live"),
+    "bulk": os.getenv("ANALYSIS_QUEUE_BULK", "analysis.bulk"),
+}
+# A live teacher message is urgent when it says so ("срочно") or mentions a
+# date at most this many days ahead
+URGENT_DATE_WINDOW_DAYS = int(os.getenv("URGENT_DATE_WINDOW_DAYS", "2"))
+# Seconds from enqueue to saved analysis; slower analyses count as SLO breaches (0: no objective)
+ANALYSIS_SLO_SECONDS = {
+    "urgent": float(os.getenv("ANALYSIS_SLO_URGENT", "60")),
+    "live": float(os.getenv("ANALYSIS_SLO_LIVE", "300")),
+    "bulk": float(os.getenv("ANALYSIS_SLO_BULK", "0")),
+}
+CELERY_TASK_ROUTES = {
+    "analysis.tasks.process_content_batch": {"queue": ANALYSIS_QUEUES["bulk"]},
+}
+CELERY_BEAT_SCHEDULE = {
+    "dispatch-ingestion-sources": {
+        "task": "ingestion.tasks.dispatch_due_sources",
+        "schedule": float(os.getenv("INGESTION_DISPATCH_INTERVAL", "60")),
+    },
+    "keep-models-warm": {
+        "task": "analysis.tasks.keep_models_warm",
+        "schedule": float(os.getenv("OLLAMA_KEEPALIVE_INTERVAL", "240")),
+    },
+    "prune-llm-ledger": {
+        "task": "analysis.tasks.prune_llm_ledger",
+        "schedule": 24 * 60 * 60,
+    },
+    "prune-deleted-records": {
+        "task": "analysis.tasks.prune_deleted_records",
+        "schedule": 24 * 60 * 60,
+    },
+    "reanalyze-degraded": {
+        "task": "analysis.tasks.reanalyze_degraded",
+        "schedule": float(os.getenv("REANALYSIS_INTERVAL", "300")),
+    },
+}
+
+# Cache (shared counters, query caches). Redis when CACHE_URL is set, in-process otherwise.
+CACHE_URL = os.getenv("CACHE_URL")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
 
 # Localization
 LANGUAGE_CODE = "ru-ru"
@@ -88,5 +149,134 @@ AI_API_KEY = os.getenv("AI_API_KEY")
 AI_BASE_URL = os.getenv("AI_BASE_URL")
 AI_MODEL_NAME = os.getenv("AI_MODEL_NAME", "gpt-4o")
 
+# Ollama warm-up: workers load the chat and embedding models on start, the
+# keep-models-warm beat task renews OLLAMA_KEEP_ALIVE, and analysis tasks wait
+# up to OLLAMA_WARMUP_TIMEOUT seconds for the models before their first call.
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1" if AI_PROVIDER == "ollama" else "0") == "1"
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv("OLLAMA_WARMUP_TIMEOUT", "120"))
+# After a failed warm-up tasks stop waiting for the models for this many seconds
+OLLAMA_WARMUP_RETRY_SECONDS = int(os.getenv("OLLAMA_WARMUP_RETRY_SECONDS", "60"))
+
+# Two-tier analysis per source type, as JSON. A classifier ("heuristic" or a small
+# model name) scores each message and only scores >= threshold reach the
+# extractor model (default AI_MODEL_NAME) with the full prompt. "*" applies to
+# source types without their own route; unrouted types go straight to the extractor.
+# Example: {"telegram": {"classifier": "qwen3:1.7b", "threshold": 0.5, "model": "qwen3:8b"}}
+AI_ROUTING = json.loads(os.getenv("AI_ROUTING") or "{}")
+
+# Circuit breakers around the LLM, embedding and Qdrant calls (analysis.breakers).
+# Each call has a timeout (seconds) and up to *_RETRIES retries with jittered
+# exponential backoff. BREAKER_FAILURE_THRESHOLD failed calls within
+# BREAKER_RESET_SECONDS open the breaker: analysis falls back to the heuristic
+# without waiting, and the results are marked degraded. The reanalyze-degraded
+# beat task re-queues up to REANALYSIS_BATCH_SIZE of them once the breakers close
+# (REANALYSIS_PROBE_SIZE while half-open, to probe the dependency), each at most
+# REANALYSIS_MAX_ATTEMPTS times.
+DEPENDENCY_TIMEOUTS = {
+    "llm": float(os.getenv("LLM_TIMEOUT", "90")),
+    "embedding": float(os.getenv("EMBEDDING_TIMEOUT", "15")),
+    "qdrant": float(os.getenv("QDRANT_TIMEOUT", "5")),
+}
+# A timed-out LLM call has already cost the whole timeout, so it is not retried by default
+DEPENDENCY_RETRIES = {
+    "llm": int(os.getenv("LLM_RETRIES", "0")),
+    "embedding": int(os.getenv("EMBEDDING_RETRIES", "2")),
+    "qdrant": int(os.getenv("QDRANT_RETRIES", "2")),
+}
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = int(os.getenv("BREAKER_RESET_SECONDS", "60"))
+BREAKER_BACKOFF_BASE = float(os.getenv("BREAKER_BACKOFF_BASE", "0.5"))
+BREAKER_BACKOFF_MAX = float(os.getenv("BREAKER_BACKOFF_MAX", "8"))
+REANALYSIS_BATCH_SIZE = int(os.getenv("REANALYSIS_BATCH_SIZE", "50"))
+REANALYSIS_MAX_ATTEMPTS = int(os.getenv("REANALYSIS_MAX_ATTEMPTS", "3"))
+REANALYSIS_PROBE_SIZE = int(os.getenv("REANALYSIS_PROBE_SIZE", "1"))
+
+# Knowledge base search: merge Qdrant task matches into full-text results
+SEARCH_SEMANTIC_ENABLED = os.getenv("SEARCH_SEMANTIC_ENABLED", "1") == "1"
+
+# Dashboard charts: "image" (server-rendered PNG) or "json" (drawn in the browser,
+# the web process never imports matplotlib)
+DASHBOARD_CHART_MODE = os.getenv("DASHBOARD_CHART_MODE", "image")
+
+# Live dashboard: workers publish events to this Redis pub/sub channel and the
+# ASGI app streams them as server-sent events. Disabled when the URL is empty.
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", "")
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "smartarg:events")
+EVENTS_PATH = "/events/"
+# Where the dashboard subscribes. When the pages are served by WSGI and the
+# stream by a separate ASGI server, set the stream's full URL here and the
+# page's origin in EVENTS_ALLOW_ORIGIN on the ASGI side.
+EVENTS_URL = os.getenv("EVENTS_URL", EVENTS_PATH)
+EVENTS_ALLOW_ORIGIN = os.getenv("EVENTS_ALLOW_ORIGIN", "")
+
+# Prometheus metrics: served by the web app at /metrics and by every Celery
+# worker on METRICS_WORKER_PORT (0 disables the worker exporter). Set
+# PROMETHEUS_MULTIPROC_DIR for prefork workers and multi-process web servers.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_WORKER_PORT = int(os.getenv("METRICS_WORKER_PORT", "9808"))
+METRICS_QUEUES = [queue.strip() for queue in os.getenv("METRICS_QUEUES", "celery,analysis.urgent,analysis.live,analysis.bulk").split(",") if queue.strip()]
+
+# End-to-end tracing of Telegram updates: "jsonl" appends spans to
+# TRACING_FILE, "otlp" posts them to a local OTLP/HTTP collector, "" disables.
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE = Path(os.getenv("TRACING_FILE", BASE_DIR / "traces.jsonl"))
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "smartarg")
+
+# Ledger of LLM and embedding calls (analysis.ledger, LLMCall in the admin):
+# model, prompt version, tokens, latency and outcome of every call
+LLM_LEDGER_ENABLED = os.getenv("LLM_LEDGER_ENABLED", "1") == "1"
+LLM_LEDGER_RETENTION_DAYS = int(os.getenv("LLM_LEDGER_RETENTION_DAYS", "90"))
+
+# Tombstones of deleted rows for JSON API sync clients; a client that has not
+# synced for longer must do a full resync
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# On-demand profiling of process_content_task and web requests (analysis.profiling):
+# a PROFILING_SAMPLE_RATE fraction of calls of PROFILING_TARGET ("all", "tasks",
+# "views") is profiled into PROFILING_DIR as "pstats" or "collapsed" stacks.
+# An active ProfilingSwitch in the admin overrides these values.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_TARGET = os.getenv("PROFILING_TARGET", "all")
+PROFILING_FORMAT = os.getenv("PROFILING_FORMAT", "pstats")
+PROFILING_DIR = Path(os.getenv("PROFILING_DIR", BASE_DIR / "profiles"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILING_REFRESH_SECONDS = float(os.getenv("PROFILING_REFRESH_SECONDS", "30"))
+
+# Web schedule ingestion: comma-separated page URLs, fetched concurrently with
+# at most WEB_FETCH_CONCURRENCY requests in flight and one request per host
+# every WEB_FETCH_HOST_INTERVAL seconds
+WEB_SCHEDULE_URLS = [url.strip() for url in os.getenv("WEB_SCHEDULE_URLS", "").split(",") if url.strip()]
+WEB_FETCH_CONCURRENCY = int(os.getenv("WEB_FETCH_CONCURRENCY", "8"))
+WEB_FETCH_HOST_INTERVAL = float(os.getenv("WEB_FETCH_HOST_INTERVAL", "1.0"))
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "15"))
+WEB_SECTION_MAX_CHARS = int(os.getenv("WEB_SECTION_MAX_CHARS", "3000"))
+
+# Bulk ingestion: items per queued batch task, and the broker queue length
+# (in messages) above which producers pause. A batch holds its worker for the
+# whole run (one LLM call per item), so batches stay small
+INGESTION_BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", "5"))
+INGESTION_MAX_QUEUE_DEPTH = int(os.getenv("INGESTION_MAX_QUEUE_DEPTH", "100"))
+INGESTION_BACKPRESSURE_POLL = float(os.getenv("INGESTION_BACKPRESSURE_POLL", "2.0"))
+
+# Scheduled sources: the dispatcher lock lease (a tick takes seconds; kept well
+# under the 60 s beat interval so a dead dispatcher never blocks the next
+# tick), and the lease of a running source's concurrency slot (frees the slot
+# if a worker dies mid-run)
+INGESTION_DISPATCH_LOCK_TIMEOUT = int(os.getenv("INGESTION_DISPATCH_LOCK_TIMEOUT", "30"))
+INGESTION_SOURCE_LEASE = int(os.getenv("INGESTION_SOURCE_LEASE", str(30 * 60)))
+
+# Document (PDF/DOCX) ingestion. Files posted in chats are downloaded to
+# DOCUMENT_STORAGE_DIR, which must be shared by the workers; PDF pages are
+# extracted DOCUMENT_PAGES_PER_TASK at a time.
+DOCUMENT_STORAGE_DIR = Path(os.getenv("DOCUMENT_STORAGE_DIR", BASE_DIR / "media" / "documents"))
+DOCUMENT_MAX_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", str(20 * 1024 * 1024)))
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", str(min(4, os.cpu_count() or 1))))
+DOCUMENT_PAGES_PER_TASK = int(os.getenv("DOCUMENT_PAGES_PER_TASK", "20"))
+DOCUMENT_SECTION_MAX_CHARS = int(os.getenv("DOCUMENT_SECTION_MAX_CHARS", "3000"))
+
 # Telegram Bot Config
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "telegram_analyzer.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import StaticFilesHandler  # noqa: E402
+
+if settings.DEBUG:
+    application = StaticFilesHandler(application)
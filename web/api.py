@@ -0,0 +1,166 @@
+"""
+Read-only JSON API (v1) for internal tools.
+
+Rows are serialized straight from .values() querysets and paged with a
+keyset cursor over (sync field, id) in ascending order, so a client can
+sync incrementally with ?updated_since= and resume with ?cursor=. Deleted
+rows are listed by the "deletions" resource (?resource=tasks&updated_since=).
+"""
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, Greatest
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+
+from analysis.models import AnalysisResult, CourseTask, DeletedRecord, KnowledgeEntry
+from core.models import Chat
+from .pagination import decode_cursor, encode_cursor
+
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+
+RESOURCES = {
+    "tasks": {
+        "queryset": lambda: CourseTask.objects.all(),
+        "fields": [
+            "id", "title", "description", "task_type", "status", "chat_id",
+            "vector_id", "created_at", "updated_at",
+        ],
+        "sync_field": "updated_at",
+        "filters": {"status": "status", "chat": "chat_id", "type": "task_type"},
+    },
+    "entries": {
+        "queryset": lambda: KnowledgeEntry.objects.all(),
+        "fields": [
+            "id", "entry_type", "content", "metadata", "course_task_id",
+            "source_message_id", "created_at",
+        ],
+        "sync_field": "created_at",
+        "filters": {"task": "course_task_id", "type": "entry_type"},
+    },
+    "deadlines": {
+        "queryset": lambda: KnowledgeEntry.objects.filter(entry_type="deadline"),
+        "fields": ["id", "content", "metadata", "course_task_id", "source_message_id", "created_at"],
+        "sync_field": "created_at",
+        "filters": {"task": "course_task_id"},
+    },
+    "analysis": {
+        "queryset": lambda: AnalysisResult.objects.all(),
+        "fields": [
+            "id", "message_id", "category", "importance_score", "summary",
+            "extracted_links", "extracted_deadlines", "degraded", "created_at", "updated_at",
+        ],
+        "sync_field": "updated_at",
+        "filters": {"category": "category"},
+    },
+    "chats": {
+        # A chat changes with its own fields or with its message count
+        "queryset": lambda: Chat.objects.annotate(
+            message_count=F("stats__message_count"),
+            synced_at=Greatest("updated_at", Coalesce("stats__updated_at", "updated_at")),
+        ),
+        "fields": [
+            "id", "tg_chat_id", "title", "chat_type", "pinned_teacher_id",
+            "created_at", "updated_at", "synced_at", "message_count",
+        ],
+        "sync_field": "synced_at",
+        "filters": {"type": "chat_type"},
+    },
+    "deletions": {
+        "queryset": lambda: DeletedRecord.objects.all(),
+        "fields": ["id", "resource", "object_id", "deleted_at"],
+        "sync_field": "deleted_at",
+        "filters": {"resource": "resource"},
+    },
+}
+
+
+def _error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+@require_GET
+def api_index(request):
+    return JsonResponse({
+        "version": 1,
+        "resources": {name: resource["fields"] for name, resource in RESOURCES.items()},
+    })
+
+
+@require_GET
+def api_list(request, resource):
+    config = RESOURCES.get(resource)
+    if config is None:
+        raise Http404("Unknown resource")
+    sync_field = config["sync_field"]
+
+    fields = config["fields"]
+    if request.GET.get("fields"):
+        fields = [field.strip() for field in request.GET["fields"].split(",") if field.strip()]
+        unknown = sorted(set(fields) - set(config["fields"]))
+        if unknown:
+            return _error(f"Unknown fields: {', '.join(unknown)}")
+
+    try:
+        limit = min(API_MAX_LIMIT, max(1, int(request.GET.get("limit", API_DEFAULT_LIMIT))))
+    except ValueError:
+        return _error("limit must be an integer")
+
+    queryset = config["queryset"]()
+    try:
+        for param, lookup in config["filters"].items():
+            if request.GET.get(param):
+                queryset = queryset.filter(**{lookup: request.GET[param]})
+    except (ValueError, ValidationError):
+        return _error("Invalid filter value")
+
+    if request.GET.get("updated_since"):
+        since = parse_datetime(request.GET["updated_since"])
+        if since is None:
+            return _error("updated_since must be an ISO 8601 datetime")
+        queryset = queryset.filter(**{f"{sync_field}__gte": since})
+
+    cursor = decode_cursor(request.GET.get("cursor"))
+    if cursor:
+        try:
+            after, after_id = parse_datetime(str(cursor[0])), int(cursor[1])
+        except (IndexError, TypeError, ValueError):
+            after = None
+        if after is None:
+            return _error("Invalid cursor")
+        queryset = queryset.filter(
+            Q(**{f"{sync_field}__gt": after}) | Q(**{sync_field: after, "id__gt": after_id})
+        )
+
+    # The sort key is always fetched for the cursor, then dropped if not requested
+    selected = list(dict.fromkeys([*fields, sync_field, "id"]))
+    rows = list(queryset.order_by(sync_field, "id").values(*selected)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][sync_field].isoformat(), rows[-1]["id"]])
+
+    results = [{field: row[field] for field in fields} for row in rows]
+    body = json.dumps(
+        {"results": results, "next_cursor": next_cursor},
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+    )
+    etag = quote_etag(hashlib.sha1(body.encode("utf-8")).hexdigest())
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,62 @@
+"""
+Dashboard chart data. Rendering lives in web.utils and is imported lazily so
+the web process only loads matplotlib when a PNG has to be drawn.
+"""
+import hashlib
+import json
+import threading
+from typing import Dict, List
+
+from analysis import stats
+
+# Bump when the rendering code changes so cached PNGs are redrawn
+CHART_RENDER_VERSION = 1
+CHART_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+# pyplot keeps global state, so threaded servers draw one chart at a time
+_render_lock = threading.Lock()
+
+
+def category_chart_data() -> Dict[str, List]:
+    category_counts = stats.category_counts()
+    return {
+        "labels": [item["category"] for item in category_counts],
+        "values": [item["count"] for item in category_counts],
+    }
+
+
+def chat_activity_chart_data() -> Dict[str, List]:
+    chat_counts = stats.top_chats(10)
+    return {
+        "labels": [
+            item["chat__title"] or f"Чат {item['chat__tg_chat_id']}" for item in chat_counts
+        ],
+        "values": [item["message_count"] for item in chat_counts],
+    }
+
+
+CHARTS = {
+    "categories": {
+        "data": category_chart_data,
+        "kind": "pie",
+        "title": "Распределение категорий сообщений",
+    },
+    "chats": {
+        "data": chat_activity_chart_data,
+        "kind": "bar",
+        "title": "Активность по чатам",
+    },
+}
+
+
+def chart_etag(name: str, data: Dict[str, List]) -> str:
+    raw = json.dumps([name, CHART_RENDER_VERSION, data], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def render_chart_png(name: str, data: Dict[str, List]) -> bytes:
+    from .utils import generate_bar_chart, generate_pie_chart
+
+    chart = CHARTS[name]
+    render = generate_pie_chart if chart["kind"] == "pie" else generate_bar_chart
+    with _render_lock:
+        return render(data["labels"], data["values"], chart["title"])
@@ -0,0 +1,47 @@
+"""
+Cached HTML fragments for list pages.
+
+Each namespace has a version number in the cache; saving a related model
+bumps it (see web.signals), which orphans every fragment of that namespace
+at once without having to know which filter combinations were cached.
+"""
+import hashlib
+import json
+from typing import Callable
+
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from analysis import metrics
+
+FRAGMENT_TIMEOUT = 60 * 60
+
+
+def _version_key(namespace: str) -> str:
+    return f"fragment-version:{namespace}"
+
+
+def fragment_version(namespace: str) -> int:
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), 1, timeout=None)
+        version = cache.get(_version_key(namespace), 1)
+    return version
+
+
+def bump_fragment_version(namespace: str) -> None:
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.add(_version_key(namespace), 1, timeout=None)
+
+
+def cached_fragment(namespace: str, params: dict, render: Callable[[], str]) -> str:
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    key = f"fragment:{namespace}:{fragment_version(namespace)}:{digest}"
+    html = cache.get(key)
+    metrics.cache_lookup("fragment", html is not None)
+    if html is None:
+        html = render()
+        cache.set(key, str(html), FRAGMENT_TIMEOUT)
+    return mark_safe(html)
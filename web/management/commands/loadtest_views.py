@@ -0,0 +1,113 @@
+import math
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ["/", "/chats/", "/knowledge-base/"]
+
+SERVERS = {
+    "wsgi": [sys.executable, "-m", "gunicorn", "telegram_analyzer.wsgi:application", "--bind", "127.0.0.1:{port}",
+             "--workers", "{workers}"],
+    "asgi": [sys.executable, "-m", "uvicorn", "telegram_analyzer.asgi:application", "--host", "127.0.0.1",
+             "--port", "{port}", "--workers", "{workers}", "--lifespan", "off"],
+}
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    Nearest-rank percentile; values must be sorted.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(share * len(values)) - 1))
+    return values[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.3)
+    raise CommandError(f"Server at {url} did not start within {timeout:.0f}s")
+
+
+class Command(BaseCommand):
+    help = "Measure p95 latency of the dashboard and list views under concurrent users (WSGI vs ASGI)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", help="Test an already running server instead of starting both.")
+        parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+        parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous users.")
+        parser.add_argument("--requests", type=int, default=400, help="Requests per server.")
+        parser.add_argument("--workers", type=int, default=2, help="Worker processes per started server.")
+
+    def handle(self, *args, **options):
+        if options["base_url"]:
+            self._report(options["base_url"], *self._run(options["base_url"], options))
+            return
+
+        for name, command in SERVERS.items():
+            port = _free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            process = subprocess.Popen(
+                [part.format(port=port, workers=options["workers"]) for part in command],
+                cwd=settings.BASE_DIR,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                _wait_until_ready(base_url + options["paths"][0])
+                self._report(name, *self._run(base_url, options))
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+
+    def _run(self, base_url: str, options) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+        paths = options["paths"]
+        latencies: Dict[str, List[float]] = {path: [] for path in paths}
+        errors: Dict[str, int] = {path: 0 for path in paths}
+
+        def hit(index: int) -> None:
+            path = paths[index % len(paths)]
+            started = time.perf_counter()
+            try:
+                urllib.request.urlopen(base_url + path, timeout=30).read()
+            except (urllib.error.URLError, OSError):
+                errors[path] += 1
+                return
+            latencies[path].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            list(pool.map(hit, range(options["requests"])))
+        return latencies, errors, time.perf_counter() - started
+
+    def _report(self, label: str, latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> None:
+        done = sum(len(values) for values in latencies.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{label}: {done} requests in {elapsed:.1f}s ({done / elapsed:.1f} req/s)"
+        ))
+        for path, values in latencies.items():
+            values.sort()
+            self.stdout.write(
+                f"  {path:<20} p50 {percentile(values, 0.5):7.1f} ms  "
+                f"p95 {percentile(values, 0.95):7.1f} ms  max {percentile(values, 1.0):7.1f} ms  "
+                f"errors {errors[path]}"
+            )
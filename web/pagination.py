@@ -0,0 +1,26 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode the sort key of the last row on a page into an opaque URL-safe token.
+    """
+    raw = json.dumps(values, separators=(",", ":"), ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[List[Any]]:
+    """
+    Decode a token produced by encode_cursor. Malformed tokens yield None
+    (first page) instead of an error.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return values if isinstance(values, list) else None
@@ -0,0 +1,210 @@
+import logging
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+
+from analysis.models import CourseTask, KnowledgeEntry
+from core.models import Message
+
+logger = logging.getLogger(__name__)
+
+# Candidates taken from every source before fusion; results end after them
+SEARCH_CANDIDATES = 100
+SEARCH_PAGE_SIZE = 20
+# How long the fused ranking of a query is kept for its next pages
+SEARCH_SNAPSHOT_SECONDS = 10 * 60
+# Reciprocal rank fusion constant (Cormack et al.), dampens the weight of top ranks
+RRF_K = 60
+SEMANTIC_THRESHOLD = 0.5
+
+FTS_TABLES = {
+    "message": "core_message",
+    "entry": "analysis_knowledgeentry",
+    "task": "analysis_coursetask",
+}
+
+ResultKey = Tuple[str, int]
+
+
+def _fts_ids(kind: str, query: str, limit: int) -> List[int]:
+    """
+    Ranked ids from the generated search_vector column (Postgres only).
+    """
+    table = FTS_TABLES[kind]
+    sql = (
+        f"SELECT id FROM {table}, websearch_to_tsquery('russian', %s) AS query "
+        f"WHERE search_vector @@ query "
+        f"ORDER BY ts_rank(search_vector, query) DESC, id DESC LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _contains_ids(kind: str, query: str, limit: int) -> List[int]:
+    """
+    SQLite fallback: every term must appear in one of the searched fields.
+    SQLite only case-folds ASCII, so Cyrillic terms are tried in common casings.
+    """
+    terms = query.split()
+    if kind == "message":
+        queryset, fields = Message.objects.all(), ["text"]
+    elif kind == "entry":
+        queryset, fields = KnowledgeEntry.objects.all(), ["content"]
+    else:
+        queryset, fields = CourseTask.objects.all(), ["title", "description"]
+
+    for term in terms:
+        condition = Q()
+        for variant in {term, term.lower(), term.capitalize(), term.upper()}:
+            for field in fields:
+                condition |= Q(**{f"{field}__icontains": variant})
+        queryset = queryset.filter(condition)
+    return list(queryset.order_by("-id").values_list("id", flat=True)[:limit])
+
+
+def full_text_ids(kind: str, query: str, limit: int = SEARCH_CANDIDATES) -> List[int]:
+    if connection.vendor == "postgresql":
+        return _fts_ids(kind, query, limit)
+    return _contains_ids(kind, query, limit)
+
+
+def semantic_task_ids(query: str, limit: int = SEARCH_CANDIDATES) -> List[int]:
+    from analysis.vector_db import VectorDBService
+
+    try:
+        hits = VectorDBService().search_tasks(query, threshold=SEMANTIC_THRESHOLD, limit=limit)
+    except Exception as e:
+        logger.warning(f"Semantic search unavailable: {e}")
+        return []
+    vector_ids = [str(hit["id"]) for hit in hits]
+    by_vector = dict(
+        CourseTask.objects.filter(vector_id__in=vector_ids).values_list("vector_id", "id")
+    )
+    return [by_vector[vector_id] for vector_id in vector_ids if vector_id in by_vector]
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[ResultKey]], k: int = RRF_K) -> Dict[ResultKey, float]:
+    scores: Dict[ResultKey, float] = {}
+    for ranked in ranked_lists:
+        for rank, key in enumerate(ranked, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def fused_ranking(query: str, semantic: bool = True) -> List[Tuple[ResultKey, float]]:
+    """
+    Fuses the top SEARCH_CANDIDATES of every source, ordered by (-score, kind, id).
+    """
+    ranked_lists = [
+        [(kind, item_id) for item_id in full_text_ids(kind, query)]
+        for kind in FTS_TABLES
+    ]
+    if semantic:
+        ranked_lists.append([("task", item_id) for item_id in semantic_task_ids(query)])
+
+    scores = reciprocal_rank_fusion(ranked_lists)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0][0], item[0][1]))
+
+
+def _snapshot(cursor: Optional[list], query: str, semantic: bool) -> Optional[List[Tuple[ResultKey, float]]]:
+    if not cursor or len(cursor) < 4:
+        return None
+    stored = cache.get(f"search:{cursor[3]}")
+    if not stored or stored["query"] != [query, semantic]:
+        return None
+    return [((kind, item_id), score) for kind, item_id, score in stored["ranking"]]
+
+
+def search(query: str, cursor: Optional[list] = None, page_size: int = SEARCH_PAGE_SIZE,
+           semantic: bool = True) -> Tuple[List[Dict], Optional[list]]:
+    """
+    Searches messages, knowledge entries and tasks, fuses the rankings and
+    returns one page of results plus the sort key to continue after.
+
+    The ranking is fused once, on the first page, and the next pages read it
+    from the cache, so rows written meanwhile cannot shift scores and make the
+    cursor repeat or skip results. A query returns at most SEARCH_CANDIDATES
+    results per source. Once the snapshot expires the ranking is fused again.
+    """
+    query = " ".join((query or "").split())
+    if not query:
+        return [], None
+
+    ordered = _snapshot(cursor, query, semantic)
+    if ordered is not None:
+        token = cursor[3]
+    else:
+        ordered = fused_ranking(query, semantic)
+        token = uuid.uuid4().hex
+        cache.set(
+            f"search:{token}",
+            {"query": [query, semantic], "ranking": [(kind, item_id, score) for (kind, item_id), score in ordered]},
+            SEARCH_SNAPSHOT_SECONDS,
+        )
+
+    # Keyset over the fused order: (-score, kind, id) is unique and stable
+    if cursor:
+        try:
+            after = (-float(cursor[0]), str(cursor[1]), int(cursor[2]))
+        except (IndexError, TypeError, ValueError):
+            after = None
+        if after:
+            ordered = [item for item in ordered if (-item[1], item[0][0], item[0][1]) > after]
+
+    page = ordered[:page_size]
+    next_cursor = None
+    if len(ordered) > page_size:
+        (kind, item_id), score = page[-1]
+        next_cursor = [score, kind, item_id, token]
+
+    return _hydrate(page), next_cursor
+
+
+def _hydrate(page: List[Tuple[ResultKey, float]]) -> List[Dict]:
+    ids_by_kind: Dict[str, List[int]] = {kind: [] for kind in FTS_TABLES}
+    for (kind, item_id), _ in page:
+        ids_by_kind[kind].append(item_id)
+
+    messages = Message.objects.select_related("chat").in_bulk(ids_by_kind["message"])
+    entries = KnowledgeEntry.objects.select_related("course_task").in_bulk(ids_by_kind["entry"])
+    tasks = CourseTask.objects.in_bulk(ids_by_kind["task"])
+
+    results = []
+    for (kind, item_id), score in page:
+        if kind == "message" and item_id in messages:
+            message = messages[item_id]
+            results.append({
+                "kind": kind,
+                "id": item_id,
+                "title": message.chat.title or f"Чат {message.chat.tg_chat_id}",
+                "snippet": message.text or "",
+                "url": None,
+                "score": score,
+            })
+        elif kind == "entry" and item_id in entries:
+            entry = entries[item_id]
+            task = entry.course_task
+            results.append({
+                "kind": kind,
+                "id": item_id,
+                "title": task.title if task else entry.get_entry_type_display(),
+                "snippet": entry.content,
+                "url": reverse("task_detail", args=[task.id]) if task else None,
+                "score": score,
+            })
+        elif kind == "task" and item_id in tasks:
+            task = tasks[item_id]
+            results.append({
+                "kind": kind,
+                "id": item_id,
+                "title": task.title,
+                "snippet": task.description or "",
+                "url": reverse("task_detail", args=[task.id]),
+                "score": score,
+            })
+    return results
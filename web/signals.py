@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from analysis.models import CourseTask, KnowledgeEntry
+from core.models import Chat, Message
+from .fragments import bump_fragment_version
+
+
+def _invalidate_on_commit(namespace):
+    transaction.on_commit(lambda: bump_fragment_version(namespace))
+
+
+# New entries touch CourseTask.updated_at with a queryset update, which sends
+# no signal of its own, so they invalidate the task list here as well
+@receiver(post_save, sender=CourseTask)
+@receiver(post_delete, sender=CourseTask)
+@receiver(post_save, sender=KnowledgeEntry)
+def course_task_changed(sender, **kwargs):
+    _invalidate_on_commit("tasks")
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+@receiver(post_save, sender=Chat)
+@receiver(post_delete, sender=Chat)
+def chat_list_changed(sender, **kwargs):
+    _invalidate_on_commit("chats")
@@ -0,0 +1,88 @@
+"""
+Server-sent events endpoint, served directly by the ASGI app (see
+telegram_analyzer.asgi) so a long-lived stream never holds a Django worker.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Comment lines keep proxies from closing idle streams
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 5000
+
+
+def format_event(raw) -> bytes:
+    """
+    Turns a published {"type": ..., "data": ...} message into an SSE frame.
+    """
+    event = json.loads(raw)
+    data = json.dumps(event["data"], ensure_ascii=False)
+    return f"event: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _send_chunk(send, chunk: bytes, more_body: bool = True):
+    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+def _stream_headers():
+    headers = [
+        (b"content-type", b"text/event-stream"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]
+    if settings.EVENTS_ALLOW_ORIGIN:
+        # The dashboard page is served from another origin (the WSGI server)
+        headers.append((b"access-control-allow-origin", settings.EVENTS_ALLOW_ORIGIN.encode()))
+    return headers
+
+
+async def events_app(scope, receive, send):
+    if not settings.EVENTS_REDIS_URL:
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+        })
+        await _send_chunk(send, b"Live events are disabled", more_body=False)
+        return
+
+    import redis.asyncio as aioredis
+
+    client = aioredis.from_url(settings.EVENTS_REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(settings.EVENTS_CHANNEL)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": _stream_headers(),
+        })
+        await _send_chunk(send, f"retry: {RETRY_MILLISECONDS}\n\n".encode())
+        while not disconnected.done():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=HEARTBEAT_SECONDS)
+            if message is None:
+                await _send_chunk(send, b": keep-alive\n\n")
+                continue
+            try:
+                await _send_chunk(send, format_event(message["data"]))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping malformed event: {e}")
+    except OSError as e:
+        logger.info(f"Event stream closed: {e}")
+    finally:
+        disconnected.cancel()
+        await pubsub.unsubscribe(settings.EVENTS_CHANNEL)
+        await pubsub.aclose()
+        await client.aclose()
@@ -1,13 +1,23 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
-from analysis.models import AnalysisResult, KnowledgeEntry
+from analysis.models import AnalysisResult, CourseTask, KnowledgeEntry
 from core.models import Chat, Message
+from .pagination import decode_cursor, encode_cursor
+from .search import reciprocal_rank_fusion, search
+from .management.commands.loadtest_views import percentile
+from .sse import events_app, format_event
 
 
 class WebViewsTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.chat = Chat.objects.create(
             tg_chat_id=12345,
             title="Учебный чат",
@@ -39,8 +49,37 @@ class WebViewsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("total_messages", response.context)
         self.assertEqual(response.context["total_messages"], 1)
-        self.assertTrue(response.context["pie_chart"])
-        self.assertTrue(response.context["bar_chart"])
+        self.assertContains(response, reverse("chart", args=["categories"]))
+        self.assertContains(response, reverse("chart", args=["chats"]))
+
+    def test_chart_png_supports_conditional_get(self):
+        url = reverse("chart", args=["categories"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(response.content.startswith(b"\x89PNG"))
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        result = AnalysisResult.objects.get(message=self.message)
+        result.category = "deadline"
+        with self.captureOnCommitCallbacks(execute=True):
+            result.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+
+    def test_chart_json(self):
+        response = self.client.get(reverse("chart", args=["chats"]), {"format": "json"})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload["labels"], ["Учебный чат"])
+        self.assertEqual(payload["values"], [1])
+
+    def test_unknown_chart(self):
+        response = self.client.get(reverse("chart", args=["unknown"]))
+        self.assertEqual(response.status_code, 404)
 
     def test_chat_list_view(self):
         response = self.client.get(reverse("chat_list"))
@@ -50,10 +89,357 @@ class WebViewsTests(TestCase):
         self.assertEqual(chat.message_count, 1)
 
     def test_knowledge_base_view(self):
+        task = CourseTask.objects.create(title="Курсовая", task_type="periodic", chat=self.chat)
         response = self.client.get(reverse("knowledge_base"))
         self.assertEqual(response.status_code, 200)
-        self.assertIn("entries", response.context)
-        self.assertEqual(response.context["entries"].count(), 1)
+        self.assertContains(response, reverse("task_detail", args=[task.id]))
+
+        response = self.client.get(reverse("knowledge_base"), {"type": "one_time"})
+        self.assertNotContains(response, reverse("task_detail", args=[task.id]))
+
+    def test_knowledge_base_keyset_pagination(self):
+        now = timezone.now()
+        for index in range(30):
+            task = CourseTask.objects.create(title=f"Задача {index}", chat=self.chat)
+            # Identical timestamps in pairs exercise the id tie-breaker
+            CourseTask.objects.filter(id=task.id).update(updated_at=now - timedelta(minutes=index // 2))
+
+        first = self.client.get(reverse("knowledge_base"))
+        first_ids = [task.id for task in first.context["tasks"]]
+        self.assertEqual(len(first_ids), 24)
+        cursor = first.context["next_cursor"]
+        self.assertTrue(cursor)
+
+        second = self.client.get(reverse("knowledge_base"), {"cursor": cursor})
+        second_ids = [task.id for task in second.context["tasks"]]
+        self.assertEqual(len(second_ids), 6)
+        self.assertFalse(set(first_ids) & set(second_ids))
+        self.assertIsNone(second.context["next_cursor"])
+
+    def test_list_fragments_are_cached_until_save(self):
+        self.client.get(reverse("chat_list"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("chat_list"))
+        self.assertContains(response, "Учебный чат")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Chat.objects.create(tg_chat_id=999, title="Новый чат", chat_type="group")
+        self.assertContains(self.client.get(reverse("chat_list")), "Новый чат")
+
+    def test_task_detail_groups_entries_in_one_query(self):
+        task = CourseTask.objects.create(title="Лабораторная 1", chat=self.chat)
+        for entry_type, content in [
+            ("deadline", "20.05 - сдать отчёт"),
+            ("link", "https://example.com/lab1"),
+            ("explanation", "Можно сдавать в PDF"),
+            ("generic", "Общая информация"),
+        ]:
+            KnowledgeEntry.objects.create(
+                source_message=self.message, course_task=task, entry_type=entry_type, content=content
+            )
+
+        # freshness lookup, task, entries
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("task_detail", args=[task.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["deadlines"]), 1)
+        self.assertEqual(len(response.context["links"]), 1)
+        self.assertEqual(len(response.context["explanations"]), 1)
+        self.assertContains(response, "Общая информация")
+
+    def test_task_detail_conditional_get(self):
+        task = CourseTask.objects.create(title="Лабораторная 2", chat=self.chat)
+        url = reverse("task_detail", args=[task.id])
+        response = self.client.get(url)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        previous_updated_at = task.updated_at
+        KnowledgeEntry.objects.create(
+            source_message=self.message, course_task=task, entry_type="link", content="https://example.com/new"
+        )
+        task.refresh_from_db()
+        self.assertGreater(task.updated_at, previous_updated_at)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+
+    def test_task_detail_etag_changes_when_an_older_entry_moves(self):
+        task = CourseTask.objects.create(title="Лабораторная 4", chat=self.chat)
+        other = CourseTask.objects.create(title="Лабораторная 5", chat=self.chat)
+        older = KnowledgeEntry.objects.create(
+            source_message=self.message, course_task=task, entry_type="link", content="https://example.com/old"
+        )
+        KnowledgeEntry.objects.create(
+            source_message=self.message, course_task=task, entry_type="link", content="https://example.com/new"
+        )
+        url = reverse("task_detail", args=[task.id])
+        response = self.client.get(url)
+
+        # A queryset update bypasses the signals, so only the entry count changes
+        KnowledgeEntry.objects.filter(pk=older.pk).update(course_task=other)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+
+
+class DeadlineFeedViewTests(TestCase):
+    def setUp(self):
+        self.chat = Chat.objects.create(tg_chat_id=54321, title="Календарь", chat_type="group")
+        message = Message.objects.create(chat=self.chat, tg_message_id=1, text="Экзамен", sent_at=timezone.now())
+        task = CourseTask.objects.create(title="Экзамен", chat=self.chat)
+        KnowledgeEntry.objects.create(
+            source_message=message, course_task=task, entry_type="deadline", content="2024-06-20 - экзамен",
+        )
+
+    def test_feed_supports_conditional_get(self):
+        url = reverse("deadline_feed", args=[self.chat.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertIn("DTSTART;VALUE=DATE:20240620", response.content.decode())
+
+        with self.assertNumQueries(2):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_unknown_chat_is_not_found(self):
+        from analysis.models import DeadlineFeed
+
+        response = self.client.get(reverse("deadline_feed", args=[self.chat.id + 1000]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(DeadlineFeed.objects.exists())
+
+    def test_global_feed(self):
+        response = self.client.get(reverse("deadline_feed_all"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("SUMMARY:Экзамен: экзамен", response.content.decode())
+
+
+class LiveEventsViewTests(TestCase):
+    def test_dashboard_subscribes_only_when_enabled(self):
+        self.assertNotContains(self.client.get(reverse("dashboard")), "EventSource")
+        with self.settings(EVENTS_REDIS_URL="redis://localhost:6379/2"):
+            self.assertContains(self.client.get(reverse("dashboard")), 'new EventSource("/events/")')
+        with self.settings(EVENTS_REDIS_URL="redis://localhost:6379/2", EVENTS_URL="http://localhost:8001/events/"):
+            self.assertContains(self.client.get(reverse("dashboard")), 'new EventSource("http://localhost:8001/events/")')
+
+    def test_format_event(self):
+        raw = json.dumps({"type": "task_created", "data": {"id": 1, "title": "Курсовая"}}, ensure_ascii=False)
+        self.assertEqual(
+            format_event(raw.encode("utf-8")),
+            'event: task_created\ndata: {"id": 1, "title": "Курсовая"}\n\n'.encode("utf-8"),
+        )
+
+    @override_settings(EVENTS_REDIS_URL="")
+    def test_stream_disabled_without_redis(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        asyncio.run(events_app({"type": "http", "path": "/events/"}, receive, send))
+        self.assertEqual(sent[0]["status"], 503)
+
+
+class MetricsViewTests(TestCase):
+    def test_metrics_exposition(self):
+        from analysis import metrics
+
+        metrics.cache_lookup("fragment", True)
+        with self.settings(CELERY_BROKER_URL="memory://"):
+            response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn('smartarg_queue_depth{queue="celery"} 0.0', body)
+        self.assertIn('smartarg_cache_requests_total{cache="fragment",result="hit"}', body)
+        self.assertIn("# TYPE smartarg_stage_duration_seconds histogram", body)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_metrics_can_be_disabled(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+
+class LoadTestTests(TestCase):
+    def test_percentile_nearest_rank(self):
+        values = [float(value) for value in range(1, 201)]
+        self.assertEqual(percentile(values, 0.5), 100.0)
+        self.assertEqual(percentile(values, 0.95), 190.0)
+        self.assertEqual(percentile(values, 1.0), 200.0)
+        self.assertEqual(percentile([], 0.95), 0.0)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.chat = Chat.objects.create(tg_chat_id=555, title="API чат", chat_type="group")
+        self.tasks = [
+            CourseTask.objects.create(title=f"Задача {index}", chat=self.chat) for index in range(5)
+        ]
+
+    def test_cursor_pagination_and_field_selection(self):
+        url = reverse("api_list", args=["tasks"])
+        seen = []
+        params = {"limit": 2, "fields": "id,title"}
+        while True:
+            payload = self.client.get(url, params).json()
+            seen.extend(payload["results"])
+            if not payload["next_cursor"]:
+                break
+            params["cursor"] = payload["next_cursor"]
+
+        self.assertEqual([row["id"] for row in seen], [task.id for task in self.tasks])
+        self.assertEqual(set(seen[0]), {"id", "title"})
+
+    def test_updated_since(self):
+        since = timezone.now()
+        task = self.tasks[0]
+        task.title = "Обновлённая задача"
+        task.save()
+
+        payload = self.client.get(
+            reverse("api_list", args=["tasks"]), {"updated_since": since.isoformat()}
+        ).json()
+        self.assertEqual([row["id"] for row in payload["results"]], [task.id])
+
+    def test_rewritten_analysis_results_are_synced(self):
+        message = Message.objects.create(chat=self.chat, tg_message_id=1, text="Экзамен", sent_at=timezone.now())
+        result = AnalysisResult.objects.create(message=message, category="other", degraded=True)
+        since = timezone.now()
+        AnalysisResult.objects.update_or_create(message=message, defaults={"category": "deadline", "degraded": False})
+
+        payload = self.client.get(
+            reverse("api_list", args=["analysis"]), {"updated_since": since.isoformat()}
+        ).json()
+        self.assertEqual([(row["id"], row["category"]) for row in payload["results"]], [(result.id, "deadline")])
+
+    def test_deletions_are_synced(self):
+        message = Message.objects.create(chat=self.chat, tg_message_id=1, text="Экзамен", sent_at=timezone.now())
+        entry = KnowledgeEntry.objects.create(
+            source_message=message, course_task=self.tasks[0], entry_type="deadline", content="20.05 - отчёт",
+        )
+        entry_id, task_id = entry.id, self.tasks[1].id
+        since = timezone.now()
+        entry.delete()
+        self.tasks[1].delete()
+
+        url = reverse("api_list", args=["deletions"])
+        payload = self.client.get(url, {"updated_since": since.isoformat()}).json()
+        self.assertEqual(
+            sorted((row["resource"], row["object_id"]) for row in payload["results"]),
+            sorted([("entries", entry_id), ("deadlines", entry_id), ("tasks", task_id)]),
+        )
+        payload = self.client.get(url, {"resource": "tasks", "updated_since": since.isoformat()}).json()
+        self.assertEqual([row["object_id"] for row in payload["results"]], [task_id])
+
+    def test_chat_changes_are_synced(self):
+        other = Chat.objects.create(tg_chat_id=556, title="Другой чат", chat_type="group")
+        url = reverse("api_list", args=["chats"])
+
+        since = timezone.now()
+        self.chat.title = "Новое название"
+        self.chat.save()
+        payload = self.client.get(url, {"updated_since": since.isoformat()}).json()
+        self.assertEqual([row["title"] for row in payload["results"]], ["Новое название"])
+
+        since = timezone.now()
+        Message.objects.create(chat=other, tg_message_id=1, text="Привет", sent_at=timezone.now())
+        payload = self.client.get(url, {"updated_since": since.isoformat()}).json()
+        self.assertEqual([(row["id"], row["message_count"]) for row in payload["results"]], [(other.id, 1)])
+
+    def test_conditional_get(self):
+        url = reverse("api_list", args=["chats"])
+        response = self.client.get(url)
+        self.assertEqual(response.json()["results"][0]["message_count"], 0)
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_invalid_requests(self):
+        url = reverse("api_list", args=["tasks"])
+        self.assertEqual(self.client.get(url, {"fields": "id,secret"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"updated_since": "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"chat": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_list", args=["users"])).status_code, 404)
+
+
+@override_settings(SEARCH_SEMANTIC_ENABLED=False)
+class SearchTests(TestCase):
+    def setUp(self):
+        self.chat = Chat.objects.create(tg_chat_id=777, title="Поток", chat_type="group")
+        self.message = Message.objects.create(
+            chat=self.chat,
+            tg_message_id=1,
+            sender_role="teacher",
+            text="Лабораторная работа 3 сдаётся в пятницу",
+            sent_at=timezone.now(),
+        )
+        self.task = CourseTask.objects.create(
+            title="Лабораторная работа 3",
+            description="Отчёт по пятой главе",
+            chat=self.chat,
+        )
+        KnowledgeEntry.objects.create(
+            source_message=self.message,
+            course_task=self.task,
+            entry_type="deadline",
+            content="Пятница - сдать лабораторную",
+        )
+
+    def test_search_page_finds_every_kind(self):
+        response = self.client.get(reverse("search"), {"q": "лабораторн"})
+        self.assertEqual(response.status_code, 200)
+        kinds = {result["kind"] for result in response.context["results"]}
+        self.assertEqual(kinds, {"message", "entry", "task"})
+
+    def test_search_keyset_pagination(self):
+        seen = []
+        cursor = None
+        for _ in range(5):
+            results, cursor = search("лабораторн", cursor=cursor, page_size=1, semantic=False)
+            seen.extend((item["kind"], item["id"]) for item in results)
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(len(set(seen)), 3)
+
+    def test_pages_keep_the_first_page_ranking(self):
+        first, cursor = search("лабораторн", page_size=1, semantic=False)
+        # A new match would take the top rank if the next page fused again
+        Message.objects.create(
+            chat=self.chat, tg_message_id=2, text="Лабораторная работа 4", sent_at=timezone.now(),
+        )
+        seen = [(item["kind"], item["id"]) for item in first]
+        while cursor:
+            results, cursor = search("лабораторн", cursor=cursor, page_size=1, semantic=False)
+            seen.extend((item["kind"], item["id"]) for item in results)
+
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(len(set(seen)), 3)
+        self.assertEqual(len(search("лабораторн", semantic=False)[0]), 4)
+
+    def test_search_api_returns_cursor(self):
+        payload = self.client.get(reverse("search_api"), {"q": "лабораторн"}).json()
+        self.assertEqual(len(payload["results"]), 3)
+        self.assertIsNone(payload["next_cursor"])
+
+    def test_empty_query_returns_nothing(self):
+        payload = self.client.get(reverse("search_api"), {"q": "  "}).json()
+        self.assertEqual(payload["results"], [])
+        self.assertIsNone(payload["next_cursor"])
+
+    def test_reciprocal_rank_fusion_rewards_agreement(self):
+        scores = reciprocal_rank_fusion([
+            [("task", 1), ("task", 2)],
+            [("task", 2), ("task", 3)],
+        ])
+        self.assertEqual(max(scores, key=scores.get), ("task", 2))
 
-        response = self.client.get(reverse("knowledge_base"), {"entry_type": "link"})
-        self.assertEqual(response.context["entries"].count(), 1)
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor([0.5, "task", 3])), [0.5, "task", 3])
+        self.assertIsNone(decode_cursor("not-a-cursor!"))
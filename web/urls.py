@@ -1,11 +1,19 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 
 urlpatterns = [
     path("", views.dashboard, name="dashboard"),
+    path("charts/<slug:name>/", views.chart, name="chart"),
     path("chats/", views.chat_list, name="chat_list"),
     path("knowledge-base/", views.knowledge_base, name="knowledge_base"),
     path("knowledge-base/task/<int:task_id>/", views.task_detail, name="task_detail"),
+    path("calendar/all.ics", views.deadline_feed, name="deadline_feed_all"),
+    path("calendar/<int:chat_id>.ics", views.deadline_feed, name="deadline_feed"),
+    path("search/", views.search, name="search"),
+    path("search.json", views.search_api, name="search_api"),
+    path("api/v1/", api.api_index, name="api_index"),
+    path("api/v1/<slug:resource>/", api.api_list, name="api_list"),
+    path("metrics", views.metrics, name="metrics"),
 ]
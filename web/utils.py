@@ -1,4 +1,3 @@
-import base64
 from io import BytesIO
 from typing import List
 
@@ -8,39 +7,37 @@ matplotlib.use("Agg")
 from matplotlib import pyplot as plt
 
 
-def _figure_to_base64(fig) -> str:
+def _figure_to_png(fig) -> bytes:
     buffer = BytesIO()
     fig.savefig(buffer, format="png", bbox_inches="tight", dpi=150)
-    buffer.seek(0)
-    encoded = base64.b64encode(buffer.read()).decode("ascii")
     plt.close(fig)
-    return encoded
+    return buffer.getvalue()
 
 
-def generate_pie_chart(labels: List[str], values: List[int], title: str) -> str:
+def generate_pie_chart(labels: List[str], values: List[int], title: str) -> bytes:
     fig, ax = plt.subplots(figsize=(5, 4))
     if not labels or not values:
         ax.text(0.5, 0.5, "Нет данных", ha="center", va="center")
         ax.axis("off")
         ax.set_title(title)
-        return _figure_to_base64(fig)
+        return _figure_to_png(fig)
 
     ax.pie(values, labels=labels, autopct="%1.0f%%", startangle=140)
     ax.axis("equal")
     ax.set_title(title)
-    return _figure_to_base64(fig)
+    return _figure_to_png(fig)
 
 
-def generate_bar_chart(labels: List[str], values: List[int], title: str) -> str:
+def generate_bar_chart(labels: List[str], values: List[int], title: str) -> bytes:
     fig, ax = plt.subplots(figsize=(6, 4))
     if not labels or not values:
         ax.text(0.5, 0.5, "Нет данных", ha="center", va="center")
         ax.axis("off")
         ax.set_title(title)
-        return _figure_to_base64(fig)
+        return _figure_to_png(fig)
 
     ax.bar(labels, values, color="#0ea5a1")
     ax.set_title(title)
     ax.set_ylabel("Сообщения")
     ax.tick_params(axis="x", rotation=30)
-    return _figure_to_base64(fig)
+    return _figure_to_png(fig)
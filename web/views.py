@@ -1,86 +1,207 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Avg, Count, Q
+from django.template.loader import render_to_string
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+from prometheus_client import CONTENT_TYPE_LATEST
 
-from analysis.models import AnalysisResult, KnowledgeEntry, CourseTask
-from core.models import Chat, Message
-from .utils import generate_bar_chart, generate_pie_chart
+from analysis import calendar, events, metrics as analysis_metrics, stats
+from analysis.models import AnalysisResult, ChatStats, CourseTask
+from core.models import Chat
+from .charts import CHART_CACHE_TIMEOUT, CHARTS, chart_etag, render_chart_png
+from .fragments import cached_fragment
+from .pagination import decode_cursor, encode_cursor
+from .search import search as run_search
 
-def dashboard(request):
-    total_messages = Message.objects.count()
-    total_knowledge = KnowledgeEntry.objects.count()
-    avg_importance = (
-        AnalysisResult.objects.aggregate(avg=Avg("importance_score")).get("avg") or 0
-    )
-
-    recent_alerts = (
+def _recent_alerts():
+    return list(
         AnalysisResult.objects.select_related("message", "message__chat")
-        .filter(Q(importance_score__gte=6) | Q(category__in=["deadline", "announcement"]))
+        .filter(
+            Q(importance_score__gte=events.ALERT_IMPORTANCE) | Q(category__in=events.ALERT_CATEGORIES)
+        )
         .order_by("-message__sent_at")[:6]
     )
 
-    category_counts = (
-        AnalysisResult.objects.values("category")
-        .annotate(total=Count("id"))
-        .order_by()
-    )
-    category_labels = [item["category"] for item in category_counts]
-    category_values = [item["total"] for item in category_counts]
-
-    chat_counts = (
-        Message.objects.values("chat__title", "chat__tg_chat_id")
-        .annotate(total=Count("id"))
-        .order_by("-total")[:10]
-    )
-    chat_labels = [
-        item["chat__title"] or f"Чат {item['chat__tg_chat_id']}" for item in chat_counts
-    ]
-    chat_values = [item["total"] for item in chat_counts]
 
-    pie_chart = generate_pie_chart(
-        category_labels, category_values, "Распределение категорий сообщений"
-    )
-    bar_chart = generate_bar_chart(
-        chat_labels, chat_values, "Активность по чатам"
-    )
+def dashboard(request):
+    # Counters come from the materialized stats tables (a few rows) instead
+    # of full scans over messages and analysis results.
+    totals = stats.dashboard_totals()
+    recent_alerts = _recent_alerts()
 
     context = {
-        "total_messages": total_messages,
-        "total_knowledge": total_knowledge,
-        "avg_importance": round(avg_importance, 2),
+        "total_messages": totals["total_messages"],
+        "total_knowledge": totals["total_knowledge"],
+        "avg_importance": round(totals["avg_importance"], 2),
         "recent_alerts": recent_alerts,
-        "pie_chart": pie_chart,
-        "bar_chart": bar_chart,
+        "chart_mode": settings.DASHBOARD_CHART_MODE,
+        # The page patches counters and alerts from the SSE stream instead of reloading
+        "events_url": settings.EVENTS_URL if settings.EVENTS_REDIS_URL else None,
     }
     return render(request, "dashboard.html", context)
 
 
+def chart(request, name):
+    """
+    Serves a dashboard chart as PNG (or as JSON data with ?format=json).
+    The ETag is derived from the aggregate data, so images are redrawn only
+    when the data changes and unchanged charts are answered with 304.
+    """
+    if name not in CHARTS:
+        raise Http404("Unknown chart")
+
+    data = CHARTS[name]["data"]()
+    etag = chart_etag(name, data)
+    as_json = request.GET.get("format") == "json"
+    if as_json:
+        etag = f"{etag}-json"
+
+    not_modified = get_conditional_response(request, etag=quote_etag(etag))
+    if not_modified is not None:
+        return not_modified
+
+    if as_json:
+        response = JsonResponse({"title": CHARTS[name]["title"], "kind": CHARTS[name]["kind"], **data})
+    else:
+        cache_key = f"chart:{etag}"
+        png = cache.get(cache_key)
+        analysis_metrics.cache_lookup("chart", png is not None)
+        if png is None:
+            png = render_chart_png(name, data)
+            cache.set(cache_key, png, CHART_CACHE_TIMEOUT)
+        response = HttpResponse(png, content_type="image/png")
+
+    response["ETag"] = quote_etag(etag)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def deadline_feed(request, chat_id=None):
+    """
+    Serves the stored iCalendar feed of a chat (or of all chats). The feed is
+    rebuilt only after a task change marked it dirty, so calendar clients
+    polling every few minutes mostly get the stored blob or a 304.
+    """
+    # Otherwise the rebuild would store a feed row for a chat that doesn't exist
+    if chat_id is not None and not Chat.objects.filter(id=chat_id).exists():
+        raise Http404("Unknown chat")
+    feed = calendar.get_feed(chat_id, include_global=chat_id is None)
+    etag = quote_etag(feed.etag)
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = HttpResponse(feed.content, content_type="text/calendar; charset=utf-8")
+    response["ETag"] = etag
+    response["Content-Disposition"] = f'inline; filename="{feed.scope.replace(":", "-")}.ics"'
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+LIST_PAGE_SIZE = 24
+
+
+def _chat_cursor(cursor):
+    try:
+        return int(cursor[0]), int(cursor[1])
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def _task_cursor(cursor):
+    try:
+        updated_at, task_id = parse_datetime(str(cursor[0])), int(cursor[1])
+    except (IndexError, TypeError, ValueError):
+        return None
+    return (updated_at, task_id) if updated_at else None
+
+
 def chat_list(request):
-    chats = (
-        Chat.objects.annotate(message_count=Count("messages"))
-        .order_by("-message_count", "title")
-    )
-    context = {"chats": chats}
+    cursor = decode_cursor(request.GET.get("cursor"))
+
+    def render_fragment():
+        # Ordered by the materialized message count; no COUNT over messages
+        rows = ChatStats.objects.select_related("chat").order_by("-message_count", "chat_id")
+        after = _chat_cursor(cursor)
+        if after:
+            count, chat_id = after
+            rows = rows.filter(
+                Q(message_count__lt=count) | Q(message_count=count, chat_id__gt=chat_id)
+            )
+        rows = list(rows[:LIST_PAGE_SIZE + 1])
+
+        next_cursor = None
+        if len(rows) > LIST_PAGE_SIZE:
+            rows = rows[:LIST_PAGE_SIZE]
+            next_cursor = encode_cursor([rows[-1].message_count, rows[-1].chat_id])
+
+        chats = []
+        for row in rows:
+            row.chat.message_count = row.message_count
+            chats.append(row.chat)
+        return render_to_string(
+            "partials/chat_table.html",
+            {"chats": chats, "next_cursor": next_cursor},
+            request=request,
+        )
+
+    context = {
+        "chat_table": cached_fragment("chats", {"cursor": cursor}, render_fragment),
+    }
     return render(request, "chat_list.html", context)
 
 
 def knowledge_base(request):
     status = request.GET.get("status", "active")
     task_type = request.GET.get("type", "")
+    cursor = decode_cursor(request.GET.get("cursor"))
+
+    def render_fragment():
+        tasks = CourseTask.objects.order_by("-updated_at", "-id")
+
+        if status == 'active':
+            tasks = tasks.filter(status='active')
+        elif status == 'completed':
+            tasks = tasks.filter(status='completed')
+        elif status == 'cancelled':
+            tasks = tasks.filter(status='cancelled')
+
+        if task_type:
+            tasks = tasks.filter(task_type=task_type)
+
+        after = _task_cursor(cursor)
+        if after:
+            updated_at, last_id = after
+            tasks = tasks.filter(
+                Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=last_id)
+            )
+
+        page = list(tasks[:LIST_PAGE_SIZE + 1])
+        next_cursor = None
+        if len(page) > LIST_PAGE_SIZE:
+            page = page[:LIST_PAGE_SIZE]
+            next_cursor = encode_cursor([page[-1].updated_at.isoformat(), page[-1].id])
 
-    tasks = CourseTask.objects.order_by("-updated_at")
-    
-    if status == 'active':
-        tasks = tasks.filter(status='active')
-    elif status == 'completed':
-        tasks = tasks.filter(status='completed')
-    elif status == 'cancelled':
-        tasks = tasks.filter(status='cancelled')
-    
-    if task_type:
-        tasks = tasks.filter(task_type=task_type)
+        return render_to_string(
+            "partials/task_list.html",
+            {
+                "tasks": page,
+                "next_cursor": next_cursor,
+                "selected_status": status,
+                "selected_type": task_type,
+            },
+            request=request,
+        )
 
+    params = {"status": status, "type": task_type, "cursor": cursor}
     context = {
-        "tasks": tasks,
+        "task_list": cached_fragment("tasks", params, render_fragment),
         "selected_status": status,
         "selected_type": task_type,
         "task_types": CourseTask.TASK_TYPES,
@@ -88,22 +209,101 @@ def knowledge_base(request):
     }
     return render(request, "knowledge_base.html", context)
 
+def _task_freshness(request, task_id):
+    """
+    (updated_at, newest entry created_at, entry count) of a task in one query, memoized on
+    the request because the ETag and Last-Modified callbacks both need it.
+    """
+    cached = getattr(request, "_task_freshness", None)
+    if cached is None or cached[0] != task_id:
+        row = (
+            CourseTask.objects.filter(id=task_id)
+            .annotate(latest_entry=Max("entries__created_at"), entry_count=Count("entries"))
+            .values_list("updated_at", "latest_entry", "entry_count")
+            .first()
+        )
+        cached = (task_id, row)
+        request._task_freshness = cached
+    return cached[1]
+
+
+def _task_last_modified(request, task_id):
+    row = _task_freshness(request, task_id)
+    if row is None:
+        return None
+    return max(value for value in row[:2] if value is not None)
+
+
+def _task_etag(request, task_id):
+    row = _task_freshness(request, task_id)
+    if row is None:
+        return None
+    updated_at, latest_entry, entry_count = row
+    latest = latest_entry.isoformat() if latest_entry else ""
+    # The count changes when an older entry is deleted or moved to another task
+    return f"task-{task_id}-{updated_at.isoformat()}-{latest}-{entry_count}"
+
+
+ENTRY_GROUPS = {
+    'deadline': 'deadlines',
+    'link': 'links',
+    'explanation': 'explanations',
+    'generic': 'generic_entries',
+    'info': 'generic_entries',
+}
+
+
+@condition(etag_func=_task_etag, last_modified_func=_task_last_modified)
 def task_detail(request, task_id):
     task = get_object_or_404(CourseTask, id=task_id)
-    
-    # Get all entries related to this task
+
+    # Get all entries related to this task in one query and group them here
     entries = task.entries.select_related('source_message__chat').order_by('created_at')
-    
-    deadlines = entries.filter(entry_type='deadline')
-    links = entries.filter(entry_type='link')
-    explanations = entries.filter(entry_type='explanation')
-    generic_info = entries.filter(entry_type__in=['generic', 'info'])
-    
+    groups = {name: [] for name in set(ENTRY_GROUPS.values())}
+    for entry in entries:
+        group = ENTRY_GROUPS.get(entry.entry_type)
+        if group:
+            groups[group].append(entry)
+
     context = {
         "task": task,
-        "deadlines": deadlines,
-        "links": links,
-        "explanations": explanations,
-        "generic_info": generic_info
+        **groups,
     }
     return render(request, "task_detail.html", context)
+
+
+def _search_page(request):
+    query = request.GET.get("q", "").strip()
+    cursor = decode_cursor(request.GET.get("cursor"))
+    results, next_cursor = run_search(
+        query, cursor=cursor, semantic=settings.SEARCH_SEMANTIC_ENABLED
+    )
+    return query, results, encode_cursor(next_cursor) if next_cursor else None
+
+
+def search(request):
+    query, results, next_cursor = _search_page(request)
+    context = {
+        "query": query,
+        "results": results,
+        "next_cursor": next_cursor,
+    }
+    return render(request, "search.html", context)
+
+
+def search_api(request):
+    query, results, next_cursor = _search_page(request)
+    return JsonResponse({
+        "query": query,
+        "results": results,
+        "next_cursor": next_cursor,
+    })
+
+
+def metrics(request):
+    """
+    Prometheus exposition of this process (plus the broker queue depth).
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404("Metrics are disabled")
+    return HttpResponse(analysis_metrics.render(), content_type=CONTENT_TYPE_LATEST)